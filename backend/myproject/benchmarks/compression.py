@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+CPU cost against bytes saved for response compression.
+
+The JSON bodies of the main GET endpoints are captured from a seeded throwaway
+test database (see benchmarks/serialization.py for the dataset sizes). Each
+body is then encoded with the on-the-fly settings of CompressionMiddleware and
+with the higher precompression settings used for cached catalogue bodies:
+
+  raw_bytes / bytes   - body size before and after encoding
+  saved_pct           - share of the bytes saved
+  cpu_ms              - CPU time of one encode (median of --rounds)
+  us_per_kb_saved     - CPU microseconds spent per KB saved
+
+A second table times whole requests with and without Accept-Encoding, so the
+middleware's cost can be read next to the view's. Cached catalogue bodies are
+compressed once per catalogue version, so their per-request cost is only the
+cache lookup.
+
+Run from backend/myproject:
+
+    python benchmarks/compression.py [--size medium] [--rounds 7] [--json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = [
+    ('meals catalogue', 'staff', '/api/meals/'),
+    ("today's menu", 'customer', '/api/daily-menu/today/menu/'),
+    ('orders (staff)', 'staff', '/api/orders/'),
+    ('orders (customer)', 'customer', '/api/orders/'),
+]
+
+
+def median_cpu_ms(function, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.process_time()
+        function()
+        samples.append((time.process_time() - started) * 1000)
+    return statistics.median(samples)
+
+
+def median_wall_us(function, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+
+def codecs():
+    from myapp import compression
+
+    available = [('gzip', False), ('gzip', True)]
+    if compression.brotli is not None:
+        available += [('br', False), ('br', True)]
+    return available
+
+
+def bench(size, rounds):
+    from django.contrib.auth.models import User
+    from django.core.cache import caches
+    from django.core.management import call_command
+    from django.test import Client
+    from myapp import compression
+    from myapp.models import Order
+    from benchmarks.serialization import SIZES
+
+    call_command('seed_bench', stdout=io.StringIO(), **SIZES[size])
+    staff = User.objects.create_user(username='bench-admin', email='bench-admin@example.com', is_staff=True)
+    customer = User.objects.get(id=Order.objects.values_list('user_id', flat=True).order_by('user_id').first())
+    clients = {}
+    for name, user in (('staff', staff), ('customer', customer)):
+        clients[name] = Client(SERVER_NAME='localhost')
+        clients[name].force_login(user)
+
+    sink = io.StringIO()
+    encodings = []
+    requests = []
+    for label, who, path in ENDPOINTS:
+        client = clients[who]
+        with contextlib.redirect_stdout(sink):  # The views print() a line per request
+            raw = client.get(path).content
+            for codec, precompressed in codecs():
+                encoded = compression.compress(raw, codec, precompressed)
+                cpu_ms = median_cpu_ms(lambda: compression.compress(raw, codec, precompressed), rounds)
+                saved = len(raw) - len(encoded)
+                encodings.append({
+                    'endpoint': label,
+                    'codec': f"{codec}-{'pre' if precompressed else 'live'}",
+                    'raw_bytes': len(raw),
+                    'bytes': len(encoded),
+                    'saved_pct': round(saved / len(raw) * 100, 1) if raw else 0.0,
+                    'cpu_ms': round(cpu_ms, 3),
+                    'us_per_kb_saved': round(cpu_ms * 1000 / (saved / 1024), 2) if saved > 0 else None,
+                })
+
+            def fetch(accept, cold):
+                def request():
+                    if cold:  # Drop cached bodies, so the catalogue is built and precompressed again
+                        caches['default'].clear()
+                        caches['order_history'].clear()
+                    client.get(path, headers={'Accept-Encoding': accept} if accept else {})
+                return request
+
+            row = {'endpoint': label}
+            for name, accept in (('identity', None), ('gzip', 'gzip'), ('br', 'br')):
+                if name == 'br' and compression.brotli is None:
+                    continue
+                row[f'{name}_us'] = round(median_wall_us(fetch(accept, cold=False), rounds), 1)
+            row['cold_gzip_us'] = round(median_wall_us(fetch('gzip', cold=True), rounds), 1)
+            requests.append(row)
+    return {'size': size, 'encodings': encodings, 'requests': requests}
+
+
+def run(size, rounds):
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    django.setup()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        return bench(size, rounds)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def print_table(rows, columns):
+    widths = {column: max(len(column), *(len(str(row.get(column, ''))) for row in rows)) + 2 for column in columns}
+    print(''.join(f'{column:>{widths[column]}}' for column in columns))
+    for row in rows:
+        print(''.join(f"{str(row.get(column, '')):>{widths[column]}}" for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='medium', help='dataset size from benchmarks/serialization.py')
+    parser.add_argument('--rounds', type=int, default=7, help='repetitions per measurement (the median is reported)')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
+    results = run(args.size, args.rounds)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print_table(results['encodings'], ['endpoint', 'codec', 'raw_bytes', 'bytes', 'saved_pct', 'cpu_ms', 'us_per_kb_saved'])
+    print()
+    columns = ['endpoint', 'identity_us', 'gzip_us'] + (['br_us'] if 'br_us' in results['requests'][0] else []) + ['cold_gzip_us']
+    print_table(results['requests'], columns)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""
+Microbenchmarks for the serialization and model hot paths, and for the GET views
+that use them, over seeded datasets of several sizes.
+
+Each size is seeded into a throwaway test database with the seed_bench command.
+Every case is run for --rounds rounds; a round calls the function once per
+input row (or issues one request, for views) and the per-call time is recorded.
+The median and the fastest round are reported in microseconds per call.
+
+Cases:
+  serialize_meal                 - views.serialize_meal over every meal
+  serialize_order                - views.serialize_order over every order, items and user prefetched
+  serialize_order_from_summary   - summaries.serialize_order_from_summary over every order
+  total_item_price_cents         - OrderItem.total_item_price_cents over every order line
+  order_total_cents              - an order's total summed from its lines in integer cents, over every order
+  format_cents                   - money.format_cents over every order total
+  revenue_totals                 - revenue.revenue_totals for today (one SUM per shard)
+  GET <path> [as ...]            - one request through the test client, middleware included
+
+Run from backend/myproject, against a settings module whose database user may
+create a test database:
+
+    python benchmarks/serialization.py --sizes small,medium --output results.json
+    python benchmarks/serialization.py --save-baseline benchmarks/baseline.json
+    python benchmarks/serialization.py --baseline benchmarks/baseline.json --threshold 0.10
+
+With --baseline, every case whose median is more than --threshold (a fraction)
+slower than the baseline is reported and the exit status is 1. Baselines are
+machine-specific: record one on the machine that runs the comparison.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# seed_bench options for each dataset size
+SIZES = {
+    'small': {'users': 50, 'meals': 40, 'days': 7, 'menu_size': 20, 'orders': 500},
+    'medium': {'users': 500, 'meals': 200, 'days': 30, 'menu_size': 25, 'orders': 5000},
+    'large': {'users': 2000, 'meals': 500, 'days': 60, 'menu_size': 30, 'orders': 50000},
+}
+
+
+def time_calls(function, inputs, rounds):
+    """Per-call time in microseconds of function(x) over inputs, for each round."""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for value in inputs:
+            function(value)
+        samples.append((time.perf_counter() - started) / len(inputs) * 1e6)
+    return samples
+
+
+def time_requests(client, path, rounds, before=None):
+    """Time in microseconds of one GET through the test client, for each round."""
+    samples = []
+    sink = io.StringIO()
+    for _ in range(rounds):
+        if before:
+            before()
+        with contextlib.redirect_stdout(sink):  # The views print() a line per request
+            started = time.perf_counter()
+            response = client.get(path)
+            elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {path} returned {response.status_code}')
+        sink.seek(0)
+        sink.truncate()
+        samples.append(elapsed * 1e6)
+    return samples
+
+
+def summarize(samples, ops):
+    return {
+        'median_us': round(statistics.median(samples), 3),
+        'min_us': round(min(samples), 3),
+        'ops': ops,
+    }
+
+
+def bench_size(size, rounds):
+    """Seeds one dataset size into the (empty) test database and runs every case on it."""
+    from django.contrib.auth.models import User
+    from django.core.cache import caches
+    from django.core.management import call_command
+    from django.test import Client
+    from myapp.cache import ORDER_HISTORY
+    from django.utils import timezone
+    from myapp.models import Meal, Order, OrderItem
+    from myapp.money import format_cents
+    from myapp.revenue import revenue_totals
+    from myapp.summaries import SUMMARY_FIELDS, serialize_order_from_summary
+    from myapp.views import serialize_meal, serialize_order
+
+    call_command('flush', interactive=False, verbosity=0)
+    for cache in caches.all():
+        cache.clear()
+    call_command('seed_bench', stdout=io.StringIO(), **SIZES[size])
+
+    meals = list(Meal.objects.all())
+    orders = list(Order.objects.select_related('user').prefetch_related('items'))
+    summarized = list(Order.objects.only(*SUMMARY_FIELDS))
+    items = list(OrderItem.objects.all())
+    totals = [order.total_amount_cents for order in orders]
+
+    results = {
+        'serialize_meal': summarize(time_calls(serialize_meal, meals, rounds), len(meals)),
+        'serialize_order': summarize(time_calls(serialize_order, orders, rounds), len(orders)),
+        'serialize_order_from_summary': summarize(
+            time_calls(serialize_order_from_summary, summarized, rounds), len(summarized),
+        ),
+        'total_item_price_cents': summarize(
+            time_calls(lambda item: item.total_item_price_cents, items, rounds), len(items),
+        ),
+        'order_total_cents': summarize(
+            time_calls(lambda order: sum(item.total_item_price_cents for item in order.items.all()), orders, rounds),
+            len(orders),
+        ),
+        'format_cents': summarize(time_calls(format_cents, totals, rounds), len(totals)),
+        'revenue_totals': summarize(time_calls(revenue_totals, [timezone.localdate()], rounds), 1),
+    }
+
+    admin = User.objects.create_user(username='bench-admin', email='bench-admin@example.com', is_staff=True)
+    customer = User.objects.get(id=Order.objects.values_list('user_id', flat=True).order_by('user_id').first())
+    staff_client = Client()
+    staff_client.force_login(admin)
+    customer_client = Client()
+    customer_client.force_login(customer)
+    history_cache = caches[ORDER_HISTORY]
+
+    views = [
+        ('GET /api/meals/', staff_client, '/api/meals/', None),
+        ('GET /api/daily-menu/today/menu/', customer_client, '/api/daily-menu/today/menu/', None),
+        ('GET /api/orders/ as staff', staff_client, '/api/orders/', None),
+        ('GET /api/orders/ as customer (cache miss)', customer_client, '/api/orders/', history_cache.clear),
+        ('GET /api/orders/ as customer (cache hit)', customer_client, '/api/orders/', None),
+        ('GET /api/orders/today/revenue/', staff_client, '/api/orders/today/revenue/', None),
+    ]
+    for name, client, path, before in views:
+        time_requests(client, path, 1, before)  # Warm up
+        results[name] = summarize(time_requests(client, path, rounds, before), 1)
+    return results
+
+
+def run(sizes, rounds):
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    django.setup()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        results = {}
+        for size in sizes:
+            print(f'Benchmarking {size} dataset...', file=sys.stderr)
+            for case, result in bench_size(size, rounds).items():
+                results[f'{size}/{case}'] = result
+        meta = {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'rounds': rounds,
+            'sizes': {size: SIZES[size] for size in sizes},
+        }
+        return {'meta': meta, 'results': results}
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def compare(results, baseline, threshold):
+    """[(case, baseline_us, current_us, ratio, regressed)] for the cases present in both runs."""
+    rows = []
+    for case, current in results['results'].items():
+        previous = baseline['results'].get(case)
+        if previous is None:
+            continue
+        ratio = current['median_us'] / previous['median_us'] if previous['median_us'] else 1.0
+        rows.append((case, previous['median_us'], current['median_us'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='small,medium', help=f'comma-separated, from: {", ".join(SIZES)}')
+    parser.add_argument('--rounds', type=int, default=7, help='rounds per case (the median is reported)')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON instead of a table')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown against the baseline, as a fraction')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the results to PATH for later comparisons')
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f'unknown size(s): {", ".join(unknown)}')
+
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
+    results = run(sizes, args.rounds)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'case':<58}{'median_us':>12}{'min_us':>12}{'ops':>8}")
+        for case, result in results['results'].items():
+            print(f"{case:<58}{result['median_us']:>12.2f}{result['min_us']:>12.2f}{result['ops']:>8}")
+
+    if not args.baseline:
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold)
+    regressions = [row for row in rows if row[4]]
+    print(f"\nAgainst {args.baseline} (threshold +{args.threshold:.0%}):")
+    for case, before, after, ratio, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{case:<58}{before:>12.2f} -> {after:>10.2f}  {ratio - 1:+7.1%}{flag}')
+    if regressions:
+        print(f'\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Startup and per-request middleware overhead for the full and API-only profiles.
+
+For each settings profile, fresh interpreters are started and each one measures:
+  * setup_ms    - django.setup(), building the WSGI handler (which loads the
+                  middleware chain) and importing the URLconf
+  * process_ms  - wall time of the whole child process, interpreter start included
+  * request_us  - mean time of GET /api/hello/ through the full handler
+  * view_us     - mean time of calling the view function directly
+  * overhead_us - request_us - view_us, i.e. what the middleware and URL routing cost
+
+Run from backend/myproject:
+
+    python benchmarks/startup.py [--runs 5] [--requests 2000] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    'full': 'myproject.settings',
+    'api': 'myproject.settings_api',
+}
+
+
+def child(requests):
+    """Runs inside a fresh interpreter with DJANGO_SETTINGS_MODULE already set."""
+    started = time.perf_counter()
+    import django
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import get_resolver
+
+    django.setup(set_prefix=False)
+    get_wsgi_application()
+    get_resolver().url_patterns
+    setup_ms = (time.perf_counter() - started) * 1000
+
+    from django.conf import settings
+    from django.test import Client, RequestFactory
+    from myapp.views import hello_world
+
+    client = Client(SERVER_NAME='localhost')
+    client.get('/api/hello/')  # Warm up lazy imports on the request path
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get('/api/hello/')
+    request_us = (time.perf_counter() - started) / requests * 1e6
+
+    request = RequestFactory(SERVER_NAME='localhost').get('/api/hello/')
+    started = time.perf_counter()
+    for _ in range(requests):
+        hello_world(request)
+    view_us = (time.perf_counter() - started) / requests * 1e6
+
+    print(json.dumps({
+        'setup_ms': setup_ms,
+        'request_us': request_us,
+        'view_us': view_us,
+        'overhead_us': request_us - view_us,
+        'middleware': len(settings.MIDDLEWARE),
+        'apps': len(settings.INSTALLED_APPS),
+    }))
+
+
+def run_profile(settings_module, runs, requests):
+    samples = []
+    for _ in range(runs):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', '--requests', str(requests)],
+            cwd=PROJECT_DIR, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        process_ms = (time.perf_counter() - started) * 1000
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process_ms'] = process_ms
+        samples.append(sample)
+
+    result = {key: samples[0][key] for key in ('middleware', 'apps')}
+    for key in ('setup_ms', 'process_ms', 'request_us', 'view_us', 'overhead_us'):
+        result[key] = round(statistics.median(sample[key] for sample in samples), 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per profile (the median is reported)')
+    parser.add_argument('--requests', type=int, default=2000, help='requests timed per interpreter')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, PROJECT_DIR)
+        child(args.requests)
+        return
+
+    results = {name: run_profile(module, args.runs, args.requests) for name, module in PROFILES.items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = ('apps', 'middleware', 'setup_ms', 'process_ms', 'request_us', 'view_us', 'overhead_us')
+    print(f"{'profile':<8}" + ''.join(f'{column:>13}' for column in columns))
+    for name, result in results.items():
+        print(f'{name:<8}' + ''.join(f'{result[column]:>13}' for column in columns))
+
+
+if __name__ == '__main__':
+    main()
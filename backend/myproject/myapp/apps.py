@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "myapp"
+
+    def ready(self):
+        # Connects the signal handlers that keep the search index and response caches fresh,
+        # the one that installs the slow-query wrapper on new database connections, and the
+        # order shard setup and cleanup hooks
+        from . import cache, search, sharding, slow_queries  # noqa: F401
+
+        # Versions and bodies cached per process would go stale in every other worker
+        cache.check_shared_caches()
@@ -0,0 +1,219 @@
+# myapp/cache.py
+"""
+Response caches and their hit/miss statistics.
+
+Each customer's serialized order history is cached under a per-user version
+number, and the menu/meal catalogue bodies under one shared catalogue version.
+Writes never delete cache entries: they bump the version, so the next read
+misses and the stale entry ages out of the backend through its own LRU/TTL
+eviction. The histories live in ``CACHES['order_history']`` and the catalogue
+in ``CACHES['default']`` (local memory by default, Redis in production).
+
+A version bumped in one worker must be seen by all of them, so ``default`` and
+``order_history`` have to be caches every process shares; ``check_shared_caches()``
+stops startup when they are not, unless ALLOW_PROCESS_LOCAL_CACHES says there is
+only one process.
+"""
+
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DailyMenu, Meal, Order
+
+
+class CacheStats:
+    """Per-process hit/miss counters for one cache."""
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_stats(name):
+    with _stats_lock:
+        if name not in _stats:
+            _stats[name] = CacheStats(name)
+        return _stats[name]
+
+
+def all_stats():
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in _stats.items()}
+
+
+# --- Shared caches ---
+
+# Backends whose entries each process keeps to itself
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Caches whose contents every worker must see: 'default' holds the catalogue version and
+# bodies, 'order_history' the per-user versions, 'carts' the carts and checkout locks
+SHARED_CACHES = {
+    'default': 'a meal or menu change made in one worker would not reach the others',
+    'order_history': 'an order change made in one worker would not reach the others',
+    'carts': "a customer's cart would depend on the worker, and the checkout lock would not stop a double submit",
+}
+
+
+def require_shared_cache(alias, consequence):
+    """Raises ImproperlyConfigured if CACHES[alias] is a per-process backend."""
+    backend = settings.CACHES[alias]['BACKEND']
+    if backend in PROCESS_LOCAL_BACKENDS:
+        raise ImproperlyConfigured(
+            f"CACHES[{alias!r}] uses {backend}, which each process keeps to itself, so {consequence}. "
+            f"Point it at a shared cache such as Redis (see the Caches section of settings)."
+        )
+
+
+def check_shared_caches():
+    """Called at startup: unless ALLOW_PROCESS_LOCAL_CACHES is set (one process, e.g. runserver), every SHARED_CACHES entry must be shared."""
+    if settings.ALLOW_PROCESS_LOCAL_CACHES:
+        return
+    for alias, consequence in SHARED_CACHES.items():
+        require_shared_cache(alias, consequence)
+
+
+# --- Per-user order history ---
+
+ORDER_HISTORY = 'order_history'
+
+
+def _order_history_cache():
+    return caches[ORDER_HISTORY]
+
+
+def _version_key(user_id):
+    return f'orders:version:{user_id}'
+
+
+def order_history_version(user_id):
+    cache = _order_history_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Seed from the clock rather than 1: if the version key was evicted, a
+        # restarted counter could otherwise land on an old entry that is still cached.
+        cache.add(_version_key(user_id), time.time_ns() // 1000, timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def bump_order_history(user_id):
+    cache = _order_history_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # No version yet: seeding a fresh one invalidates just the same.
+        cache.add(_version_key(user_id), time.time_ns() // 1000, timeout=None)
+
+
+def _history_key(user_id, version, variant):
+    return f'orders:{user_id}:{version}:{variant}' if variant else f'orders:{user_id}:{version}'
+
+
+def get_order_history(user_id, version, variant=''):
+    """Returns the cached JSON body for (user, version), or None. ``variant`` names a sparse fieldset."""
+    payload = _order_history_cache().get(_history_key(user_id, version, variant))
+    get_stats(ORDER_HISTORY).record(hit=payload is not None)
+    return payload
+
+
+def set_order_history(user_id, version, orders_data, variant=''):
+    """Encodes the serialized orders, caches the body and returns it."""
+    payload = json.dumps(orders_data, cls=DjangoJSONEncoder)
+    _order_history_cache().set(_history_key(user_id, version, variant), payload)
+    return payload
+
+
+@receiver(post_save, sender=Order, dispatch_uid='myapp.cache.order_saved')
+@receiver(post_delete, sender=Order, dispatch_uid='myapp.cache.order_deleted')
+def _order_changed(sender, instance, using, **kwargs):
+    # Bump after commit so a reader cannot re-cache the pre-commit state under the new
+    # version: the commit of the order's own database, which may be a shard.
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_order_history(user_id), using=using)
+
+
+# --- Menu and meal catalogue bodies ---
+
+CATALOGUE = 'catalogue'
+CATALOGUE_VERSION_KEY = 'catalogue:version'
+# Bodies outlive the backend's default TTL (300 s): the one prewarmed at 23:50 must last
+# through the whole next day. Keys are versioned, so they never serve stale content.
+CATALOGUE_BODY_TIMEOUT = 2 * 24 * 60 * 60
+
+
+def catalogue_version():
+    """One version for every cached menu and meal-list body; bumped by any meal or menu change."""
+    cache = caches['default']
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def bump_catalogue():
+    cache = caches['default']
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOGUE_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+
+
+def get_catalogue_body(name, version):
+    """The cached {encoding: bytes} variants of a catalogue body, or None."""
+    variants = caches['default'].get(f'catalogue:{name}:{version}')
+    get_stats(CATALOGUE).record(hit=variants is not None)
+    return variants
+
+
+def set_catalogue_body(name, version, variants):
+    caches['default'].set(f'catalogue:{name}:{version}', variants, timeout=CATALOGUE_BODY_TIMEOUT)
+
+
+@receiver(post_save, sender=Meal, dispatch_uid='myapp.cache.meal_saved')
+@receiver(post_delete, sender=Meal, dispatch_uid='myapp.cache.meal_deleted')
+@receiver(post_save, sender=DailyMenu, dispatch_uid='myapp.cache.menu_saved')
+@receiver(post_delete, sender=DailyMenu, dispatch_uid='myapp.cache.menu_deleted')
+def _catalogue_changed(sender, **kwargs):
+    transaction.on_commit(bump_catalogue)
+
+
+@receiver(m2m_changed, sender=DailyMenu.meals.through, dispatch_uid='myapp.cache.menu_meals_changed')
+def _menu_meals_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(bump_catalogue)
@@ -0,0 +1,223 @@
+# myapp/carts.py
+"""
+Server-side shopping carts, kept in the ``carts`` cache.
+
+A customer's cart is a single cache entry, ``cart:<user id>``: a list of
+``{meal_id, meal_name, quantity, price_cents}`` lines. Adding, changing and
+removing lines rewrite that entry and never touch the order tables; an idle
+cart expires CART_TTL seconds after its last change. Writes are read-modify-write on one key, so of
+two changes made at the same instant (two tabs) the last one wins.
+
+Meals are looked up through a cache of ``{id, name, price_cents}`` snapshots,
+keyed by the catalogue version (see myapp/cache.py), so a price change is seen
+by the next cart read. Misses are filled with one query for all of them. Each
+line remembers the price the customer was last shown: reading the cart moves
+the lines to the current prices, and checkout refuses (409, with the refreshed
+cart) if a price changed since the customer last saw it.
+
+Checkout reads the meals from the database in one query and writes the order
+and all of its items in one transaction on the customer's shard: one INSERT for
+the order and one bulk INSERT for the items (see orders.place_order_lines). A
+lock in the carts cache makes a double-submitted checkout place one order.
+"""
+
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .cache import catalogue_version, get_stats
+from .models import Meal
+from .money import format_cents
+from .orders import place_order_lines
+from .preorders import check_menu_date
+from .sharding import shard_for_user
+
+CARTS = 'carts'
+MEAL_LOOKUP = 'meal_lookup'
+
+# How long a checkout holds the per-customer lock, at most
+CHECKOUT_LOCK_SECONDS = 60
+
+
+class CartError(ValueError):
+    """A cart change or checkout that cannot be made. ``status`` is the HTTP status for the client."""
+    status = 400
+
+
+class MealUnavailable(CartError):
+    status = 404
+
+
+class CartConflict(CartError):
+    status = 409
+
+
+def _carts_cache():
+    return caches[CARTS]
+
+
+def _cart_key(user_id):
+    return f'cart:{user_id}'
+
+
+def _meal_key(version, meal_id):
+    return f'catalogue:meal:{version}:{meal_id}'
+
+
+def cart_meals(meal_ids):
+    """{meal id: {'id', 'name', 'price_cents'}} for the meals that exist, from the cache or one query."""
+    if not meal_ids:
+        return {}
+    cache = caches['default']
+    version = catalogue_version()
+    keys = {_meal_key(version, meal_id): meal_id for meal_id in meal_ids}
+    cached = cache.get_many(keys)
+    stats = get_stats(MEAL_LOOKUP)
+    for key in keys:
+        stats.record(hit=key in cached)
+    meals = {keys[key]: meal for key, meal in cached.items()}
+    missing = [meal_id for meal_id in meal_ids if meal_id not in meals]
+    if missing:
+        rows = Meal.objects.filter(id__in=missing).values('id', 'name', 'price_cents')
+        found = {row['id']: row for row in rows}
+        cache.set_many({_meal_key(version, meal_id): meal for meal_id, meal in found.items()})
+        meals.update(found)
+    return meals
+
+
+def _meal_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise CartError('meal_id must be a meal ID.')
+
+
+def _quantity(value, allow_zero=False):
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        quantity = -1
+    lowest = 0 if allow_zero else 1
+    if not lowest <= quantity <= settings.CART_MAX_QUANTITY:
+        raise CartError(f'quantity must be between {lowest} and {settings.CART_MAX_QUANTITY}.')
+    return quantity
+
+
+def _save(user_id, lines):
+    if lines:
+        _carts_cache().set(_cart_key(user_id), lines)
+    else:
+        _carts_cache().delete(_cart_key(user_id))
+
+
+def get_cart(user_id):
+    """
+    The cart's lines at the current prices. Lines whose meal is gone are dropped; the
+    cart is written back if anything changed, so the stored prices are the ones shown.
+    """
+    lines = _carts_cache().get(_cart_key(user_id)) or []
+    meals = cart_meals([line['meal_id'] for line in lines])
+    current = [
+        {
+            'meal_id': line['meal_id'],
+            'meal_name': meals[line['meal_id']]['name'],
+            'quantity': line['quantity'],
+            'price_cents': meals[line['meal_id']]['price_cents'],
+        }
+        for line in lines if line['meal_id'] in meals
+    ]
+    if current != lines:
+        _save(user_id, current)
+    return current
+
+
+def add_to_cart(user_id, meal_id, quantity=1):
+    """Adds ``quantity`` of a meal to the cart, or to its line if it has one. Returns the lines."""
+    meal_id, quantity = _meal_id(meal_id), _quantity(quantity)
+    lines = get_cart(user_id)
+    for line in lines:
+        if line['meal_id'] == meal_id:
+            line['quantity'] = _quantity(line['quantity'] + quantity)
+            break
+    else:
+        meal = cart_meals([meal_id]).get(meal_id)
+        if meal is None:
+            raise MealUnavailable('Meal not found.')
+        if len(lines) >= settings.CART_MAX_LINES:
+            raise CartError(f'A cart holds at most {settings.CART_MAX_LINES} different meals.')
+        lines.append({'meal_id': meal_id, 'meal_name': meal['name'], 'quantity': quantity, 'price_cents': meal['price_cents']})
+    _save(user_id, lines)
+    return lines
+
+
+def set_quantity(user_id, meal_id, quantity):
+    """Sets the quantity of a line in the cart; 0 removes it. Returns the lines."""
+    meal_id, quantity = _meal_id(meal_id), _quantity(quantity, allow_zero=True)
+    lines = get_cart(user_id)
+    if not any(line['meal_id'] == meal_id for line in lines):
+        raise MealUnavailable('That meal is not in the cart.')
+    if quantity:
+        for line in lines:
+            if line['meal_id'] == meal_id:
+                line['quantity'] = quantity
+    else:
+        lines = [line for line in lines if line['meal_id'] != meal_id]
+    _save(user_id, lines)
+    return lines
+
+
+def clear_cart(user_id):
+    _carts_cache().delete(_cart_key(user_id))
+
+
+def cart_data(lines):
+    """The cart as sent to the client. Amounts are exact strings, as everywhere in the API."""
+    items = [
+        {
+            'meal_id': line['meal_id'],
+            'meal_name': line['meal_name'],
+            'quantity': line['quantity'],
+            'price': format_cents(line['price_cents']),
+            'total_item_price': format_cents(line['price_cents'] * line['quantity']),
+        }
+        for line in lines
+    ]
+    return {
+        'items': items,
+        'item_count': sum(line['quantity'] for line in lines),
+        'total': format_cents(sum(line['price_cents'] * line['quantity'] for line in lines)),
+    }
+
+
+def checkout(user, menu_date=None):
+    """
+    Turns the customer's cart into one pending order, for ``menu_date`` (default
+    today), and empties the cart. Returns the order. Raises CartError if the cart is
+    empty or the day cannot be ordered for, CartConflict if a checkout is already
+    running or a meal or price changed since the cart was last shown.
+    """
+    cache = _carts_cache()
+    lock = f'{_cart_key(user.id)}:checkout'
+    if not cache.add(lock, 1, timeout=CHECKOUT_LOCK_SECONDS):
+        raise CartConflict('This cart is already being checked out.')
+    try:
+        lines = cache.get(_cart_key(user.id)) or []
+        if not lines:
+            raise CartError('The cart is empty.')
+        menu_date = menu_date or date.today()
+        try:
+            check_menu_date(menu_date, [line['meal_id'] for line in lines])
+        except ValueError as e:
+            raise CartError(str(e))
+        # Authoritative prices: the database, not the snapshot cache
+        meals = Meal.objects.only('id', 'name', 'price_cents').order_by().in_bulk([line['meal_id'] for line in lines])
+        if any(line['meal_id'] not in meals or meals[line['meal_id']].price_cents != line['price_cents'] for line in lines):
+            raise CartConflict('Some meals in the cart have changed. Please review the cart.')
+        order = place_order_lines(user, [(meals[line['meal_id']], line['quantity']) for line in lines], menu_date)
+        user_id = user.id
+        transaction.on_commit(lambda: clear_cart(user_id), using=shard_for_user(user_id))
+        return order
+    finally:
+        cache.delete(lock)
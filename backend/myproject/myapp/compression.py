@@ -0,0 +1,128 @@
+# myapp/compression.py
+"""
+Negotiated response compression, and JSON bodies that are compressed once.
+
+CompressionMiddleware encodes responses of COMPRESSION_MIN_BYTES or more with
+brotli or gzip, whichever the client's Accept-Encoding prefers (brotli only if
+the optional ``brotli`` package is installed). Streaming responses are left alone.
+
+Bodies that many clients fetch unchanged, such as today's menu and the meal
+catalogue, are built with ``precompressed_json()``: the raw bytes and their
+gzip/brotli variants are encoded once, a level above on-the-fly compression,
+and cached together. The middleware then serves the stored variant instead of
+compressing again.
+"""
+
+import gzip
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+# On-the-fly levels favour speed. Precompressed bodies are encoded once per catalogue version,
+# but lazily, on the request thread of every worker that misses after a bump: brotli 5 costs a
+# few ms on a large catalogue where 11 costs the better part of a second (benchmarks/compression.py).
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+PRECOMPRESSED_GZIP_LEVEL = 9
+PRECOMPRESSED_BROTLI_QUALITY = 5
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body, encoding, precompressed=False):
+    if encoding == 'br':
+        return brotli.compress(body, quality=PRECOMPRESSED_BROTLI_QUALITY if precompressed else BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=PRECOMPRESSED_GZIP_LEVEL if precompressed else GZIP_LEVEL, mtime=0)
+    raise ValueError(f'Unsupported encoding: {encoding}')
+
+
+def negotiate(accept_encoding):
+    """The best encoding the client accepts (brotli first), or None for identity."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding] = quality
+    candidates = [
+        encoding for encoding in supported_encodings()
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+    # Highest q wins; on a tie keep our preference order (brotli before gzip)
+    return max(candidates, key=lambda encoding: accepted.get(encoding, accepted.get('*', 0.0)))
+
+
+def precompressed_json(data):
+    """{encoding: bytes} for a JSON body: 'identity' plus every supported encoding if it is big enough."""
+    raw = json.dumps(data, cls=DjangoJSONEncoder).encode()
+    variants = {'identity': raw}
+    if len(raw) >= settings.COMPRESSION_MIN_BYTES:
+        for encoding in supported_encodings():
+            variants[encoding] = compress(raw, encoding, precompressed=True)
+    return variants
+
+
+def precompressed_response(variants):
+    """A JSON response carrying its precompressed variants for CompressionMiddleware."""
+    response = HttpResponse(variants['identity'], content_type='application/json')
+    response.precompressed = variants
+    return response
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        # Whatever this client gets, a cache must not hand it to one that negotiated differently
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        variants = getattr(response, 'precompressed', None)
+        if variants is not None and variants.get('identity') == response.content and encoding in variants:
+            body = variants[encoding]
+        else:
+            body = compress(response.content, encoding)
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            # The encoded bytes differ from what a strong ETag promises
+            etag = response['ETag']
+            response['ETag'] = etag if etag.startswith('W/') else f'W/{etag}'
+        return response
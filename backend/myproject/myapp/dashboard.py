@@ -0,0 +1,44 @@
+# myapp/dashboard.py
+"""
+Running the independent reads of a dashboard bootstrap request side by side.
+
+``run_concurrently()`` hands each job to a bounded, process-wide thread pool of
+DASHBOARD_WORKERS threads, so one bootstrap request costs about as long as its
+slowest part instead of the sum of all of them. Each pool thread has its own
+database connection, managed like a request thread's: ``close_old_connections()``
+runs around every job, so CONN_MAX_AGE decides whether connections are reused.
+With DASHBOARD_WORKERS = 0 the jobs run one after another on the calling thread.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+        return _executor
+
+
+def _run_job(job):
+    close_old_connections()
+    try:
+        return job()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(jobs):
+    """Runs {name: callable} and returns {name: result}. The first exception is re-raised."""
+    if settings.DASHBOARD_WORKERS <= 0 or len(jobs) < 2:
+        return {name: job() for name, job in jobs.items()}
+    futures = {name: get_executor().submit(_run_job, job) for name, job in jobs.items()}
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,93 @@
+# myapp/exports.py
+"""
+CSV export of order lines for accounting.
+
+Rows are read through ``QuerySet.iterator()``, which uses a server-side cursor
+on Postgres and ``fetchmany`` elsewhere, and are written out in fixed-size
+chunks. Memory use stays flat however many orders fall in the range.
+
+Each order shard (see myapp/sharding.py) is read through its own iterator, and
+the sorted streams are merged as they are consumed. The customer's email comes
+from the order summary, since ``auth_user`` is not on the shards to join.
+"""
+
+import csv
+import heapq
+import io
+from operator import itemgetter
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import OrderItem
+from .money import format_cents
+from .sharding import shards
+
+CSV_HEADER = [
+    'order_id', 'order_date', 'user_id', 'user_email', 'customer_name', 'status', 'payment_status',
+    'order_total', 'item_id', 'meal_id', 'meal_name', 'quantity', 'price_at_order', 'line_total',
+]
+
+# Rows fetched from the database per round trip, and CSV rows per yielded chunk
+FETCH_SIZE = 5000
+ROWS_PER_CHUNK = 1000
+
+
+def date_range_bounds(start, end):
+    """[start 00:00, day after end 00:00) as aware datetimes, so order_date's index can be used."""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def shard_export_rows(using, start, end):
+    lower, upper = date_range_bounds(start, end)
+    return (
+        OrderItem.objects.using(using)
+        .filter(order__order_date__gte=lower, order__order_date__lt=upper)
+        .order_by('order__order_date', 'order_id', 'id')
+        .values_list(
+            'order_id', 'order__order_date', 'order__user_id', 'order__summary__user_email', 'order__customer_name',
+            'order__status', 'order__payment_status', 'order__total_amount_cents',
+            'id', 'meal_id', 'meal_name', 'quantity', 'price_at_order_cents',
+        )
+        .iterator(chunk_size=FETCH_SIZE)
+    )
+
+
+def export_rows(start, end):
+    """One values tuple per order line for orders placed from start to end inclusive, from every shard."""
+    streams = [shard_export_rows(alias, start, end) for alias in shards()]
+    if len(streams) == 1:
+        return streams[0]
+    # (order_date, order_id, item id): the order every shard's stream is already in
+    return heapq.merge(*streams, key=itemgetter(1, 0, 8))
+
+
+def iter_orders_csv(start, end):
+    """Yields the CSV export as text chunks of ROWS_PER_CHUNK lines each."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+
+    last_order_id = None
+    order_date = None
+    pending = 0
+    for (order_id, placed_at, user_id, email, customer_name, status, payment_status, total,
+         item_id, meal_id, meal_name, quantity, price) in export_rows(start, end):
+        if order_id != last_order_id:  # Lines of one order are adjacent; format its date once
+            last_order_id = order_id
+            order_date = placed_at.isoformat()
+        writer.writerow([
+            order_id, order_date, user_id, email, customer_name, status, payment_status,
+            format_cents(total), item_id, meal_id, meal_name, quantity, format_cents(price), format_cents(price * quantity),
+        ])
+        pending += 1
+        if pending >= ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
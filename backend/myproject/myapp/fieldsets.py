@@ -0,0 +1,102 @@
+# myapp/fieldsets.py
+"""
+Sparse fieldsets: ``?fields=id,status,items.meal_name`` on the orders and meals APIs.
+
+Each resource maps its output fields to the database columns they need and a
+getter. A request that names fields fetches only those columns and serializes
+only those fields; without ``fields`` the endpoints behave as before.
+
+Orders are read with ``values()``. Their customer details and item lines live
+in the ``summary`` JSON (see myapp/summaries.py), so those fields are fetched as
+JSON key lookups (``summary__items``) and the summary is not read at all unless
+one of them is asked for. Meals are read as instances with ``only()``, since
+their image fields need the storage-aware getters.
+"""
+
+from .money import format_cents
+from .thumbnails import thumbnail_urls
+
+# Order fields: name -> (columns for values(), getter(row))
+ORDER_FIELDS = {
+    'id': (('id',), lambda row: row['id']),
+    'user_email': (('summary__user_email',), lambda row: row['summary__user_email']),
+    'customer_id': (('user_id',), lambda row: row['user_id']),
+    'order_date': (('order_date',), lambda row: row['order_date'].isoformat()),
+    'total_amount': (('total_amount_cents',), lambda row: format_cents(row['total_amount_cents'])),
+    'status': (('status',), lambda row: row['status']),
+    'payment_status': (('payment_status',), lambda row: row['payment_status']),
+    'menu_date': (('menu_date',), lambda row: row['menu_date'].isoformat() if row['menu_date'] else None),
+    'items': (('summary__items',), lambda row: row['summary__items']),
+    'customer_name': (('summary__customer_name',), lambda row: row['summary__customer_name']),
+    'date': (('order_date',), lambda row: row['order_date'].strftime('%Y-%m-%d %H:%M:%S')),
+    'total': (('total_amount_cents',), lambda row: format_cents(row['total_amount_cents'])),
+}
+ORDER_ITEM_FIELDS = ('meal_name', 'quantity', 'price_at_order', 'total_item_price', 'meal_id')
+
+# Meal fields: name -> (columns for only(), getter(meal))
+MEAL_FIELDS = {
+    'id': (('id',), lambda meal: meal.id),
+    'name': (('name',), lambda meal: meal.name),
+    'description': (('description',), lambda meal: meal.description),
+    'price': (('price_cents',), lambda meal: format_cents(meal.price_cents)),
+    'category': (('category',), lambda meal: meal.category),
+    'image_url': (('image_url', 'image'), lambda meal: meal.image_url or (meal.image.url if meal.image else None)),
+    'thumbnails': (('thumbnails',), thumbnail_urls),
+    'created_at': (('created_at',), lambda meal: meal.created_at.isoformat()),
+    'updated_at': (('updated_at',), lambda meal: meal.updated_at.isoformat()),
+}
+
+# Fields whose value is a list of objects that can be narrowed with "field.subfield"
+NESTED_FIELDS = {'items': ORDER_ITEM_FIELDS}
+
+
+def parse_fields(value, spec):
+    """
+    Parses a ``fields`` parameter against a field spec. Returns None when no fields
+    were asked for, else {field: None (all of it) or [subfields]} in spec order.
+    Raises ValueError naming the unknown fields.
+    """
+    if value is None or not value.strip():
+        return None
+    selected = {}
+    unknown = []
+    for name in (part.strip() for part in value.split(',')):
+        if not name:
+            continue
+        field, _, subfield = name.partition('.')
+        if field not in spec or (subfield and subfield not in NESTED_FIELDS.get(field, ())):
+            unknown.append(name)
+        elif not subfield:
+            selected[field] = None
+        elif field not in selected or selected[field] is not None:
+            selected.setdefault(field, []).append(subfield)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(spec)}.")
+    return {
+        field: None if selected[field] is None else [name for name in NESTED_FIELDS[field] if name in selected[field]]
+        for field in spec if field in selected
+    }
+
+
+def fields_key(fields):
+    """A canonical string for a parsed selection, e.g. for cache keys."""
+    return ','.join(field if subfields is None else f"{field}.{'+'.join(subfields)}" for field, subfields in fields.items())
+
+
+def columns_for(fields, spec):
+    columns = []
+    for field in fields:
+        for column in spec[field][0]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def serialize_fields(obj, fields, spec):
+    data = {}
+    for field, subfields in fields.items():
+        value = spec[field][1](obj)
+        if subfields is not None:
+            value = [{name: entry.get(name) for name in subfields} for entry in value]
+        data[field] = value
+    return data
@@ -0,0 +1,46 @@
+# myapp/imaging.py
+"""
+Image resizing that runs inside the thumbnail worker processes.
+
+This module deliberately imports nothing from Django, so worker processes can
+import it without configuring settings or the app registry.
+"""
+
+import os
+
+# (format name for Pillow, file extension, save options)
+THUMBNAIL_FORMATS = [
+    ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+
+
+def render_thumbnails(source_path, digest, output_dir, widths):
+    """
+    Runs in a worker process. Writes one file per (width, format) and returns
+    {str(width): {extension: filename}}. Never upscales the source image.
+    """
+    from PIL import Image, ImageOps  # Only the worker processes need Pillow loaded.
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    with Image.open(source_path) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'L'):
+            source = source.convert('RGB')
+        for width in sorted(widths):
+            target_width = min(width, source.width)
+            target_height = max(1, round(source.height * target_width / source.width))
+            resized = source.resize((target_width, target_height), Image.LANCZOS)
+            variants = {}
+            for pil_format, extension, options in THUMBNAIL_FORMATS:
+                filename = f'{digest}-{width}.{extension}'
+                final_path = os.path.join(output_dir, filename)
+                if not os.path.exists(final_path):
+                    # Write then rename, so a reader never sees a half-written file.
+                    tmp_path = f'{final_path}.{os.getpid()}.tmp'
+                    resized.save(tmp_path, pil_format, **options)
+                    os.replace(tmp_path, final_path)
+                variants[extension] = filename
+            results[str(width)] = variants
+    return results
@@ -0,0 +1,55 @@
+# myapp/jobs.py
+"""
+Periodic jobs run by the scheduler (see myapp/scheduler.py and SCHEDULER_JOBS).
+
+At midnight every customer's first request asks for a menu nobody has built
+yet, and when the lunch window opens they all arrive at once. The prewarm jobs
+build those bodies beforehand, so the rush is served from the cache. Jobs must
+be idempotent: a slot can run twice if its lock is lost.
+"""
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import OrderEvent
+from .preorders import confirm_day
+from .revenue import open_revenue_day, rollup_revenue_day
+from .sharding import shards
+from .views import daily_menu_variants
+
+
+def prewarm_next_day():
+    """Builds tomorrow's menu body and creates its empty revenue row, shortly before midnight."""
+    tomorrow = date.today() + timedelta(days=1)
+    daily_menu_variants(tomorrow)
+    open_revenue_day(tomorrow)
+
+
+def prewarm_today():
+    """Rebuilds today's menu body if a menu change since midnight invalidated it, before the lunch rush."""
+    today = date.today()
+    daily_menu_variants(today)
+    open_revenue_day(today)
+
+
+def rollup_revenue():
+    """Recomputes the DailyRevenue rows of today and yesterday (payments can arrive after midnight)."""
+    today = date.today()
+    for day in (today - timedelta(days=1), today):
+        rollup_revenue_day(day)
+
+
+def confirm_preorders():
+    """Confirms and prices tomorrow's pre-orders once they close, and prints what the kitchen cooks."""
+    result = confirm_day(date.today() + timedelta(days=1))
+    dishes = ', '.join(f"{row['quantity']} x {row['meal_name']}" for row in result['kitchen']) or 'nothing'
+    print(f"Pre-orders for {result['date']}: confirmed {result['confirmed']}, re-priced {result['repriced']}; kitchen: {dishes}.")
+
+
+def cleanup():
+    """Deletes delivered outbox events older than OUTBOX_RETENTION_DAYS, on every shard."""
+    cutoff = timezone.now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    deleted = sum(OrderEvent.objects.using(alias).filter(dispatched_at__lt=cutoff).delete()[0] for alias in shards())
+    print(f"Cleanup: deleted {deleted} delivered order events older than {cutoff:%Y-%m-%d}.")
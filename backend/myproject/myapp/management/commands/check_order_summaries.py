@@ -0,0 +1,70 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.models import Order
+from myapp.sharding import shards
+from myapp.summaries import build_order_summary
+
+
+class Command(BaseCommand):
+    help = "Verifies each Order.summary snapshot against the order's OrderItem rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite mismatched summaries from the OrderItem rows.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        checked = 0
+        mismatched = []
+        orphaned = []
+        for alias in shards():
+            checked += self.check_shard(alias, options, mismatched, orphaned)
+
+        self.stdout.write(f"Checked {checked} orders, {len(mismatched)} mismatched, {len(orphaned)} without a customer.")
+        if mismatched and not options['fix']:
+            raise CommandError(f"{len(mismatched)} order summaries are out of date. Re-run with --fix to rewrite them.")
+        if mismatched:
+            self.stdout.write(self.style.SUCCESS(f"Rewrote {len(mismatched)} order summaries."))
+
+    def check_shard(self, alias, options, mismatched, orphaned):
+        batch_size = options['batch_size']
+        # Users live in the default database, so they are looked up per batch rather than joined
+        orders = Order.objects.using(alias).only('id', 'summary', 'user_id').prefetch_related('items').order_by('id')
+        users = User.objects.only('id', 'username', 'first_name', 'email')
+
+        checked = 0
+        last_id = 0
+        # Keyset pagination keeps memory flat no matter how many orders exist.
+        while True:
+            batch = list(orders.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            batch_users = users.in_bulk({order.user_id for order in batch})
+            to_fix = []
+            for order in batch:
+                # Orders have no foreign key constraint to their user (migration 0011), so the user may be gone
+                user = batch_users.get(order.user_id)
+                if user is None:
+                    orphaned.append(order.id)
+                    self.stdout.write(f"Order {order.id}: its customer (user {order.user_id}) no longer exists.")
+                    continue
+                summary = order.summary
+                rebuilt = build_order_summary(user, order.items.all())
+                if not summary.get('customer_name') or 'user_email' not in summary:
+                    problem = 'summary is missing'
+                elif summary.get('items') != rebuilt['items']:
+                    problem = 'summary does not match its items'
+                    # Keep the customer snapshot taken at checkout.
+                    rebuilt = {**summary, 'items': rebuilt['items']}
+                else:
+                    continue
+                mismatched.append(order.id)
+                self.stdout.write(f"Order {order.id}: {problem}.")
+                if options['fix']:
+                    order.summary = rebuilt
+                    to_fix.append(order)
+            if to_fix:
+                Order.objects.using(alias).bulk_update(to_fix, ['summary'])
+            checked += len(batch)
+            last_id = batch[-1].id
+        return checked
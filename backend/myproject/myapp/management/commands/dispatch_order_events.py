@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from myapp.outbox import dispatch_batch, outbox_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Drains the order event outbox and delivers each event to the OUTBOX_CONSUMERS. "
+        "Several workers may run at once: batches are claimed with SELECT ... FOR UPDATE SKIP LOCKED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='events per batch (default: OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--interval', type=float, default=1.0, help='seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='drain what is due now, then exit')
+        parser.add_argument('--metrics-every', type=float, default=60.0, help='seconds between metrics lines')
+
+    def handle(self, *args, **options):
+        totals = {'claimed': 0, 'dispatched': 0, 'retried': 0, 'failed': 0, 'seconds': 0.0}
+        last_metrics = time.monotonic()
+        try:
+            while True:
+                close_old_connections()
+                result = dispatch_batch(options['batch_size'])
+                for key in totals:
+                    totals[key] += result[key]
+                if result['claimed']:
+                    rate = result['claimed'] / result['seconds'] if result['seconds'] else 0
+                    self.stdout.write(
+                        f"Batch: {result['dispatched']} dispatched, {result['retried']} to retry, "
+                        f"{result['failed']} failed ({rate:,.0f} events/s)."
+                    )
+                if time.monotonic() - last_metrics >= options['metrics_every']:
+                    self.stdout.write(f"Outbox: {outbox_metrics()}")
+                    last_metrics = time.monotonic()
+                if not result['claimed']:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dispatched {totals['dispatched']} events; {totals['retried']} retries scheduled, "
+            f"{totals['failed']} given up."
+        ))
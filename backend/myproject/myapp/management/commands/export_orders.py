@@ -0,0 +1,32 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.exports import iter_orders_csv
+
+
+class Command(BaseCommand):
+    help = "Streams every order line placed in a date range as CSV, for accounting."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='first day, YYYY-MM-DD')
+        parser.add_argument('--to', dest='end', required=True, help='last day (inclusive), YYYY-MM-DD')
+        parser.add_argument('--output', '-o', help='file to write; defaults to stdout')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError('Dates must use YYYY-MM-DD.')
+        if end < start:
+            raise CommandError('--to must not be before --from.')
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for chunk in iter_orders_csv(start, end):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myapp.profiling import HEADER, make_token
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints a signed header value that makes ProfilingMiddleware profile the requests carrying it. "
+        "Valid for PROFILING_TOKEN_MAX_AGE seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('label', help='who is profiling, recorded with each capture (e.g. your email)')
+
+    def handle(self, *args, **options):
+        token = make_token(options['label'])
+        minutes = settings.PROFILING_TOKEN_MAX_AGE // 60
+        self.stderr.write(f"Send this header with the requests to profile (valid for {minutes} minutes):")
+        self.stdout.write(f"{HEADER}: {token}")
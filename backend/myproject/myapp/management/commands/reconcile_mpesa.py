@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.reconciliation import BATCH_SIZE, read_statement, reconcile
+
+
+class Command(BaseCommand):
+    help = "Reconciles the orders' payments with an M-Pesa settlement statement (CSV or JSON Lines)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help='statement file; .csv, or .jsonl/.ndjson/.json with one JSON object per line')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='defaults to the file extension')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing anything.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options['statement'])
+        fmt = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+
+        def report(mismatch):
+            reference = mismatch.transaction_id or f'order {mismatch.order_id}'
+            self.stdout.write(f"Line {mismatch.line} ({reference}): {mismatch.problem}.")
+
+        try:
+            # utf-8-sig: statements exported from spreadsheets often start with a BOM
+            with open(path, newline='', encoding='utf-8-sig') as statement:
+                result = reconcile(
+                    read_statement(statement, fmt), apply=not options['dry_run'],
+                    batch_size=options['batch_size'], on_mismatch=report,
+                )
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        verb = 'Would correct' if options['dry_run'] else 'Corrected'
+        self.stdout.write(
+            f"Read {result['lines']} statement lines: {result['matched']} already agree. "
+            f"{verb} {result['settled']} unrecorded payments and {result['reversed']} reversed ones."
+        )
+        if result['days']:
+            self.stdout.write(f"Rolled up revenue again for {', '.join(result['days'])}.")
+        if result['mismatched']:
+            raise CommandError(f"{result['mismatched']} statement lines do not match the orders; see above.")
+        self.stdout.write(self.style.SUCCESS('Statement reconciled.'))
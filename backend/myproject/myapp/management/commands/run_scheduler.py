@@ -0,0 +1,45 @@
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.scheduler import Scheduler, load_jobs, require_shared_caches, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the periodic jobs in SCHEDULER_JOBS (prewarming, rollups, cleanup) as a daemon. "
+        "Several schedulers may run at once: each slot is claimed through SCHEDULER_LOCK_CACHE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', metavar='JOB', help='run one job now, ignoring its schedule and lock, then exit')
+        parser.add_argument('--list', action='store_true', help='list the configured jobs and exit')
+
+    def handle(self, *args, **options):
+        jobs = load_jobs()
+        if options['list']:
+            for job in jobs:
+                schedule = f'every {job.every}s' if job.every is not None else f'daily at {job.at:%H:%M}'
+                self.stdout.write(f"{job.name}: {schedule}, jitter {job.jitter}s")
+            return
+
+        if options['run']:
+            job = next((job for job in jobs if job.name == options['run']), None)
+            if job is None:
+                raise CommandError(f"Unknown job {options['run']!r}. Available: {', '.join(job.name for job in jobs)}.")
+            if run_job(job) == 'failed':
+                raise CommandError(f"Job {job.name} failed.")
+            return
+
+        # This process serves no requests: its locks and prewarmed bodies must be in shared caches
+        try:
+            require_shared_caches()
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Scheduling {len(jobs)} jobs: {', '.join(job.name for job in jobs)}.")
+        try:
+            Scheduler(jobs).run_forever(threading.Event())
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Scheduler stopped."))
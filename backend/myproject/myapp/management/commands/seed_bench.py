@@ -0,0 +1,327 @@
+import csv
+import io
+import json
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from myapp.cache import bump_catalogue
+from myapp.models import DailyMenu, Meal, Order, OrderItem
+from myapp.money import format_cents
+
+FIRST_NAMES = [
+    'Amina', 'Brian', 'Chao', 'Daniel', 'Esther', 'Fatuma', 'George', 'Halima', 'Ivan', 'Joy',
+    'Kevin', 'Lucy', 'Mercy', 'Njeri', 'Otieno', 'Priya', 'Quinn', 'Rose', 'Samuel', 'Wanjiru',
+]
+
+DISHES = {
+    'Main': ['Pilau', 'Biryani', 'Ugali & Sukuma', 'Beef Stew', 'Chicken Curry', 'Fish Fillet', 'Lasagna', 'Burger', 'Nyama Choma', 'Githeri'],
+    'Side': ['Chapati', 'Fries', 'Kachumbari', 'Rice', 'Mashed Potatoes', 'Coleslaw', 'Garlic Bread'],
+    'Salad': ['Garden Salad', 'Caesar Salad', 'Avocado Salad', 'Greek Salad'],
+    'Drink': ['Passion Juice', 'Mango Juice', 'Chai', 'Coffee', 'Soda', 'Water'],
+    'Dessert': ['Mandazi', 'Fruit Salad', 'Chocolate Cake', 'Ice Cream'],
+}
+STYLES = ['Classic', 'Spicy', 'Grilled', 'Home-style', 'Coastal', 'Vegan', 'Special', 'Smoky', 'Herbed', 'Double']
+PRICE_RANGES = {'Main': (350, 1200), 'Side': (80, 300), 'Salad': (200, 600), 'Drink': (50, 250), 'Dessert': (100, 400)}
+
+# Order time of day: (share of orders, mean hour, standard deviation in hours).
+# Most orders land in the lunch window, with smaller breakfast and dinner peaks.
+ORDER_PEAKS = [(0.65, 12.75, 0.75), (0.15, 8.5, 0.75), (0.20, 19.0, 1.0)]
+
+# ((status, payment_status), weight) for orders placed before today
+PAST_OUTCOMES = [
+    (('completed', 'completed'), 88),
+    (('cancelled', 'failed'), 5),
+    (('cancelled', 'pending'), 4),
+    (('ready', 'completed'), 3),
+]
+TODAY_OUTCOMES = [
+    (('pending', 'pending'), 30),
+    (('confirmed', 'completed'), 35),
+    (('preparing', 'completed'), 20),
+    (('ready', 'completed'), 10),
+    (('completed', 'completed'), 5),
+]
+
+ORDER_COLUMNS = ['id', 'user_id', 'order_date', 'menu_date', 'total_amount_cents', 'status', 'payment_status', 'customer_name', 'customer_email', 'summary']
+ITEM_COLUMNS = ['id', 'order_id', 'meal_id', 'meal_name', 'price_at_order_cents', 'quantity']
+
+
+def zipf_cum_weights(count, exponent):
+    """Cumulative weights where the rank-r entry is chosen proportionally to 1 / r**exponent."""
+    total = 0.0
+    cumulative = []
+    for rank in range(1, count + 1):
+        total += 1.0 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic dataset for benchmarking: users, meals, daily menus, orders and order items, "
+        "with lunch-time peaks and a long tail of dish popularity. Orders and items are written with COPY "
+        "on Postgres and with batched executemany INSERTs elsewhere."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--meals', type=int, default=200)
+        parser.add_argument('--days', type=int, default=30, help='days of menus and orders, ending today')
+        parser.add_argument('--menu-size', type=int, default=25, help='meals on each daily menu')
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--items-per-order', type=float, default=2.0, help='mean number of lines per order')
+        parser.add_argument('--batch-size', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--no-copy', action='store_true', help='use executemany INSERTs even on Postgres')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['days'] < 1 or options['items_per_order'] < 1:
+            raise CommandError('--users, --days and --items-per-order must be at least 1.')
+        if options['meals'] < options['menu_size']:
+            raise CommandError('--meals must be at least --menu-size.')
+        if settings.ORDER_SHARDS != ['default']:
+            # Orders are written with explicit ids straight into the default database
+            raise CommandError('seed_bench only supports an unsharded database (ORDER_SHARDS = ["default"]).')
+
+        self.rng = random.Random(options['seed'])
+        self.tz = timezone.get_current_timezone()
+        self.batch_size = options['batch_size']
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        started = time.perf_counter()
+
+        users = self.seed_users(options['users'])
+        meals = self.seed_meals(options['meals'])
+        menus = self.seed_menus(meals, options['days'], options['menu_size'])
+        bump_catalogue()  # bulk_create() sends no signals; drop the cached menus and search indexes
+        order_count, item_count = self.seed_orders(users, menus, options['orders'], options['items_per_order'])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(meals)} meals, {len(menus)} daily menus, "
+            f"{order_count} orders and {item_count} order items in {elapsed:.1f}s "
+            f"({item_count / elapsed:,.0f} items/s, {'COPY' if self.use_copy else 'executemany'})."
+        ))
+
+    # --- Users, meals and menus ---
+
+    def seed_users(self, count):
+        first_id = (User.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        password = make_password('benchpass')  # Hash once; every bench user shares it
+        users = []
+        for user_id in range(first_id, first_id + count):
+            email = f'bench{user_id}@example.com'
+            users.append(User(
+                id=user_id, username=email, email=email, password=password,
+                first_name=self.rng.choice(FIRST_NAMES), date_joined=timezone.now(),
+            ))
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        self.reset_sequence(User)
+        self.stdout.write(f"Created {count} users.")
+        return [(user.id, user.first_name, user.email) for user in users]
+
+    def seed_meals(self, count):
+        first_id = (Meal.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        categories = list(DISHES)
+        meals = []
+        for offset in range(count):
+            category = self.rng.choices(categories, weights=[5, 3, 2, 2, 1])[0]
+            low, high = PRICE_RANGES[category]
+            name = f"{self.rng.choice(STYLES)} {self.rng.choice(DISHES[category])} #{first_id + offset}"
+            meals.append(Meal(
+                id=first_id + offset, name=name, description=f'{name}, freshly prepared.',
+                price_cents=self.rng.randrange(low, high, 10) * 100, category=category,
+            ))
+        Meal.objects.bulk_create(meals, batch_size=self.batch_size)
+        self.reset_sequence(Meal)
+        self.stdout.write(f"Created {count} meals.")
+        return [(meal.id, meal.name, meal.price_cents) for meal in meals]
+
+    def seed_menus(self, meals, days, menu_size):
+        """
+        Returns {date: [(meal_id, name, price_cents), ...]} ordered from most to least
+        popular. Dates that already have a menu keep it.
+        """
+        today = timezone.localdate()
+        dates = [today - timedelta(days=offset) for offset in range(days)]
+        existing = {menu.date: menu for menu in DailyMenu.objects.filter(date__in=dates).prefetch_related('meals')}
+        new_dates = [day for day in dates if day not in existing]
+        DailyMenu.objects.bulk_create([DailyMenu(date=day) for day in new_dates], batch_size=self.batch_size)
+        created = {menu.date: menu for menu in DailyMenu.objects.filter(date__in=new_dates)}
+
+        # A core of staples is on every menu; the rest of each menu rotates.
+        staples = meals[:max(1, menu_size // 3)]
+        menus = {}
+        through_rows = []
+        MenuMeal = DailyMenu.meals.through
+        for day in dates:
+            if day in existing:
+                menus[day] = [(meal.id, meal.name, meal.price_cents) for meal in existing[day].meals.all()]
+                continue
+            rotating = self.rng.sample(meals[len(staples):], menu_size - len(staples))
+            menu = staples + rotating
+            self.rng.shuffle(menu)  # Popularity rank is independent of the dish
+            menus[day] = menu
+            through_rows.extend(MenuMeal(dailymenu_id=created[day].id, meal_id=meal[0]) for meal in menu)
+        MenuMeal.objects.bulk_create(through_rows, batch_size=self.batch_size)
+        self.stdout.write(f"Created {len(new_dates)} daily menus.")
+        return {day: meals for day, meals in menus.items() if meals}
+
+    # --- Orders and items ---
+
+    def order_datetime(self, day):
+        share = self.rng.random()
+        for weight, mean, deviation in ORDER_PEAKS:
+            share -= weight
+            if share <= 0:
+                break
+        hour = min(max(self.rng.gauss(mean, deviation), 6.0), 22.99)
+        return timezone.make_aware(datetime.combine(day, dt_time()) + timedelta(hours=hour), self.tz)
+
+    def order_times(self, per_day):
+        """Yields (day, datetime) for every order, in chronological order."""
+        for day, count in sorted(per_day.items()):
+            for placed_at in sorted(self.order_datetime(day) for _ in range(count)):
+                yield day, placed_at
+
+    def seed_orders(self, users, menus, count, items_per_order):
+        rng = self.rng
+        today = timezone.localdate()
+        days = sorted(menus)
+        menu_weights = {day: zipf_cum_weights(len(menus[day]), 1.1) for day in days}
+        # A few regulars place most of the orders
+        user_weights = zipf_cum_weights(len(users), 0.8)
+        past_outcomes, past_weights = zip(*PAST_OUTCOMES)
+        today_outcomes, today_weights = zip(*TODAY_OUTCOMES)
+        extra_lines = items_per_order - 1
+
+        next_order_id = (Order.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        next_item_id = (OrderItem.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        order_rows, item_rows = [], []
+        item_count = 0
+        report_every = max(count // 10, 1)
+
+        # Orders are generated in time order, as real ids grow with order_date.
+        # Weekends see fewer orders than weekdays.
+        day_weights = [0.6 if day.weekday() >= 5 else 1.0 for day in days]
+        per_day = dict.fromkeys(days, 0)
+        for day in rng.choices(days, weights=day_weights, k=count):
+            per_day[day] += 1
+
+        index = 0
+        for day, placed_at in self.order_times(per_day):
+            user_id, first_name, email = rng.choices(users, cum_weights=user_weights)[0]
+            if day == today:
+                status, payment_status = rng.choices(today_outcomes, weights=today_weights)[0]
+            else:
+                status, payment_status = rng.choices(past_outcomes, weights=past_weights)[0]
+
+            # 1 + geometric number of extra lines, so the mean is items_per_order
+            lines = 1
+            while extra_lines and rng.random() < extra_lines / (extra_lines + 1):
+                lines += 1
+            lines = min(lines, len(menus[day]))
+            picked = {}  # distinct dishes, in pick order
+            while len(picked) < lines:
+                picked[rng.choices(menus[day], cum_weights=menu_weights[day])[0]] = None
+
+            order_id = next_order_id
+            next_order_id += 1
+            total = 0
+            summary_items = []
+            for meal_id, meal_name, price in picked:
+                quantity = 1 + (rng.random() < 0.15) + (rng.random() < 0.05)
+                line_total = price * quantity
+                total += line_total
+                item_rows.append((next_item_id, order_id, meal_id, meal_name, price, quantity))
+                next_item_id += 1
+                summary_items.append({
+                    'meal_name': meal_name, 'quantity': quantity, 'price_at_order': format_cents(price),
+                    'total_item_price': format_cents(line_total), 'meal_id': meal_id,
+                })
+            summary = {'customer_name': first_name, 'user_email': email, 'items': summary_items}
+            order_rows.append((order_id, user_id, placed_at, day, total, status, payment_status, first_name, email, summary))
+
+            if len(item_rows) >= self.batch_size:
+                item_count += self.flush(order_rows, item_rows)
+                order_rows, item_rows = [], []
+            index += 1
+            if index % report_every == 0:
+                self.stdout.write(f"  {index}/{count} orders generated...")
+
+        item_count += self.flush(order_rows, item_rows)
+        self.reset_sequence(Order)
+        self.reset_sequence(OrderItem)
+        return count, item_count
+
+    def flush(self, order_rows, item_rows):
+        if not order_rows:
+            return 0
+        write = self.copy_rows if self.use_copy else self.insert_rows
+        with transaction.atomic():
+            write(Order, ORDER_COLUMNS, order_rows)
+            write(OrderItem, ITEM_COLUMNS, item_rows)
+        return len(item_rows)
+
+    def insert_rows(self, model, columns, rows):
+        # One prepared INSERT run over the whole batch. bulk_create would split it into
+        # statements of at most 999 parameters on SQLite and build a model per row, which
+        # is several times slower at this volume. It would also overwrite order_date
+        # through auto_now_add.
+        ops = connection.ops
+        adapters = []
+        for column in columns:
+            internal_type = model._meta.get_field(column).get_internal_type()
+            if internal_type == 'DateTimeField':
+                adapters.append(ops.adapt_datetimefield_value)
+            elif internal_type == 'DateField':
+                adapters.append(ops.adapt_datefield_value)
+            elif internal_type == 'JSONField':
+                adapters.append(json.dumps)
+            else:
+                adapters.append(None)
+        adapted = [
+            [value if adapt is None else adapt(value) for adapt, value in zip(adapters, row)]
+            for row in rows
+        ]
+        db_columns = ', '.join(ops.quote_name(model._meta.get_field(column).column) for column in columns)
+        placeholders = ', '.join(['%s'] * len(columns))
+        sql = f'INSERT INTO {ops.quote_name(model._meta.db_table)} ({db_columns}) VALUES ({placeholders})'
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, adapted)
+
+    def copy_rows(self, model, columns, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                json.dumps(value) if isinstance(value, dict) else value.isoformat() if isinstance(value, datetime) else value
+                for value in row
+            ])
+        buffer.seek(0)
+        db_columns = ', '.join(connection.ops.quote_name(model._meta.get_field(column).column) for column in columns)
+        sql = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({db_columns}) FROM STDIN WITH (FORMAT csv)'
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):  # psycopg2
+                raw.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    def reset_sequence(self, model):
+        # Rows were inserted with explicit ids, so move the backend's id sequence past them.
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
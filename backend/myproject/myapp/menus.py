@@ -0,0 +1,90 @@
+# myapp/menus.py
+"""
+Reading and planning daily menus over date ranges.
+
+Reads cost a fixed number of queries however many days are requested. Writes
+diff the requested meal sets against the current ``DailyMenu.meals`` through
+rows and only insert added meals and delete removed ones, all in one transaction.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_catalogue
+from .models import DailyMenu, Meal
+
+# Longest range a single GET may ask for
+MAX_MENU_RANGE_DAYS = 31
+
+MenuMeal = DailyMenu.meals.through
+
+
+def menus_for_range(start, end):
+    """
+    Returns [(date, [Meal, ...]), ...] for every date from start to end inclusive,
+    with an empty list for dates that have no menu. Two queries in total.
+    """
+    menus = DailyMenu.objects.filter(date__range=(start, end)).prefetch_related('meals')
+    meals_by_date = {menu.date: list(menu.meals.all()) for menu in menus}
+    days = (end - start).days + 1
+    return [
+        (day, meals_by_date.get(day, []))
+        for day in (start + timedelta(days=offset) for offset in range(days))
+    ]
+
+
+@transaction.atomic
+def plan_menus(plans):
+    """
+    Sets the meals of several dates at once. ``plans`` maps date -> iterable of meal ids;
+    ids that do not match a meal are ignored. Returns {date: {'created', 'added', 'removed'}}.
+    """
+    wanted_ids = set()
+    for meal_ids in plans.values():
+        wanted_ids.update(meal_ids)
+    known_ids = set(Meal.objects.filter(id__in=wanted_ids).values_list('id', flat=True))
+    targets = {menu_date: set(meal_ids) & known_ids for menu_date, meal_ids in plans.items()}
+
+    menus = {menu.date: menu for menu in DailyMenu.objects.select_for_update().filter(date__in=targets)}
+    new_dates = [menu_date for menu_date in targets if menu_date not in menus]
+    if new_dates:
+        # ignore_conflicts: a concurrent planner may have just created the same date.
+        DailyMenu.objects.bulk_create([DailyMenu(date=menu_date) for menu_date in new_dates], ignore_conflicts=True)
+        # Re-read, since bulk_create does not return primary keys for ignored conflicts.
+        menus.update((menu.date, menu) for menu in DailyMenu.objects.filter(date__in=new_dates))
+
+    date_by_menu_id = {menu.id: menu_date for menu_date, menu in menus.items()}
+    current = {menu_date: {} for menu_date in targets}  # date -> {meal id: through row id}
+    rows = MenuMeal.objects.filter(dailymenu_id__in=date_by_menu_id).values_list('id', 'dailymenu_id', 'meal_id')
+    for row_id, menu_id, meal_id in rows:
+        current[date_by_menu_id[menu_id]][meal_id] = row_id
+
+    to_insert = []
+    to_delete = []
+    report = {}
+    for menu_date, target in targets.items():
+        existing = current[menu_date]
+        added = target - existing.keys()
+        removed = existing.keys() - target
+        menu_id = menus[menu_date].id
+        to_insert.extend(MenuMeal(dailymenu_id=menu_id, meal_id=meal_id) for meal_id in added)
+        to_delete.extend(existing[meal_id] for meal_id in removed)
+        report[menu_date] = {
+            'created': menu_date in new_dates,
+            'added': sorted(added),
+            'removed': sorted(removed),
+        }
+
+    if to_delete:
+        MenuMeal.objects.filter(id__in=to_delete).delete()
+    if to_insert:
+        MenuMeal.objects.bulk_create(to_insert)
+    changed = [menus[d].id for d, r in report.items() if r['added'] or r['removed']]
+    if changed:
+        DailyMenu.objects.filter(id__in=changed).update(updated_at=timezone.now())
+    if changed or new_dates:
+        # The through-table writes and update() above send no signals
+        transaction.on_commit(bump_catalogue)
+    return report
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2025-08-04 10:12
+
+from django.db import migrations, models
+
+TRIGRAM_INDEXES = {
+    "meal_name_trgm_idx": "name",
+    "meal_description_trgm_idx": "description",
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Trigram GIN indexes only exist on Postgres; other backends use the
+    # in-process index in myapp/search.py instead.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, column in TRIGRAM_INDEXES.items():
+        # Same expression Django emits for icontains, so the planner can use it.
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON myapp_meal '
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for index_name in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0002_meal_dailymenu_order_orderitem"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="meal",
+            index=models.Index(
+                fields=["category", "price"], name="meal_category_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="meal",
+            index=models.Index(fields=["price"], name="meal_price_idx"),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
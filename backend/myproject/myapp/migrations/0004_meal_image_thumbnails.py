@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2025-08-04 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0003_meal_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="meal",
+            name="image",
+            field=models.FileField(
+                blank=True, max_length=255, null=True, upload_to="meals/originals/"
+            ),
+        ),
+        migrations.AddField(
+            model_name="meal",
+            name="image_digest",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="meal",
+            name="thumbnails",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
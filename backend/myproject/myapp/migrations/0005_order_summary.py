@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2025-08-05 09:02
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_summaries(apps, schema_editor):
+    # Self-contained copy of myapp.summaries.build_order_summary: historical
+    # models do not carry the OrderItem.total_item_price property.
+    Order = apps.get_model("myapp", "Order")
+    orders = (
+        Order.objects.select_related("user")
+        .prefetch_related("items")
+        .order_by("id")
+    )
+    last_id = 0
+    while True:
+        batch = list(orders.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        for order in batch:
+            user = order.user
+            order.summary = {
+                "customer_name": user.first_name if user.first_name else user.username,
+                "user_email": user.email,
+                "items": [
+                    {
+                        "meal_name": item.meal_name,
+                        "quantity": item.quantity,
+                        "price_at_order": float(item.price_at_order),
+                        "total_item_price": float(item.price_at_order * item.quantity),
+                        "meal_id": item.meal_id,
+                    }
+                    for item in order.items.all()
+                ],
+            }
+        Order.objects.bulk_update(batch, ["summary"])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0004_meal_image_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="summary",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
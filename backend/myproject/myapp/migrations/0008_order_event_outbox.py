@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2025-08-07 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0007_order_admin_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=50)),
+                ("payload", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("available_at", models.DateTimeField()),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("delivered_to", models.JSONField(blank=True, default=list)),
+                ("last_error", models.TextField(blank=True)),
+                ("dispatched_at", models.DateTimeField(blank=True, null=True)),
+                ("failed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="myapp.order",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(
+                            ("dispatched_at__isnull", True), ("failed_at__isnull", True)
+                        ),
+                        fields=["available_at", "id"],
+                        name="orderevent_pending_idx",
+                    ),
+                    models.Index(
+                        fields=["dispatched_at"], name="orderevent_dispatched_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
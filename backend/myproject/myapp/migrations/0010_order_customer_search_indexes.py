@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2025-08-08 14:26
+
+from django.db import migrations
+
+TRIGRAM_INDEXES = {
+    "order_customer_name_trgm_idx": "customer_name",
+    "order_customer_email_trgm_idx": "customer_email",
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Serve the ?customer= filter of the orders list (see myapp/order_filters.py).
+    # Postgres only, like the meal search indexes of migration 0003.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, column in TRIGRAM_INDEXES.items():
+        # Same expression Django emits for icontains, so the planner can use it.
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON myapp_order "
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for index_name in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0009_daily_revenue"),
+    ]
+
+    operations = [
+        # Routed like the order table, so order shards get the indexes too
+        migrations.RunPython(
+            create_trigram_indexes, drop_trigram_indexes, hints={"model_name": "order"}
+        ),
+    ]
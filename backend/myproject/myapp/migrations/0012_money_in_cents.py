@@ -0,0 +1,188 @@
+# Generated by Django 5.2.4 on 2025-08-09 16:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import BigIntegerField, DecimalField, F
+from django.db.models.functions import Cast, Round
+
+BATCH_SIZE = 1000
+
+# model name -> (old decimal column, new cents column)
+MONEY_COLUMNS = {
+    "meal": ("price", "price_cents"),
+    "order": ("total_amount", "total_amount_cents"),
+    "orderitem": ("price_at_order", "price_at_order_cents"),
+    "dailyrevenue": ("total_revenue", "total_revenue_cents"),
+}
+
+
+def to_cents(model_name):
+    def forwards(apps, schema_editor):
+        model = apps.get_model("myapp", model_name)
+        decimal_column, cents_column = MONEY_COLUMNS[model_name]
+        # One UPDATE per table; the database does the exact decimal arithmetic
+        model.objects.using(schema_editor.connection.alias).update(
+            **{cents_column: Cast(Round(F(decimal_column) * 100), BigIntegerField())}
+        )
+
+    def backwards(apps, schema_editor):
+        model = apps.get_model("myapp", model_name)
+        decimal_column, cents_column = MONEY_COLUMNS[model_name]
+        model.objects.using(schema_editor.connection.alias).update(
+            **{
+                # A float divisor: SQLite divides two integers as integers
+                decimal_column: Cast(
+                    F(cents_column) / 100.0,
+                    DecimalField(max_digits=12, decimal_places=2),
+                )
+            }
+        )
+
+    return forwards, backwards
+
+
+def amount_string(value):
+    # Self-contained copy of myapp.money.format_cents, from the float the summary held
+    return str(Decimal(str(value)).quantize(Decimal("0.01")))
+
+
+def summary_amounts_to_strings(apps, schema_editor):
+    # Order summaries hold serialized item lines, which now carry exact amount strings
+    Order = apps.get_model("myapp", "Order")
+    orders = (
+        Order.objects.using(schema_editor.connection.alias)
+        .only("id", "summary")
+        .order_by("id")
+    )
+    last_id = 0
+    while True:
+        batch = list(orders.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        for order in batch:
+            for item in order.summary.get("items", []):
+                for key in ("price_at_order", "total_item_price"):
+                    if item.get(key) is not None:
+                        item[key] = amount_string(item[key])
+        Order.objects.using(schema_editor.connection.alias).bulk_update(
+            batch, ["summary"]
+        )
+        last_id = batch[-1].id
+
+
+def summary_amounts_to_floats(apps, schema_editor):
+    Order = apps.get_model("myapp", "Order")
+    orders = (
+        Order.objects.using(schema_editor.connection.alias)
+        .only("id", "summary")
+        .order_by("id")
+    )
+    last_id = 0
+    while True:
+        batch = list(orders.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        for order in batch:
+            for item in order.summary.get("items", []):
+                for key in ("price_at_order", "total_item_price"):
+                    if item.get(key) is not None:
+                        item[key] = float(item[key])
+        Order.objects.using(schema_editor.connection.alias).bulk_update(
+            batch, ["summary"]
+        )
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0011_unconstrained_order_relations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="meal",
+            name="price_cents",
+            field=models.BigIntegerField(
+                default=0, help_text="Price in cents (see myapp/money.py)"
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total_amount_cents",
+            field=models.BigIntegerField(default=0, help_text="Order total in cents"),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="price_at_order_cents",
+            field=models.BigIntegerField(
+                default=0, help_text="Price in cents at time of order"
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="dailyrevenue",
+            name="total_revenue_cents",
+            field=models.BigIntegerField(default=0, help_text="Revenue in cents"),
+        ),
+        # Nullable for the way back: unapplying the RemoveFields below re-adds these
+        # columns empty, before the reverse conversion fills them in
+        migrations.AlterField(
+            model_name="meal",
+            name="price",
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name="orderitem",
+            name="price_at_order",
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        # Routed like their tables, so order shards convert their own rows
+        *[
+            migrations.RunPython(
+                *to_cents(model_name), hints={"model_name": model_name}
+            )
+            for model_name in MONEY_COLUMNS
+        ],
+        migrations.RunPython(
+            summary_amounts_to_strings,
+            summary_amounts_to_floats,
+            hints={"model_name": "order"},
+        ),
+        migrations.RemoveIndex(
+            model_name="meal",
+            name="meal_category_price_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="meal",
+            name="meal_price_idx",
+        ),
+        migrations.RemoveField(
+            model_name="meal",
+            name="price",
+        ),
+        migrations.RemoveField(
+            model_name="order",
+            name="total_amount",
+        ),
+        migrations.RemoveField(
+            model_name="orderitem",
+            name="price_at_order",
+        ),
+        migrations.RemoveField(
+            model_name="dailyrevenue",
+            name="total_revenue",
+        ),
+        migrations.AddIndex(
+            model_name="meal",
+            index=models.Index(
+                fields=["category", "price_cents"], name="meal_category_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="meal",
+            index=models.Index(fields=["price_cents"], name="meal_price_idx"),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2025-08-10 10:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_menu_dates(apps, schema_editor):
+    # Every existing order was for the day it was placed: one UPDATE per database
+    Order = apps.get_model("myapp", "Order")
+    Order.objects.using(schema_editor.connection.alias).filter(
+        menu_date__isnull=True
+    ).update(menu_date=TruncDate("order_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0012_money_in_cents"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="menu_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        # Routed like the order table, so order shards backfill their own rows
+        migrations.RunPython(
+            backfill_menu_dates, migrations.RunPython.noop, hints={"model_name": "order"}
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["menu_date", "status"], name="order_menu_date_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2025-08-11 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0013_order_menu_date"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="mpesa_transaction_id",
+            field=models.CharField(blank=True, max_length=32, null=True, unique=True),
+        ),
+    ]
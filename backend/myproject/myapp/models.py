@@ -16,9 +16,14 @@ class Item(models.Model):
 class Meal(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
-    price = models.DecimalField(max_digits=10, decimal_places=2)
+    price_cents = models.BigIntegerField(help_text='Price in cents (see myapp/money.py)')
     category = models.CharField(max_length=100, blank=True, null=True)
     image_url = models.URLField(max_length=500, blank=True, null=True)
+    # Locally uploaded original, stored under its content hash (see myapp/thumbnails.py)
+    image = models.FileField(upload_to='meals/originals/', max_length=255, blank=True, null=True)
+    image_digest = models.CharField(max_length=64, blank=True, null=True)
+    # {width: {extension: storage name}}, filled in by the thumbnail workers
+    thumbnails = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -27,6 +32,11 @@ class Meal(models.Model):
 
     class Meta:
         ordering = ['name'] # Default ordering for meals
+        indexes = [
+            # Serve the category and price filters of the meal search (see myapp/search.py)
+            models.Index(fields=['category', 'price_cents'], name='meal_category_price_idx'),
+            models.Index(fields=['price_cents'], name='meal_price_idx'),
+        ]
 
 # --- DAILY MENU MODEL ---
 class DailyMenu(models.Model):
@@ -43,11 +53,14 @@ class DailyMenu(models.Model):
 
 # --- ORDER MODEL ---
 class Order(models.Model):
-    # Link to the User who placed the order
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
+    # Link to the User who placed the order. No database constraint: orders can live on
+    # another database than auth_user (see myapp/sharding.py).
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders', db_constraint=False)
     
     order_date = models.DateTimeField(auto_now_add=True)
-    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    # The DailyMenu date the order is for: the day it was placed, or a later day for a pre-order
+    menu_date = models.DateField(blank=True, null=True)
+    total_amount_cents = models.BigIntegerField(default=0, help_text='Order total in cents')
 
     # Statuses for the order lifecycle
     STATUS_CHOICES = [
@@ -67,28 +80,89 @@ class Order(models.Model):
         ('failed', 'Payment Failed'),
     ]
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
+    # M-Pesa's transaction ID (receipt number) for the payment: how settlement statements
+    # find the order (see myapp/reconciliation.py). Unique, so it is indexed.
+    mpesa_transaction_id = models.CharField(max_length=32, blank=True, null=True, unique=True)
 
     # Optional: Customer details for non-logged-in users or specific order details
     customer_name = models.CharField(max_length=255, blank=True, null=True)
     customer_email = models.EmailField(blank=True, null=True)
 
+    # Denormalized snapshot written with the order: customer name/email and the
+    # serialized item lines (see myapp/summaries.py). Lets order lists skip the joins.
+    summary = models.JSONField(default=dict, blank=True)
+
     def __str__(self):
         return f"Order {self.id} by {self.user.email} on {self.order_date.strftime('%Y-%m-%d')}"
 
     class Meta:
         ordering = ['-order_date'] # Order by most recent order first
+        indexes = [
+            # Date-range reads: revenue, CSV export
+            models.Index(fields=['order_date'], name='order_date_idx'),
+            # Admin changelist filters, already in the changelist's newest-first order
+            models.Index(fields=['status', '-order_date'], name='order_status_date_idx'),
+            models.Index(fields=['payment_status', '-order_date'], name='order_payment_date_idx'),
+            # A day's orders for the pre-order cutoff and the kitchen totals (see myapp/preorders.py)
+            models.Index(fields=['menu_date', 'status'], name='order_menu_date_status_idx'),
+        ]
 
 # --- ORDER ITEM MODEL (for meals within an order) ---
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
-    meal = models.ForeignKey(Meal, on_delete=models.SET_NULL, null=True, blank=True) # If meal is deleted, keep order item
+    # If meal is deleted, keep order item. Unconstrained like Order.user: items live on the order's shard
+    meal = models.ForeignKey(Meal, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False)
     meal_name = models.CharField(max_length=255) # Store name in case meal is deleted
-    price_at_order = models.DecimalField(max_digits=10, decimal_places=2) # Price at time of order
+    price_at_order_cents = models.BigIntegerField(help_text='Price in cents at time of order')
     quantity = models.PositiveIntegerField(default=1)
 
     def __str__(self):
         return f"{self.quantity} x {self.meal_name} for Order {self.order.id}"
 
     @property
-    def total_item_price(self):
-        return self.price_at_order * self.quantity
\ No newline at end of file
+    def total_item_price_cents(self):
+        return self.price_at_order_cents * self.quantity
+
+# --- ORDER EVENT MODEL (transactional outbox, see myapp/outbox.py) ---
+class OrderEvent(models.Model):
+    # Written in the same transaction as the order change it describes
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=50) # e.g. 'order.placed', 'order.paid'
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Delivery bookkeeping, maintained by the dispatcher
+    available_at = models.DateTimeField() # Not delivered before this time (retry backoff)
+    attempts = models.PositiveIntegerField(default=0)
+    delivered_to = models.JSONField(default=list, blank=True) # Consumers that already succeeded
+    last_error = models.TextField(blank=True)
+    dispatched_at = models.DateTimeField(blank=True, null=True) # Every consumer succeeded
+    failed_at = models.DateTimeField(blank=True, null=True) # Gave up after OUTBOX_MAX_ATTEMPTS
+
+    def __str__(self):
+        return f"{self.kind} for Order {self.order_id}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # The dispatcher's claim query only ever reads undelivered events
+            models.Index(
+                fields=['available_at', 'id'], name='orderevent_pending_idx',
+                condition=models.Q(dispatched_at__isnull=True, failed_at__isnull=True),
+            ),
+            # Throughput and lag over recent dispatches
+            models.Index(fields=['dispatched_at'], name='orderevent_dispatched_idx'),
+        ]
+
+# --- DAILY REVENUE MODEL (rollup of paid orders per day, see myapp/revenue.py) ---
+class DailyRevenue(models.Model):
+    date = models.DateField(unique=True)
+    total_revenue_cents = models.BigIntegerField(default=0, help_text='Revenue in cents')
+    total_orders = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True) # When the totals were last recomputed
+
+    def __str__(self):
+        return f"Revenue for {self.date}"
+
+    class Meta:
+        ordering = ['-date']
@@ -0,0 +1,49 @@
+# myapp/money.py
+"""
+Money as integer minor units.
+
+Every amount is stored and computed as a whole number of cents (KSh 450.00 is
+``45000``) in BigIntegerField columns named ``*_cents``. Totals are plain
+integer arithmetic, ``Sum()`` in the database adds integers, and nothing is
+rounded until an amount is shown.
+
+The API keeps its field names (``price``, ``total_amount`` ...) and sends
+amounts as exact decimal strings, ``"450.00"``, which JavaScript can display or
+parse without the binary rounding a float would pick up. Amounts coming in
+(a meal's price, the search's min_price/max_price) go through ``to_cents()``,
+which accepts at most two decimal places.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+CENTS_PER_UNIT = 100
+
+
+def to_cents(value):
+    """
+    Parses an amount (a string like "450" or "450.50", an int or a Decimal) into
+    integer cents. Raises ValueError for anything that is not a finite amount
+    with at most two decimal places.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f'Invalid amount: {value!r}.')
+    if isinstance(value, int):
+        return value * CENTS_PER_UNIT
+    try:
+        # str() first, so a float is read as it prints ("0.1"), not as its binary value
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f'Invalid amount: {value!r}. Must be a number.')
+    if not amount.is_finite():
+        raise ValueError(f'Invalid amount: {value!r}. Must be a number.')
+    cents = amount * CENTS_PER_UNIT
+    if cents != cents.to_integral_value():
+        raise ValueError(f'Invalid amount: {value!r}. Use at most two decimal places.')
+    return int(cents)
+
+
+def format_cents(cents):
+    """Integer cents as an exact decimal string with two places: 45000 -> "450.00"."""
+    sign = '-' if cents < 0 else ''
+    units, remainder = divmod(abs(cents), CENTS_PER_UNIT)
+    return f'{sign}{units}.{remainder:02d}'
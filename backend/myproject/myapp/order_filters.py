@@ -0,0 +1,105 @@
+# myapp/order_filters.py
+"""
+Server-side filters for the orders list: ``GET /api/orders/?status=pending&from=2025-08-01``.
+
+Every filter is a predicate one of the order indexes can serve:
+
+    id              primary key
+    status          order_status_date_idx (status, -order_date)
+    payment_status  order_payment_date_idx (payment_status, -order_date)
+    from / to       order_date_idx, as a half-open [from 00:00, day after to 00:00) range
+    customer        order_customer_name_trgm_idx / order_customer_email_trgm_idx
+
+Combined filters AND together, so on Postgres the planner can intersect the
+index scans (a BitmapAnd) or use a (status, -order_date) index for both the
+status and the date range. ``customer`` is an icontains match on the name or
+the email column; the trigram GIN indexes from migration 0010 are built on the
+``UPPER(col::text)`` expression Django emits for it, as the meal search's are.
+"""
+
+from datetime import date
+
+from django.db.models import Q
+
+from .exports import date_range_bounds
+from .models import Order
+
+STATUSES = {value for value, _ in Order.STATUS_CHOICES}
+PAYMENT_STATUSES = {value for value, _ in Order.PAYMENT_STATUS_CHOICES}
+
+# Trigrams need at least three characters to narrow anything down
+MIN_CUSTOMER_QUERY = 3
+MAX_LIMIT = 500
+
+
+def _choices(value, allowed, name):
+    values = [part.strip() for part in value.split(',') if part.strip()]
+    unknown = [part for part in values if part not in allowed]
+    if unknown or not values:
+        raise ValueError(f"Unknown {name}: {', '.join(unknown) or value!r}. Available: {', '.join(sorted(allowed))}.")
+    return values
+
+
+def _date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid {name} date. Use YYYY-MM-DD.')
+
+
+def parse_order_filters(params):
+    """
+    Validates the filter parameters in a QueryDict. Returns {param: value} for the
+    ones present (empty if none are), or raises ValueError with a message for the client.
+    """
+    filters = {}
+    if params.get('id'):
+        try:
+            filters['id'] = int(params['id'])
+        except ValueError:
+            raise ValueError('id must be an order ID.')
+    if params.get('status'):
+        filters['status'] = _choices(params['status'], STATUSES, 'status')
+    if params.get('payment_status'):
+        filters['payment_status'] = _choices(params['payment_status'], PAYMENT_STATUSES, 'payment_status')
+    if params.get('from'):
+        filters['from'] = _date(params['from'], 'from')
+    if params.get('to'):
+        filters['to'] = _date(params['to'], 'to')
+    if 'from' in filters and 'to' in filters and filters['to'] < filters['from']:
+        raise ValueError('to must not be before from.')
+    if params.get('customer'):
+        customer = params['customer'].strip()
+        if len(customer) < MIN_CUSTOMER_QUERY:
+            raise ValueError(f'customer must be at least {MIN_CUSTOMER_QUERY} characters.')
+        filters['customer'] = customer
+    if params.get('limit'):
+        try:
+            filters['limit'] = int(params['limit'])
+        except ValueError:
+            filters['limit'] = 0
+        if not 1 <= filters['limit'] <= MAX_LIMIT:
+            raise ValueError(f'limit must be between 1 and {MAX_LIMIT}.')
+    return filters
+
+
+def filter_orders(orders, filters):
+    """Applies parsed filters to an Order queryset (newest first, as Order.Meta orders it)."""
+    if 'id' in filters:
+        orders = orders.filter(id=filters['id'])
+    if 'status' in filters:
+        orders = orders.filter(status__in=filters['status'])
+    if 'payment_status' in filters:
+        orders = orders.filter(payment_status__in=filters['payment_status'])
+    if 'from' in filters:
+        lower, _ = date_range_bounds(filters['from'], filters['from'])
+        orders = orders.filter(order_date__gte=lower)
+    if 'to' in filters:
+        _, upper = date_range_bounds(filters['to'], filters['to'])
+        orders = orders.filter(order_date__lt=upper)
+    if 'customer' in filters:
+        customer = filters['customer']
+        orders = orders.filter(Q(customer_name__icontains=customer) | Q(customer_email__icontains=customer))
+    if 'limit' in filters:
+        orders = orders[:filters['limit']]
+    return orders
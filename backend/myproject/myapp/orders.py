@@ -0,0 +1,137 @@
+# myapp/orders.py
+"""
+Order placement and state transitions.
+
+An order enters the state machine fully formed: its total and summary are part
+of the INSERT, so placing an order never rewrites the row it just created.
+Every later change of ``status``/``payment_status`` is a compare-and-set: one
+``UPDATE ... WHERE id = %s AND status IN (...) AND payment_status IN (...)``
+that writes only the changed columns. Of two concurrent transitions from the
+same state, exactly one matches the WHERE clause; the other updates no row and
+is reported as not applied, so neither silently overwrites the other.
+
+``QuerySet.update()`` does not send ``post_save``, so transitions bump the
+customer's order-history cache version themselves. Placement and every applied
+transition also record an OrderEvent in the same transaction (see myapp/outbox.py).
+
+A pre-order (an order for a later day's menu, see myapp/preorders.py) stays
+pending until its day's cutoff, when a batch confirms it with the ``confirm``
+transition; it can be paid before or after that.
+
+Each order is written on its customer's shard and transitioned on the shard its
+id belongs to (see myapp/sharding.py); the transactions are opened there.
+"""
+
+from collections import namedtuple
+from datetime import date
+
+from django.db import transaction
+
+from .cache import bump_order_history
+from .models import Order, OrderItem
+from .money import format_cents
+from .outbox import record_event
+from .sharding import shard_for_order, shard_for_user
+from .summaries import build_order_summary
+
+INITIAL_STATE = {'status': 'pending', 'payment_status': 'pending'}
+
+# from_status / from_payment_status: states the order must be in (None: any); changes: columns to set;
+# event: kind of the OrderEvent recorded when the transition applies
+Transition = namedtuple('Transition', ['from_status', 'from_payment_status', 'changes', 'event'])
+
+TRANSITIONS = {
+    'pay': Transition(('pending', 'confirmed'), ('pending', 'failed'), {'status': 'confirmed', 'payment_status': 'completed'}, 'order.paid'),
+    'fail_payment': Transition(('pending', 'confirmed'), ('pending',), {'payment_status': 'failed'}, 'order.payment_failed'),
+    # Applied in bulk to a day's unpaid pre-orders at its cutoff (see myapp/preorders.py)
+    'confirm': Transition(('pending',), None, {'status': 'confirmed'}, 'order.confirmed'),
+    'start_preparing': Transition(('confirmed',), ('completed',), {'status': 'preparing'}, 'order.preparing'),
+    'mark_ready': Transition(('preparing',), ('completed',), {'status': 'ready'}, 'order.ready'),
+    'complete': Transition(('ready',), ('completed',), {'status': 'completed'}, 'order.completed'),
+    'cancel': Transition(('pending', 'confirmed'), None, {'status': 'cancelled'}, 'order.cancelled'),
+}
+
+# applied: whether this call changed the order. status/payment_status: the order's state
+# afterwards, or None if no such order exists (or it is not the given user's).
+TransitionResult = namedtuple('TransitionResult', ['applied', 'order_id', 'status', 'payment_status'])
+
+
+def place_order(user, meal, quantity, menu_date=None):
+    """Creates a pending order with one line on the customer's shard, writing each row once. Returns the order."""
+    return place_order_lines(user, [(meal, quantity)], menu_date)
+
+
+def place_order_lines(user, lines, menu_date=None):
+    """
+    Creates a pending order with one line per (meal, quantity) on the customer's shard:
+    one INSERT for the order and one bulk INSERT for its items. ``menu_date`` is the
+    day the order is for (today if not given). Returns the order.
+    """
+    shard = shard_for_user(user.id)
+    items = [
+        OrderItem(meal=meal, meal_name=meal.name, price_at_order_cents=meal.price_cents, quantity=quantity)
+        for meal, quantity in lines
+    ]
+    with transaction.atomic(using=shard):
+        order = Order.objects.using(shard).create(
+            user=user,
+            menu_date=menu_date or date.today(),
+            customer_name=user.first_name if user.first_name else user.username,
+            customer_email=user.email,
+            total_amount_cents=sum(item.total_item_price_cents for item in items),
+            summary=build_order_summary(user, items),
+            **INITIAL_STATE,
+        )
+        for item in items:
+            item.order = order
+        OrderItem.objects.using(shard).bulk_create(items)
+        record_event(order.id, 'order.placed', {
+            'order_id': order.id,
+            'user_id': user.id,
+            'total_amount': format_cents(order.total_amount_cents),
+            'menu_date': order.menu_date.isoformat(),
+            'items': order.summary['items'],
+        }, using=shard)
+    return order
+
+
+def apply_transition(order_id, action, user=None, extra_changes=None):
+    """
+    Applies TRANSITIONS[action] to one order if it is in an allowed state, optionally
+    only if it belongs to ``user``. ``extra_changes`` are written in the same UPDATE
+    (e.g. a payment's transaction ID). Returns a TransitionResult.
+    """
+    try:
+        transition = TRANSITIONS[action]
+    except KeyError:
+        raise ValueError(f'Unknown order transition: {action!r}')
+
+    shard = shard_for_order(order_id)
+    if shard is None: # Not an id any shard allocates
+        return TransitionResult(False, order_id, None, None)
+    orders = Order.objects.using(shard).filter(id=order_id)
+    if user is not None:
+        orders = orders.filter(user=user)
+    guarded = orders
+    if transition.from_status is not None:
+        guarded = guarded.filter(status__in=transition.from_status)
+    if transition.from_payment_status is not None:
+        guarded = guarded.filter(payment_status__in=transition.from_payment_status)
+
+    with transaction.atomic(using=shard):
+        applied = guarded.update(**transition.changes, **(extra_changes or {})) == 1
+        # Read back in the same transaction: when applied, our UPDATE still holds the row lock.
+        row = orders.values_list('id', 'user_id', 'status', 'payment_status').first()
+        if row is None:
+            return TransitionResult(False, order_id, None, None)
+        order_id, user_id, status, payment_status = row
+        if applied:
+            record_event(order_id, transition.event, {
+                'order_id': order_id,
+                'user_id': user_id,
+                'action': action,
+                'status': status,
+                'payment_status': payment_status,
+            }, using=shard)
+            transaction.on_commit(lambda: bump_order_history(user_id), using=shard)
+    return TransitionResult(applied, order_id, status, payment_status)
@@ -0,0 +1,169 @@
+# myapp/outbox.py
+"""
+Transactional outbox for order events.
+
+Code that changes an order calls ``record_event()`` inside the same transaction,
+so an event exists if and only if the change committed. Nothing reacts on the
+request path: the ``dispatch_order_events`` worker drains the table in batches.
+
+Each batch is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so several
+workers can run side by side without delivering the same event twice at once.
+Every event is handed to each consumer in OUTBOX_CONSUMERS (dotted paths to
+callables taking the OrderEvent). Consumers that succeed are remembered on the
+event; if another one fails, only the failed ones see the event again, after an
+exponential backoff, until OUTBOX_MAX_ATTEMPTS is reached. Delivery is
+at-least-once: a consumer may see an event again if the worker dies mid-batch.
+
+Events live on their order's shard (see myapp/sharding.py). A batch is claimed
+and settled on one shard at a time; the metrics add up every shard.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OrderEvent
+from .sharding import gather, shards
+
+# Undelivered events: the condition of orderevent_pending_idx
+PENDING = {'dispatched_at__isnull': True, 'failed_at__isnull': True}
+
+_consumers = None
+
+
+def record_event(order_id, kind, payload, using=None):
+    """Adds an event to the outbox. Call it inside the transaction that changes the order, on its shard."""
+    return OrderEvent.objects.using(using).create(order_id=order_id, kind=kind, payload=payload, available_at=timezone.now())
+
+
+def get_consumers():
+    """[(dotted path, callable)] from OUTBOX_CONSUMERS, imported once."""
+    global _consumers
+    if _consumers is None or [path for path, _ in _consumers] != list(settings.OUTBOX_CONSUMERS):
+        _consumers = [(path, import_string(path)) for path in settings.OUTBOX_CONSUMERS]
+    return _consumers
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt, doubling each time up to OUTBOX_RETRY_MAX_SECONDS."""
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_SECONDS))
+
+
+def deliver(event, consumers):
+    """Hands the event to each consumer it has not reached yet. Returns the error messages of the failures."""
+    errors = []
+    for path, consumer in consumers:
+        if path in event.delivered_to:
+            continue
+        try:
+            # A savepoint per consumer: a failed consumer query must not break the batch transaction
+            with transaction.atomic(using=event._state.db):
+                consumer(event)
+        except Exception as e:
+            errors.append(f'{path}: {e.__class__.__name__}: {e}')
+        else:
+            event.delivered_to.append(path)
+    return errors
+
+
+def dispatch_batch(batch_size=None):
+    """
+    Claims up to ``batch_size`` due events on every shard, delivers them and records
+    the outcome. Returns {'claimed', 'dispatched', 'retried', 'failed', 'seconds'}.
+    """
+    started = time.perf_counter()
+    totals = {'claimed': 0, 'dispatched': 0, 'retried': 0, 'failed': 0}
+    for alias in shards():
+        result = dispatch_shard_batch(alias, batch_size)
+        for key in totals:
+            totals[key] += result[key]
+    return {**totals, 'seconds': time.perf_counter() - started}
+
+
+def dispatch_shard_batch(using, batch_size=None):
+    """Claims up to ``batch_size`` due events on one shard, delivers them and records the outcome."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    consumers = get_consumers()
+    dispatched, retried, failed = [], [], []
+
+    with transaction.atomic(using=using):
+        now = timezone.now()
+        events = list(
+            OrderEvent.objects.using(using)
+            .select_for_update(skip_locked=True)
+            .filter(available_at__lte=now, **PENDING)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        for event in events:
+            errors = deliver(event, consumers)
+            if not errors:
+                dispatched.append(event.id)
+                continue
+            event.attempts += 1
+            event.last_error = '\n'.join(errors)[:2000]
+            if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                event.failed_at = now
+                failed.append(event)
+            else:
+                event.available_at = now + retry_delay(event.attempts)
+                retried.append(event)
+
+        if dispatched:
+            OrderEvent.objects.using(using).filter(id__in=dispatched).update(dispatched_at=timezone.now())
+        if retried or failed:
+            OrderEvent.objects.using(using).bulk_update(
+                retried + failed, ['attempts', 'last_error', 'available_at', 'failed_at', 'delivered_to'],
+            )
+
+    for event in failed:
+        print(f"Giving up on {event} (event {event.id}) after {event.attempts} attempts: {event.last_error}")
+    return {
+        'claimed': len(events),
+        'dispatched': len(dispatched),
+        'retried': len(retried),
+        'failed': len(failed),
+    }
+
+
+def _shard_metrics(using, now, since):
+    events = OrderEvent.objects.using(using)
+    pending = events.filter(**PENDING)
+    recent = events.filter(dispatched_at__gte=since)
+    return {
+        'pending': pending.count(),
+        'due': pending.filter(available_at__lte=now).count(),
+        'retrying': pending.filter(attempts__gt=0).count(),
+        'failed': events.filter(failed_at__isnull=False).count(),
+        'oldest': pending.aggregate(oldest=Min('created_at'))['oldest'],
+        'dispatched': recent.count(),
+        'lag': recent.aggregate(lag=Avg(F('dispatched_at') - F('created_at')))['lag'],
+    }
+
+
+def outbox_metrics(window_minutes=5):
+    """Backlog, lag and throughput of the outbox, from the tables themselves so every worker agrees."""
+    now = timezone.now()
+    since = now - timedelta(minutes=window_minutes)
+    per_shard = gather(lambda alias: _shard_metrics(alias, now, since))
+    oldest = min((metrics['oldest'] for metrics in per_shard if metrics['oldest']), default=None)
+    recent_count = sum(metrics['dispatched'] for metrics in per_shard)
+    # Average lag over every recent dispatch: weight each shard's average by its count
+    lag_seconds = sum(
+        metrics['lag'].total_seconds() * metrics['dispatched'] for metrics in per_shard if metrics['lag'] is not None
+    )
+    return {
+        'pending': sum(metrics['pending'] for metrics in per_shard),
+        'due': sum(metrics['due'] for metrics in per_shard),
+        'retrying': sum(metrics['retrying'] for metrics in per_shard),
+        'failed': sum(metrics['failed'] for metrics in per_shard),
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 3) if oldest else None,
+        'window_minutes': window_minutes,
+        'dispatched_in_window': recent_count,
+        'events_per_second': round(recent_count / (window_minutes * 60), 3),
+        'avg_lag_seconds': round(lag_seconds / recent_count, 3) if recent_count else None,
+    }
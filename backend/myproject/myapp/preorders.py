@@ -0,0 +1,187 @@
+# myapp/preorders.py
+"""
+Pre-orders: orders for a later day's menu, confirmed in one batch at a cutoff.
+
+A customer may order from any DailyMenu up to PREORDER_DAYS_AHEAD days ahead,
+until PREORDER_CUTOFF (HH:MM, server time) on the evening before. The order is
+written like any other (``Order.menu_date`` is the day it is for), priced at
+the meal's price of the moment, and stays pending. Spreading these writes over
+the week takes them out of the lunch-time rush.
+
+At the cutoff, the ``confirm_preorders`` job (see myapp/jobs.py) runs
+``confirm_day()`` for tomorrow. On each order shard, in one transaction:
+
+    1. the day's pending orders are locked and their ids read;
+    2. lines whose meal changed price since the order was placed are re-priced
+       with one UPDATE ... CASE, the totals of those orders recomputed with one
+       UPDATE from a SUM subquery, and their summaries rewritten;
+    3. the orders move to ``confirmed`` with one UPDATE per chunk of ids, still
+       guarded by ``status = 'pending'``, and their OrderEvents are bulk inserted.
+
+Orders that were paid before the cutoff are already confirmed at the price they
+paid and are left alone. The job is idempotent: a second run finds nothing
+pending. ``kitchen_totals()`` then gives the quantity of every dish for the day,
+which is what the kitchen cooks from.
+"""
+
+from datetime import date, datetime, timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_order_history
+from .models import DailyMenu, Meal, Order, OrderEvent, OrderItem
+from .orders import TRANSITIONS
+from .sharding import gather, shards
+from .summaries import serialize_order_item
+
+# Order ids per UPDATE, within SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 500
+
+
+def cutoff_for(day):
+    """When pre-orders for ``day`` close: PREORDER_CUTOFF on the day before (a naive server-time datetime)."""
+    at = datetime.strptime(settings.PREORDER_CUTOFF, '%H:%M').time()
+    return datetime.combine(day - timedelta(days=1), at)
+
+
+def parse_menu_date(value):
+    """The ``date`` of an order request: None or '' for today, else a YYYY-MM-DD date. Raises ValueError."""
+    if value in (None, ''):
+        return date.today()
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError('Invalid date. Use YYYY-MM-DD.')
+
+
+def check_menu_date(day, meal_ids, now=None):
+    """
+    Checks that meals can be ordered for ``day``: today, or a later menu that is still
+    open and has every one of the meals on it. Raises ValueError with a message for the client.
+    """
+    now = now or datetime.now()
+    today = now.date()
+    if day == today:
+        return
+    if day < today:
+        raise ValueError('Orders cannot be placed for a past date.')
+    if day > today + timedelta(days=settings.PREORDER_DAYS_AHEAD):
+        raise ValueError(f'Pre-orders can be placed at most {settings.PREORDER_DAYS_AHEAD} days ahead.')
+    if now >= cutoff_for(day):
+        raise ValueError(f'Pre-orders for {day} closed at {cutoff_for(day):%Y-%m-%d %H:%M}.')
+    wanted = set(meal_ids)
+    on_menu = DailyMenu.meals.through.objects.filter(dailymenu__date=day, meal_id__in=wanted).count()
+    if on_menu != len(wanted):
+        raise ValueError(f'Not every meal is on the menu for {day}.')
+
+
+# --- Cutoff batch ---
+
+def _chunks(ids):
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[start:start + ID_CHUNK_SIZE]
+
+
+def _reprice(using, order_ids, prices):
+    """Moves the lines of these orders to the current meal prices. Returns how many orders changed."""
+    stale_lines = reduce(or_, (Q(meal_id=meal_id) & ~Q(price_at_order_cents=price) for meal_id, price in prices.items()))
+    repriced = 0
+    for chunk in _chunks(order_ids):
+        items = OrderItem.objects.using(using).filter(order_id__in=chunk)
+        stale = sorted(set(items.filter(stale_lines).values_list('order_id', flat=True)))
+        if not stale:
+            continue
+        OrderItem.objects.using(using).filter(order_id__in=stale, meal_id__in=prices).update(
+            price_at_order_cents=Case(
+                *[When(meal_id=meal_id, then=Value(price)) for meal_id, price in prices.items()],
+                output_field=BigIntegerField(),
+            ),
+        )
+        line_totals = (
+            OrderItem.objects.using(using).filter(order_id=OuterRef('pk')).order_by()
+            .values('order_id').annotate(total=Sum(F('price_at_order_cents') * F('quantity'))).values('total')
+        )
+        Order.objects.using(using).filter(id__in=stale).update(
+            total_amount_cents=Coalesce(Subquery(line_totals), Value(0)),
+        )
+        # The summaries snapshot the item lines, so the re-priced ones are rewritten
+        orders = list(Order.objects.using(using).filter(id__in=stale).only('id', 'summary').prefetch_related('items'))
+        for order in orders:
+            order.summary = {**order.summary, 'items': [serialize_order_item(item) for item in order.items.all()]}
+        Order.objects.using(using).bulk_update(orders, ['summary'])
+        repriced += len(stale)
+    return repriced
+
+
+def _confirm_on_shard(using, day, prices):
+    transition = TRANSITIONS['confirm']
+    with transaction.atomic(using=using):
+        pending = Order.objects.using(using).filter(menu_date=day, status__in=transition.from_status)
+        # Locked until commit, so a payment or cancellation of one of them waits for the batch
+        rows = list(pending.select_for_update().order_by().values_list('id', 'user_id'))
+        if not rows:
+            return 0, 0
+        order_ids = [order_id for order_id, _ in rows]
+        repriced = _reprice(using, order_ids, prices) if prices else 0
+
+        for chunk in _chunks(order_ids):
+            Order.objects.using(using).filter(id__in=chunk, status__in=transition.from_status).update(**transition.changes)
+
+        users = dict(rows)
+        now = timezone.now()
+        OrderEvent.objects.using(using).bulk_create([
+            OrderEvent(order_id=order_id, kind=transition.event, available_at=now, payload={
+                'order_id': order_id,
+                'user_id': users[order_id],
+                'action': 'confirm',
+                'status': transition.changes['status'],
+                'menu_date': day.isoformat(),
+            })
+            for order_id in order_ids
+        ])
+        user_ids = set(users.values())
+        transaction.on_commit(lambda: [bump_order_history(user_id) for user_id in user_ids], using=using)
+    return len(order_ids), repriced
+
+
+def confirm_day(day):
+    """
+    Confirms and prices every pending order for ``day``, shard by shard. Returns
+    {'date', 'confirmed', 'repriced', 'kitchen'}.
+    """
+    meal_ids = DailyMenu.meals.through.objects.filter(dailymenu__date=day).values_list('meal_id', flat=True)
+    prices = dict(Meal.objects.filter(id__in=meal_ids).order_by().values_list('id', 'price_cents'))
+    confirmed = repriced = 0
+    for alias in shards():
+        shard_confirmed, shard_repriced = _confirm_on_shard(alias, day, prices)
+        confirmed += shard_confirmed
+        repriced += shard_repriced
+    return {'date': day.isoformat(), 'confirmed': confirmed, 'repriced': repriced, 'kitchen': kitchen_totals(day)}
+
+
+def kitchen_totals(day):
+    """[{'meal_id', 'meal_name', 'quantity', 'orders'}] for the orders of ``day`` that are not cancelled, most cooked first."""
+    def shard_totals(alias):
+        return list(
+            OrderItem.objects.using(alias)
+            .filter(order__menu_date=day).exclude(order__status='cancelled')
+            .values('meal_id', 'meal_name').order_by()
+            .annotate(quantity=Sum('quantity'), orders=Count('order_id', distinct=True))
+        )
+
+    totals = {}
+    for rows in gather(shard_totals):
+        for row in rows:
+            key = (row['meal_id'], row['meal_name'])
+            if key in totals:
+                totals[key]['quantity'] += row['quantity']
+                totals[key]['orders'] += row['orders']
+            else:
+                totals[key] = dict(row)
+    return sorted(totals.values(), key=lambda row: (-row['quantity'], row['meal_name']))
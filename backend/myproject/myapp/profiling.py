@@ -0,0 +1,227 @@
+# myapp/profiling.py
+"""
+Opt-in cProfile capture of single requests.
+
+ProfilingMiddleware profiles a request when it carries a valid signed
+``X-Debug-Profile`` header (mint one with ``manage.py profile_token``), or at
+random for a PROFILING_SAMPLE_RATE fraction of requests. Each capture is the
+pstats dump plus a JSON sidecar with the request, its timing and the SQL it ran,
+stored in PROFILING_DIR. Only the newest PROFILING_MAX_CAPTURES captures are
+kept, so the directory works as a bounded ring buffer shared by all workers.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+
+HEADER = 'X-Debug-Profile'
+SIGNING_SALT = 'myapp.profiling'
+
+# Capture ids are generated here and checked against this before touching the filesystem
+CAPTURE_ID_RE = re.compile(r'^\d{8}T\d{6}-\d+-\d+$')
+
+_counter = 0
+_counter_lock = threading.Lock()
+
+
+def make_token(label):
+    """A signed header value, valid for PROFILING_TOKEN_MAX_AGE seconds. ``label`` names who asked."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign(label)
+
+
+def check_token(token):
+    """The label of a valid, unexpired token, or None."""
+    try:
+        return signing.TimestampSigner(salt=SIGNING_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:  # Also raised for expired tokens
+        return None
+
+
+# --- Storage ---
+
+def profiles_dir():
+    return str(settings.PROFILING_DIR)
+
+
+def next_capture_id():
+    """Sortable by time; the pid and a counter keep ids from several workers apart."""
+    global _counter
+    with _counter_lock:
+        _counter += 1
+        counter = _counter
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{os.getpid()}-{counter}"
+
+
+def capture_path(capture_id, ext):
+    if not CAPTURE_ID_RE.match(capture_id):
+        raise ValueError(f'Invalid capture id: {capture_id!r}')
+    return os.path.join(profiles_dir(), f'{capture_id}.{ext}')
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def save_capture(profiler, metadata):
+    """Writes the pstats dump and its JSON sidecar, then trims the buffer. Returns the capture id."""
+    os.makedirs(profiles_dir(), exist_ok=True)
+    capture_id = next_capture_id()
+    metadata = dict(metadata, id=capture_id)
+
+    stats = pstats.Stats(profiler)
+    stats_path = capture_path(capture_id, 'prof')
+    stats.dump_stats(stats_path + '.tmp')
+    os.replace(stats_path + '.tmp', stats_path)
+    # The sidecar is written last: a capture is listed only once both files exist.
+    _write_atomic(capture_path(capture_id, 'json'), json.dumps(metadata).encode())
+
+    trim_captures(settings.PROFILING_MAX_CAPTURES)
+    return capture_id
+
+
+def capture_ids():
+    """Ids of the stored captures, oldest first."""
+    try:
+        names = os.listdir(profiles_dir())
+    except FileNotFoundError:
+        return []
+    ids = [name[:-5] for name in names if name.endswith('.json') and CAPTURE_ID_RE.match(name[:-5])]
+    return sorted(ids, key=_capture_sort_key)
+
+
+def _capture_sort_key(capture_id):
+    timestamp, pid, counter = capture_id.split('-')
+    return timestamp, int(pid), int(counter)
+
+
+def trim_captures(keep):
+    """Deletes all but the newest ``keep`` captures."""
+    ids = capture_ids()
+    for capture_id in ids[:max(len(ids) - keep, 0)]:
+        for ext in ('json', 'prof'):
+            try:
+                os.unlink(capture_path(capture_id, ext))
+            except FileNotFoundError:  # Another worker trimmed it first
+                pass
+
+
+def load_capture(capture_id):
+    """The capture's metadata including its SQL log, or None if it is gone."""
+    try:
+        with open(capture_path(capture_id, 'json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def list_captures():
+    """Metadata of every capture, newest first, without the SQL log."""
+    captures = []
+    for capture_id in reversed(capture_ids()):
+        metadata = load_capture(capture_id)
+        if metadata is not None:
+            metadata.pop('queries', None)
+            captures.append(metadata)
+    return captures
+
+
+def top_functions(capture_id, limit=40, sort='cumulative'):
+    """The pstats report of a capture as text."""
+    output = io.StringIO()
+    stats = pstats.Stats(capture_path(capture_id, 'prof'), stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+# --- Middleware ---
+
+class QueryRecorder:
+    """A connection.execute_wrapper that logs each statement with its parameters and duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'params': repr(params)[:500],
+                'many': many,
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        """(profile?, reason): a valid header wins; otherwise sample."""
+        token = request.headers.get(HEADER)
+        if token:
+            label = check_token(token)
+            if label is not None:
+                return True, f'header:{label}'
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return True, 'sampled'
+        return False, None
+
+    def __call__(self, request):
+        profile, reason = self.should_profile(request)
+        if not profile:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:  # Another profiler is already active in this thread
+            return self.get_response(request)
+        try:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        user = getattr(request, 'user', None)
+        metadata = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'reason': reason,
+            'user': user.get_username() if user is not None and user.is_authenticated else None,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'duration_ms': round(elapsed_ms, 3),
+            'query_count': len(recorder.queries),
+            'sql_ms': round(sum(query['ms'] for query in recorder.queries), 3),
+            'queries': recorder.queries,
+        }
+        try:
+            response['X-Profile-Id'] = save_capture(profiler, metadata)
+        except OSError as e:
+            print(f"Could not store request profile for {request.path}: {e}")
+        return response
@@ -0,0 +1,289 @@
+# myapp/reconciliation.py
+"""
+Reconciliation of M-Pesa settlement statements against the orders.
+
+``mpesa_payment_view`` marks an order paid when the payment callback arrives,
+one order at a time. The settlement statement is what M-Pesa actually settled,
+and the two drift apart: callbacks get lost, payments are reversed. A day's
+statement runs to hundreds of thousands of lines, so it is read as a stream
+(CSV, or JSON Lines: one object per line) and handled BATCH_SIZE lines at a
+time; neither the file nor the orders are ever held in memory whole.
+
+Each line carries the M-Pesa transaction ID (receipt number), the amount, the
+transaction status and, optionally, the account reference the customer paid
+to, which is the order id. For each batch, per order shard:
+
+    1. one query finds the orders by ``Order.mpesa_transaction_id`` (unique,
+       so indexed); the lines it does not find are looked up by order id, on
+       the shard that id belongs to;
+    2. settled lines whose order is not marked paid are applied with one
+       guarded UPDATE (paid, pending orders confirmed, transaction ID stored);
+       failed or reversed lines whose order is marked paid are applied with
+       one more (payment failed); the OrderEvents of both are bulk inserted.
+
+Lines that cannot be applied (unknown transaction, wrong amount, a paid
+cancelled order, ...) are reported as mismatches for a person to look at, and
+nothing is changed for them. The DailyRevenue rows of the days whose orders
+changed are rolled up again at the end. Running a statement twice changes
+nothing the second time.
+"""
+
+import csv
+import json
+from collections import Counter, defaultdict, namedtuple
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .cache import bump_order_history
+from .models import Order, OrderEvent
+from .money import format_cents, to_cents
+from .orders import TRANSITIONS
+from .revenue import rollup_revenue_day
+from .sharding import shard_for_order, shards
+
+# Statement lines per batch: one lookup and at most two UPDATEs per shard each
+BATCH_SIZE = 1000
+
+# Column names of the M-Pesa org portal statement, and the short ones, to ours
+COLUMNS = {
+    'transaction_id': 'transaction_id', 'receipt no.': 'transaction_id', 'receipt': 'transaction_id',
+    'order_id': 'order_id', 'a/c no.': 'order_id', 'account': 'order_id',
+    'amount': 'amount', 'paid in': 'amount',
+    'status': 'status', 'transaction status': 'status',
+}
+SETTLED = {'completed', 'success', 'settled'}
+UNSETTLED = {'failed', 'reversed', 'cancelled', 'declined'}
+
+ORDER_COLUMNS = ('id', 'user_id', 'order_date', 'total_amount_cents', 'status', 'payment_status', 'mpesa_transaction_id')
+
+StatementLine = namedtuple('StatementLine', ['line', 'transaction_id', 'order_id', 'amount_cents', 'settled'])
+Mismatch = namedtuple('Mismatch', ['line', 'transaction_id', 'order_id', 'problem'])
+
+
+# --- Reading statements ---
+
+def _normalize(record):
+    return {COLUMNS[key.strip().lower()]: value for key, value in record.items() if key and key.strip().lower() in COLUMNS}
+
+
+def _csv_records(file):
+    reader = csv.DictReader(file)
+    for record in reader:
+        yield reader.line_num, _normalize(record)
+
+
+def _jsonl_records(file):
+    for number, text in enumerate(file, 1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError:
+            record = None
+        yield number, _normalize(record) if isinstance(record, dict) else None
+
+
+def read_statement(file, fmt):
+    """Iterates (line number, {column: value} or None if unreadable) over an open statement, ``fmt`` 'csv' or 'jsonl'."""
+    readers = {'csv': _csv_records, 'jsonl': _jsonl_records}
+    if fmt not in readers:
+        raise ValueError(f'Unknown statement format: {fmt!r}')
+    return readers[fmt](file)
+
+
+def parse_line(number, record):
+    """A StatementLine from a normalized record. Raises ValueError saying what is wrong with it."""
+    if record is None:
+        raise ValueError('not a statement line')
+    transaction_id = str(record.get('transaction_id') or '').strip()
+    if not transaction_id:
+        raise ValueError('no transaction ID')
+    if len(transaction_id) > 32:  # Longer than Order.mpesa_transaction_id holds
+        raise ValueError('transaction ID longer than 32 characters')
+    status = str(record.get('status') or '').strip().lower()
+    if status not in SETTLED | UNSETTLED:
+        raise ValueError(f'unknown transaction status {status!r}')
+    try:
+        amount_cents = to_cents(str(record.get('amount')).replace(',', ''))
+    except ValueError:
+        raise ValueError(f"invalid amount {record.get('amount')!r}")
+    reference = str(record.get('order_id') or '').strip()
+    order_id = int(reference) if reference.isdigit() else None
+    return StatementLine(number, transaction_id, order_id, amount_cents, status in SETTLED)
+
+
+# --- Matching ---
+
+def _find_orders(lines):
+    """({transaction ID: (alias, row)}, {order id: (alias, row)}) for the orders the lines refer to."""
+    transaction_ids = {line.transaction_id for line in lines}
+    by_transaction = {}
+    for alias in shards():
+        rows = Order.objects.using(alias).filter(mpesa_transaction_id__in=transaction_ids).order_by().values(*ORDER_COLUMNS)
+        by_transaction.update((row['mpesa_transaction_id'], (alias, row)) for row in rows)
+
+    # Lines whose transaction is not recorded yet (a lost callback) are found by the order id they paid to
+    ids_by_shard = defaultdict(set)
+    for line in lines:
+        if line.transaction_id not in by_transaction and line.order_id is not None:
+            alias = shard_for_order(line.order_id)
+            if alias is not None:
+                ids_by_shard[alias].add(line.order_id)
+    by_order = {}
+    for alias, ids in ids_by_shard.items():
+        rows = Order.objects.using(alias).filter(id__in=ids).order_by().values(*ORDER_COLUMNS)
+        by_order.update((row['id'], (alias, row)) for row in rows)
+    return by_transaction, by_order
+
+
+def check_line(line, order):
+    """
+    What a statement line asks of its order (an ORDER_COLUMNS row, or None):
+    'settle', 'reverse' or None when they already agree. Raises ValueError
+    describing the mismatch when it cannot be applied.
+    """
+    if not line.settled:
+        if order is not None and order['mpesa_transaction_id'] == line.transaction_id and order['payment_status'] == 'completed':
+            return 'reverse'
+        return None
+    if order is None:
+        raise ValueError('no order has this transaction ID or order id')
+    if order['mpesa_transaction_id'] not in (None, line.transaction_id):
+        raise ValueError(f"order {order['id']} was paid with transaction {order['mpesa_transaction_id']}")
+    if line.amount_cents != order['total_amount_cents']:
+        raise ValueError(
+            f"amount {format_cents(line.amount_cents)} does not match the total {format_cents(order['total_amount_cents'])} of order {order['id']}"
+        )
+    if order['payment_status'] == 'completed':
+        return None
+    if order['status'] == 'cancelled':
+        raise ValueError(f"order {order['id']} was cancelled, but its payment settled")
+    return 'settle'
+
+
+# --- Applying ---
+
+def _events(rows, transition, now):
+    return [
+        OrderEvent(order_id=order_id, kind=TRANSITIONS[transition].event, available_at=now, payload={
+            'order_id': order_id,
+            'user_id': user_id,
+            'action': 'reconcile',
+            'status': status,
+            'payment_status': payment_status,
+        })
+        for order_id, user_id, status, payment_status in rows
+    ]
+
+
+def apply_corrections(alias, settle, reverse):
+    """
+    Marks the orders in ``settle`` ({order id: transaction ID}) paid and those in
+    ``reverse`` (order ids) unpaid, on one shard in one transaction. Each UPDATE is
+    guarded by the payment status it corrects, so an order changed meanwhile is left
+    alone. Returns the ((id, user_id, order_date), ...) of the settled and the reversed orders.
+    """
+    orders = Order.objects.using(alias).order_by()
+    columns = ('id', 'user_id', 'order_date', 'status')
+    with transaction.atomic(using=alias):
+        settled = list(
+            orders.filter(id__in=settle, payment_status__in=('pending', 'failed')).exclude(status='cancelled')
+            .select_for_update().values_list(*columns)
+        )
+        if settled:
+            ids = [row[0] for row in settled]
+            orders.filter(id__in=ids).update(
+                payment_status='completed',
+                status=Case(When(status='pending', then=Value('confirmed')), default=F('status')),
+                mpesa_transaction_id=Case(*[When(id=order_id, then=Value(settle[order_id])) for order_id in ids]),
+            )
+        reversed_ = list(orders.filter(id__in=reverse, payment_status='completed').select_for_update().values_list(*columns))
+        if reversed_:
+            orders.filter(id__in=[row[0] for row in reversed_]).update(payment_status='failed')
+
+        now = timezone.now()
+        OrderEvent.objects.using(alias).bulk_create(
+            _events(
+                [(order_id, user_id, 'confirmed' if status == 'pending' else status, 'completed') for order_id, user_id, _, status in settled],
+                'pay', now,
+            )
+            + _events([(order_id, user_id, status, 'failed') for order_id, user_id, _, status in reversed_], 'fail_payment', now)
+        )
+        user_ids = {row[1] for row in settled + reversed_}
+        if user_ids:
+            transaction.on_commit(lambda: [bump_order_history(user_id) for user_id in user_ids], using=alias)
+    return [row[:3] for row in settled], [row[:3] for row in reversed_]
+
+
+def _reconcile_batch(batch, apply, counts, days, report):
+    lines = []
+    for number, record in batch:
+        try:
+            lines.append(parse_line(number, record))
+        except ValueError as e:
+            report(Mismatch(number, (record or {}).get('transaction_id'), None, str(e)))
+    by_transaction, by_order = _find_orders(lines)
+
+    settle = defaultdict(dict)
+    reverse = defaultdict(set)
+    # Transactions and orders already settled by an earlier line of this batch
+    claimed_transactions, claimed_orders = set(), set()
+    for line in lines:
+        alias, order = by_transaction.get(line.transaction_id) or by_order.get(line.order_id) or (None, None)
+        try:
+            action = check_line(line, order)
+            if action == 'settle' and (line.transaction_id in claimed_transactions or order['id'] in claimed_orders):
+                raise ValueError(f"order {order['id']} or transaction {line.transaction_id} is already settled by another line")
+        except ValueError as e:
+            report(Mismatch(line.line, line.transaction_id, order['id'] if order else line.order_id, str(e)))
+            continue
+        if action == 'settle':
+            settle[alias][order['id']] = line.transaction_id
+            claimed_transactions.add(line.transaction_id)
+            claimed_orders.add(order['id'])
+        elif action == 'reverse':
+            reverse[alias].add(order['id'])
+        else:
+            counts['matched'] += 1
+
+    for alias in set(settle) | set(reverse):
+        if apply:
+            settled, reversed_ = apply_corrections(alias, settle[alias], reverse[alias])
+            days.update(timezone.localdate(order_date) for _, _, order_date in settled + reversed_)
+            counts['settled'] += len(settled)
+            counts['reversed'] += len(reversed_)
+        else:
+            counts['settled'] += len(settle[alias])
+            counts['reversed'] += len(reverse[alias])
+
+
+def reconcile(lines, apply=True, batch_size=BATCH_SIZE, on_mismatch=None):
+    """
+    Reconciles the orders with statement lines, as iterated by ``read_statement()``,
+    ``batch_size`` lines at a time. Nothing is written unless ``apply``. Each mismatch
+    is passed to ``on_mismatch`` as it is found. Returns the counts {'lines',
+    'matched', 'settled', 'reversed', 'mismatched'} and the 'days' rolled up again.
+    """
+    counts = Counter({'lines': 0, 'matched': 0, 'settled': 0, 'reversed': 0, 'mismatched': 0})
+    days = set()
+
+    def report(mismatch):
+        counts['mismatched'] += 1
+        if on_mismatch is not None:
+            on_mismatch(mismatch)
+
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, batch_size))
+        if not batch:
+            break
+        counts['lines'] += len(batch)
+        _reconcile_batch(batch, apply, counts, days, report)
+
+    # Revenue counts completed payments by the day the order was placed
+    for day in sorted(days):
+        rollup_revenue_day(day)
+    return {**counts, 'days': [day.isoformat() for day in sorted(days)]}
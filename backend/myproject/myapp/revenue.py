@@ -0,0 +1,66 @@
+# myapp/revenue.py
+"""
+Daily revenue: the live totals for one day and the DailyRevenue rollup rows.
+
+Today's revenue is always computed from the orders themselves, with one
+aggregate query per order shard, run side by side. Earlier days are served from
+their DailyRevenue row, which the ``rollup_revenue`` job (see myapp/jobs.py)
+recomputes for yesterday and today, so late payments still land in the right
+day. The next day's row is created empty ahead of time, so the first rollup
+after midnight only updates it.
+"""
+
+from django.db.models import Count, Sum
+
+from .exports import date_range_bounds
+from .models import DailyRevenue, Order
+from .money import format_cents
+from .sharding import gather
+
+
+def revenue_totals(day):
+    """(total_revenue_cents, total_orders) of the completed payments for orders placed on ``day``, over every shard."""
+    # A half-open order_date range rather than order_date__date, whose cast defeats order_date_idx
+    lower, upper = date_range_bounds(day, day)
+
+    def shard_totals(alias):
+        orders = Order.objects.using(alias).filter(order_date__gte=lower, order_date__lt=upper, payment_status='completed')
+        return orders.aggregate(
+            total_revenue_cents=Sum('total_amount_cents'), total_orders=Count('id'),
+        )
+
+    per_shard = gather(shard_totals)
+    return (
+        sum(totals['total_revenue_cents'] or 0 for totals in per_shard),
+        sum(totals['total_orders'] for totals in per_shard),
+    )
+
+
+def revenue_data(total_revenue_cents, total_orders):
+    return {
+        "total_revenue": format_cents(total_revenue_cents), # Exact string, e.g. "1250.00"
+        "total_orders": total_orders
+    }
+
+
+def open_revenue_day(day):
+    """Creates the empty DailyRevenue row for ``day`` if there is none yet. Returns it."""
+    row, _ = DailyRevenue.objects.get_or_create(date=day)
+    return row
+
+
+def rollup_revenue_day(day):
+    """Recomputes the DailyRevenue row for ``day`` from its orders. Returns it."""
+    total_revenue_cents, total_orders = revenue_totals(day)
+    row, _ = DailyRevenue.objects.update_or_create(
+        date=day, defaults={'total_revenue_cents': total_revenue_cents, 'total_orders': total_orders},
+    )
+    return row
+
+
+def stored_revenue(day):
+    """The rolled-up totals for ``day``, computing and storing them if the rollup has not run yet."""
+    row = DailyRevenue.objects.filter(date=day).first()
+    if row is None:
+        row = rollup_revenue_day(day)
+    return revenue_data(row.total_revenue_cents, row.total_orders)
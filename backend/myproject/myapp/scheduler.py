@@ -0,0 +1,153 @@
+# myapp/scheduler.py
+"""
+In-process runner for periodic jobs (prewarming, rollups, cleanup).
+
+SCHEDULER_JOBS maps a job name to a dotted path and a schedule: ``every`` N
+seconds, or daily ``at`` "HH:MM" server time. Time is cut into slots (one per
+interval, or one per day) and each slot is due at its start plus a random
+``jitter`` of up to that many seconds, drawn separately by every process.
+
+Every web worker can run a scheduler (``start_scheduler()``, called from the
+WSGI/ASGI modules when SCHEDULER_AUTOSTART is set), or a single
+``manage.py run_scheduler`` daemon can. Either way each slot runs once: before
+running a job, a worker claims ``scheduler:<job>:<slot>`` with ``cache.add()``
+on the SCHEDULER_LOCK_CACHE, and only the worker whose jitter came up first
+gets it. That only holds if the lock cache is shared between processes, and the
+prewarmed bodies only help if ``default`` is, so both schedulers refuse to start
+on per-process caches (the daemon always, an autostarted one unless
+ALLOW_PROCESS_LOCAL_CACHES says there is a single process).
+"""
+
+import os
+import random
+import socket
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from .cache import require_shared_cache
+
+Job = namedtuple('Job', ['name', 'func', 'every', 'at', 'jitter'])
+
+DAY = timedelta(days=1)
+
+
+def load_jobs(config=None):
+    """[Job] from SCHEDULER_JOBS (or ``config``), with their callables imported."""
+    config = settings.SCHEDULER_JOBS if config is None else config
+    jobs = []
+    for name, spec in config.items():
+        if ('every' in spec) == ('at' in spec):
+            raise ValueError(f"Scheduled job {name!r} needs exactly one of 'every' and 'at'.")
+        at = datetime.strptime(spec['at'], '%H:%M').time() if 'at' in spec else None
+        jobs.append(Job(name, import_string(spec['func']), spec.get('every'), at, spec.get('jitter', 0)))
+    return jobs
+
+
+def next_slot(job, after):
+    """Start of the first slot of ``job`` strictly after ``after`` (a naive local datetime)."""
+    if job.every is not None:
+        return datetime.fromtimestamp((after.timestamp() // job.every + 1) * job.every)
+    start = datetime.combine(after.date(), job.at)
+    return start if start > after else start + DAY
+
+
+def require_shared_caches():
+    """Raises ImproperlyConfigured unless the slot locks and the prewarmed bodies are in caches every process sees."""
+    require_shared_cache(settings.SCHEDULER_LOCK_CACHE, 'every scheduler would run every slot')
+    require_shared_cache('default', 'the prewarm jobs would warm a cache no web worker reads')
+
+
+def lock_key(job, slot):
+    return f'scheduler:{job.name}:{slot.isoformat()}'
+
+
+def claim(job, slot):
+    """True if this process is the one to run ``job`` for ``slot``."""
+    # The lock only has to outlive the slot: the next slot has its own key
+    timeout = job.every if job.every is not None else int(DAY.total_seconds())
+    owner = f'{socket.gethostname()}:{os.getpid()}'
+    return caches[settings.SCHEDULER_LOCK_CACHE].add(lock_key(job, slot), owner, timeout=timeout)
+
+
+class Scheduler:
+    def __init__(self, jobs=None, now=None):
+        self.jobs = load_jobs() if jobs is None else jobs
+        now = now or datetime.now()
+        # name -> (slot start, when this process tries to claim it)
+        self._due = {job.name: self._schedule(job, next_slot(job, now)) for job in self.jobs}
+
+    @staticmethod
+    def _schedule(job, slot):
+        return slot, slot + timedelta(seconds=random.uniform(0, job.jitter))
+
+    def run_pending(self, now=None):
+        """Runs the jobs whose slot is due and that this process wins. Returns {name: 'ran'/'skipped'/'failed'}."""
+        now = now or datetime.now()
+        outcomes = {}
+        for job in self.jobs:
+            slot, due = self._due[job.name]
+            if due > now:
+                continue
+            if not claim(job, slot):
+                outcomes[job.name] = 'skipped' # Another worker has this slot
+            else:
+                outcomes[job.name] = run_job(job)
+            # A worker that was down for several slots resumes at the next one rather than replaying them
+            self._due[job.name] = self._schedule(job, next_slot(job, max(slot, now)))
+        return outcomes
+
+    def seconds_until_next(self, now=None):
+        now = now or datetime.now()
+        if not self._due:
+            return None
+        return max(0.0, min((due - now).total_seconds() for _, due in self._due.values()))
+
+    def run_forever(self, stop, max_sleep=60.0):
+        """Runs jobs as they come due until the ``stop`` event is set."""
+        while not stop.is_set():
+            self.run_pending()
+            wait = self.seconds_until_next()
+            stop.wait(max_sleep if wait is None else min(wait, max_sleep))
+
+
+def run_job(job):
+    close_old_connections()
+    started = time.perf_counter()
+    try:
+        job.func()
+    except Exception as e:
+        print(f"Scheduled job {job.name} failed: {e.__class__.__name__}: {e}")
+        return 'failed'
+    finally:
+        close_old_connections()
+    print(f"Scheduled job {job.name} ran in {time.perf_counter() - started:.2f}s.")
+    return 'ran'
+
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start_scheduler():
+    """Starts this process's scheduler thread if SCHEDULER_AUTOSTART is set. Safe to call more than once."""
+    global _thread
+    if not settings.SCHEDULER_AUTOSTART:
+        return None
+    if not settings.ALLOW_PROCESS_LOCAL_CACHES:
+        require_shared_caches()
+    with _thread_lock:
+        # Compare pids too: a thread started before a fork does not exist in the child
+        if _thread is None or not _thread[0].is_alive() or _thread[1] != os.getpid():
+            thread = threading.Thread(
+                target=Scheduler().run_forever, args=(threading.Event(),), name='scheduler', daemon=True,
+            )
+            thread.start()
+            _thread = (thread, os.getpid())
+        return _thread[0]
@@ -0,0 +1,213 @@
+# myapp/search.py
+"""
+Server-side search over the meal catalogue.
+
+On Postgres the name/description match is pushed down to the database, where
+the ``pg_trgm`` GIN indexes created in migration 0003 serve the ``icontains``
+lookups (they are built on the same ``UPPER(col::text)`` expression Django
+emits for them). Every other backend (SQLite in development and tests) uses an
+in-process inverted index. Each worker keeps its own, built for one catalogue
+version (see myapp/cache.py), and rebuilds it on the first search after the
+version changes. Every meal change bumps the version, including those made by
+another worker and the ``update()``/``bulk_create()`` writes that send no signals.
+"""
+
+import re
+import threading
+from bisect import bisect_left
+
+from django.db import connection
+from django.db.models import Q
+
+from .cache import catalogue_version
+from .models import Meal
+from .money import to_cents
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# SQLite refuses statements with too many bound parameters, so id lookups are chunked.
+ID_CHUNK_SIZE = 500
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return TOKEN_RE.findall(text.lower())
+
+
+class MealSearchIndex:
+    """
+    Inverted index of meal name/description tokens, with secondary indexes on
+    category and price (in cents) so that filters never touch the database.
+
+    Query terms are prefix-tolerant: "chick" matches "chicken". Each term must
+    match at least one token of the meal (AND semantics across terms).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None     # catalogue version the index was built for; None when not built
+        self._postings = {}      # token -> set of meal ids
+        self._tokens = []        # sorted list of every token ever seen, for prefix scans
+        self._attrs = {}         # meal id -> (category, price in cents)
+        self._by_category = {}   # category -> set of meal ids
+        self._by_price = []      # sorted list of (price in cents, meal id), for range scans
+
+    def clear(self):
+        """Drops the index; the next search rebuilds it from the database."""
+        with self._lock:
+            self._version = None
+
+    def _ensure_current(self):
+        version = catalogue_version()
+        if self._version != version:
+            self.rebuild(version)
+
+    def rebuild(self, version=None):
+        """
+        Builds the index from the database for ``version``, read first so that a
+        change committed during the build leaves the index stale rather than current.
+        """
+        with self._lock:
+            if version is None:
+                version = catalogue_version()
+            self._postings = {}
+            self._tokens = []
+            self._attrs = {}
+            self._by_category = {}
+            self._by_price = []
+            rows = Meal.objects.values_list('id', 'name', 'description', 'category', 'price_cents')
+            for meal_id, name, description, category, price in rows.iterator(chunk_size=2000):
+                self._add(meal_id, name, description, category, price)
+            self._tokens = sorted(self._postings)
+            self._by_price.sort()
+            self._version = version
+
+    def _add(self, meal_id, name, description, category, price):
+        tokens = set(tokenize(name)) | set(tokenize(description))
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+            postings.add(meal_id)
+        self._attrs[meal_id] = (category, price)
+        self._by_category.setdefault(category, set()).add(meal_id)
+        self._by_price.append((price, meal_id))
+
+    def _tokens_for_prefix(self, prefix):
+        tokens = self._tokens
+        position = bisect_left(tokens, prefix)
+        matched = []
+        while position < len(tokens) and tokens[position].startswith(prefix):
+            matched.append(tokens[position])
+            position += 1
+        return matched
+
+    def _term_clause(self, term):
+        postings = [self._postings[token] for token in self._tokens_for_prefix(term)]
+
+        def materialize():
+            ids = set()
+            for p in postings:
+                ids |= p
+            return ids
+
+        def probe(meal_id):
+            return any(meal_id in p for p in postings)
+
+        return sum(len(p) for p in postings), len(postings), materialize, probe
+
+    def _category_clause(self, category):
+        ids = self._by_category.get(category, set())
+        return len(ids), 1, lambda: set(ids), ids.__contains__
+
+    def _price_clause(self, min_price_cents, max_price_cents):
+        lo = 0 if min_price_cents is None else bisect_left(self._by_price, (min_price_cents,))
+        if max_price_cents is None:
+            hi = len(self._by_price)
+        else:
+            # Compare on price only; every (max_price_cents, id) tuple sorts below (max_price_cents, inf).
+            hi = bisect_left(self._by_price, (max_price_cents, float('inf')))
+        by_price, attrs = self._by_price, self._attrs
+
+        def probe(meal_id):
+            price = attrs[meal_id][1]
+            return ((min_price_cents is None or price >= min_price_cents)
+                    and (max_price_cents is None or price <= max_price_cents))
+
+        return max(hi - lo, 0), 1, lambda: {meal_id for _, meal_id in by_price[lo:hi]}, probe
+
+    def search(self, q=None, category=None, min_price_cents=None, max_price_cents=None):
+        """Returns the set of matching meal ids."""
+        with self._lock:
+            self._ensure_current()
+            clauses = [self._term_clause(term) for term in tokenize(q)]
+            if category is not None:
+                clauses.append(self._category_clause(category))
+            if min_price_cents is not None or max_price_cents is not None:
+                clauses.append(self._price_clause(min_price_cents, max_price_cents))
+            if not clauses:
+                return set(self._attrs)
+
+            # Materialize the most selective clause, then narrow it down with the others,
+            # either by probing each remaining candidate or by intersecting whole sets,
+            # whichever touches fewer entries.
+            clauses.sort(key=lambda clause: clause[0])
+            ids = clauses[0][2]()
+            for cost, probe_cost, materialize, probe in clauses[1:]:
+                if not ids:
+                    break
+                if len(ids) * probe_cost < cost:
+                    ids = {meal_id for meal_id in ids if probe(meal_id)}
+                else:
+                    ids &= materialize()
+            return ids
+
+
+meal_index = MealSearchIndex()
+
+
+def parse_search_params(params):
+    """
+    Extracts q/category/min_price/max_price from a QueryDict, with the prices in cents.
+    Raises ValueError with a user-facing message on malformed prices.
+    """
+    q = (params.get('q') or '').strip() or None
+    category = (params.get('category') or '').strip() or None
+    prices = {}
+    for key in ('min_price', 'max_price'):
+        raw = params.get(key)
+        if raw in (None, ''):
+            prices[f'{key}_cents'] = None
+            continue
+        try:
+            prices[f'{key}_cents'] = to_cents(raw)
+        except ValueError:
+            raise ValueError(f'Invalid {key}: {raw!r}. Must be an amount with at most two decimal places.')
+    return {'q': q, 'category': category, **prices}
+
+
+def search_meals(q=None, category=None, min_price_cents=None, max_price_cents=None, only=None):
+    """
+    Returns the meals matching every given filter, in the default Meal ordering.
+    ``only`` limits the columns loaded (the name is always loaded, for sorting).
+    """
+    meal_objects = Meal.objects.only('name', *only) if only else Meal.objects.all()
+    if connection.vendor == 'postgresql':
+        meals = meal_objects
+        for term in tokenize(q):
+            meals = meals.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        if category is not None:
+            meals = meals.filter(category=category)
+        if min_price_cents is not None:
+            meals = meals.filter(price_cents__gte=min_price_cents)
+        if max_price_cents is not None:
+            meals = meals.filter(price_cents__lte=max_price_cents)
+        return list(meals)
+
+    ids = sorted(meal_index.search(q=q, category=category, min_price_cents=min_price_cents, max_price_cents=max_price_cents))
+    meals = []
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        meals.extend(meal_objects.filter(id__in=ids[start:start + ID_CHUNK_SIZE]))
+    meals.sort(key=lambda meal: meal.name)
+    return meals
@@ -0,0 +1,210 @@
+# myapp/sharding.py
+"""
+Horizontal sharding of orders by customer.
+
+Orders, their items and their outbox events live in one of the databases
+listed in ORDER_SHARDS; everything else (users, meals, menus, sessions) stays
+in ``default``. A customer's shard is ``jump_hash(user_id, len(ORDER_SHARDS))``,
+so all of their orders are on one database.
+
+ORDER_SHARDS cannot change once orders exist. Reordering or removing entries
+strands orders, since an alias's position is its shard index. Adding one
+reassigns about 1/N of the customers to the new shard, but nothing moves their
+orders there (and their ids keep naming the old one), so every per-customer
+read would miss those customers' earlier orders. Pick the shard count before
+the first order is placed.
+
+Order ids are globally unique. Shard ``i`` allocates ids from
+``i * SHARD_ID_SPAN + 1`` (``prepare_shard()`` sets its sequences after every
+migrate), so ``shard_for_order(order_id)`` finds an order's database from its
+id alone. Shard 0 starts at 1, which keeps the ids of an unsharded database.
+
+Code that knows the customer or the order uses ``user_orders()`` /
+``shard_for_order()`` and touches one database. Staff-wide reads go through
+``gather()``, which runs one query per shard on a bounded thread pool
+(SHARD_QUERY_WORKERS) and hands back the per-shard results for merging.
+``OrderShardRouter`` sends instance-bound queries (``user.orders``,
+``order.items``, ``order.save()``) to the right shard and keeps every other
+model on ``default``.
+
+With the default ORDER_SHARDS = ["default"] there is a single shard and
+nothing changes.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.models.signals import post_migrate, pre_delete
+from django.dispatch import receiver
+
+from .models import Order, OrderEvent, OrderItem
+
+SHARDED_MODELS = {'myapp.order', 'myapp.orderitem', 'myapp.orderevent'}
+# Shard databases also get empty copies of the tables the orders' foreign keys pointed at
+# before migration 0011 dropped those constraints, so the earlier migrations apply there too
+SHARD_STUB_APPS = {'auth', 'contenttypes'}
+SHARD_STUB_MODELS = {'myapp.meal'}
+
+# Ids per shard: far more orders than one database will hold, and
+# SHARD_ID_SPAN * len(ORDER_SHARDS) stays below 2**53, the largest id JavaScript keeps exact
+SHARD_ID_SPAN = 10 ** 12
+
+
+def shards():
+    return settings.ORDER_SHARDS
+
+
+def jump_hash(key, buckets):
+    """Lamping & Veach's jump consistent hash: a stable bucket in [0, buckets) for an integer key."""
+    key &= 0xFFFFFFFFFFFFFFFF
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for_user(user_id):
+    aliases = shards()
+    return aliases[jump_hash(user_id, len(aliases))] if len(aliases) > 1 else aliases[0]
+
+
+def shard_for_order(order_id):
+    """The database holding an order, from the shard index in its id; None for an id no shard allocates."""
+    index = (order_id - 1) // SHARD_ID_SPAN
+    aliases = shards()
+    return aliases[index] if 0 <= index < len(aliases) else None
+
+
+def user_orders(user):
+    """The customer's orders, on their shard."""
+    return Order.objects.using(shard_for_user(user.id)).filter(user=user)
+
+
+# --- Scatter-gather ---
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.SHARD_QUERY_WORKERS, thread_name_prefix='shard')
+        return _executor
+
+
+def _run_on_shard(func, alias):
+    close_old_connections()
+    try:
+        return func(alias)
+    finally:
+        close_old_connections()
+
+
+def gather(func):
+    """
+    Calls ``func(alias)`` for every shard, in parallel when there are several, and
+    returns the results in ORDER_SHARDS order. The first exception is re-raised.
+    """
+    aliases = shards()
+    if len(aliases) == 1 or settings.SHARD_QUERY_WORKERS <= 0:
+        return [func(alias) for alias in aliases]
+    futures = [get_executor().submit(_run_on_shard, func, alias) for alias in aliases]
+    return [future.result() for future in futures]
+
+
+# --- Routing ---
+
+def _label(model):
+    return model._meta.label_lower
+
+
+class OrderShardRouter:
+    """
+    Sharded models follow the instance a query is bound to; every other model
+    lives on ``default``. Databases other than ``default`` only get the sharded
+    tables (and the empty stubs above).
+    """
+
+    def _shard_of(self, instance):
+        if instance is None:
+            return None
+        if isinstance(instance, User):
+            return shard_for_user(instance.pk)
+        if _label(instance) not in SHARDED_MODELS:
+            return None
+        # Ids are authoritative: an unsaved item may have picked up its meal's database
+        if isinstance(instance, Order):
+            if instance.pk is not None:
+                return shard_for_order(instance.pk)
+            return shard_for_user(instance.user_id) if instance.user_id is not None else None
+        if instance.order_id is not None:
+            return shard_for_order(instance.order_id)
+        return instance._state.db
+
+    def db_for_read(self, model, **hints):
+        if _label(model) not in SHARDED_MODELS:
+            return DEFAULT_DB_ALIAS
+        return self._shard_of(hints.get('instance'))
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # An order and its customer live in different databases by design
+        if _label(obj1) in SHARDED_MODELS or _label(obj2) in SHARDED_MODELS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS:
+            return None
+        if app_label in SHARD_STUB_APPS:
+            return True
+        label = f'{app_label}.{model_name}'
+        return label in SHARDED_MODELS or label in SHARD_STUB_MODELS
+
+
+# --- Shard setup ---
+
+def prepare_shard(alias):
+    """Moves the id sequences of a shard's tables to the start of its id range. Idempotent."""
+    index = shards().index(alias)
+    if index == 0:
+        return
+    start = index * SHARD_ID_SPAN
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for model in (Order, OrderItem, OrderEvent):
+            table = model._meta.db_table
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {table})))",
+                    [table, start],
+                )
+            elif connection.vendor == 'sqlite':
+                # AUTOINCREMENT tables continue after max(seq, MAX(rowid))
+                cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, %s) WHERE name = %s', [start, table])
+                if cursor.rowcount == 0:
+                    cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, start])
+            else:
+                raise NotImplementedError(f'Order shards are not supported on {connection.vendor}.')
+
+
+@receiver(post_migrate, dispatch_uid='myapp.sharding.prepare_shard')
+def _shard_migrated(sender, using, **kwargs):
+    if sender.label == 'myapp' and using in shards():
+        prepare_shard(using)
+
+
+@receiver(pre_delete, sender=User, dispatch_uid='myapp.sharding.user_deleted')
+def _user_deleted(sender, instance, using, **kwargs):
+    # The cascade from auth_user only reaches orders in the user's own database
+    shard = shard_for_user(instance.pk)
+    if shard != using:
+        Order.objects.using(shard).filter(user_id=instance.pk).delete()
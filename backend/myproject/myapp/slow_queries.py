@@ -0,0 +1,222 @@
+# myapp/slow_queries.py
+"""
+Slow-query log with EXPLAIN capture.
+
+Every database connection gets an execute wrapper (installed on
+``connection_created``) that times each statement. Statements slower than
+SLOW_QUERY_MS are aggregated per process by their normalized SQL fingerprint,
+together with the view that issued them (set by SlowQueryMiddleware) and the
+parameters of the latest occurrence.
+
+The first time a SELECT fingerprint turns up slow, its EXPLAIN plan is captured
+on a background thread with its own connection, so the request that ran the
+query never waits for it. Plain EXPLAIN is used, never ANALYZE: the statement is
+planned again, not executed again.
+"""
+
+import contextvars
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# The view handling the current request, for attributing queries
+current_view = contextvars.ContextVar('current_view', default=None)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """SQL with literals and placeholders replaced by ?, IN lists collapsed and whitespace squeezed."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:16]
+
+
+class SlowQueryLog:
+    """Per-process aggregates of slow statements, keyed by fingerprint."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql, params, duration_ms, view, alias):
+        """Adds one occurrence. Returns the entry's key if its plan still needs capturing, else None."""
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    # Make room by dropping the entry that has cost the least time overall
+                    cheapest = min(self._entries, key=lambda k: self._entries[k]['total_ms'])
+                    del self._entries[cheapest]
+                entry = self._entries[key] = {
+                    'fingerprint': key,
+                    'sql': normalized,
+                    'database': alias,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'views': {},
+                    'first_seen': now,
+                    'plan': None,
+                    'plan_error': None,
+                    'explain_pending': False,
+                }
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['last_ms'] = duration_ms
+            entry['last_seen'] = now
+            entry['last_sql'] = sql
+            entry['last_params'] = repr(params)[:500]
+            view = view or '-'
+            entry['views'][view] = entry['views'].get(view, 0) + 1
+
+            wants_plan = (
+                entry['plan'] is None and entry['plan_error'] is None and not entry['explain_pending']
+                and normalized[:6].upper() == 'SELECT'
+            )
+            if wants_plan:
+                entry['explain_pending'] = True
+                return key
+        return None
+
+    def set_plan(self, key, plan=None, error=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['plan'] = plan
+                entry['plan_error'] = error
+                entry['explain_pending'] = False
+
+    def entries(self):
+        """Snapshots of every entry, most total time first."""
+        with self._lock:
+            snapshot = [dict(entry, views=dict(entry['views'])) for entry in self._entries.values()]
+        for entry in snapshot:
+            entry['avg_ms'] = round(entry['total_ms'] / entry['count'], 3)
+            entry['total_ms'] = round(entry['total_ms'], 3)
+            entry['max_ms'] = round(entry['max_ms'], 3)
+            entry['last_ms'] = round(entry['last_ms'], 3)
+        return sorted(snapshot, key=lambda entry: entry['total_ms'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(max_entries=500)
+
+# --- EXPLAIN capture ---
+
+_explaining = threading.local()  # Set on the EXPLAIN thread so its own queries are not logged
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+        return _executor
+
+
+def explain(alias, sql, params):
+    """The plan of a statement as text, from the database's plain EXPLAIN."""
+    connection = connections[alias]
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        rows = cursor.fetchall()
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+def _explain_job(key, alias, sql, params):
+    # Runs on the executor thread, which has its own database connections.
+    _explaining.active = True
+    try:
+        slow_query_log.set_plan(key, plan=explain(alias, sql, params))
+    except Exception as e:
+        slow_query_log.set_plan(key, error=str(e))
+    finally:
+        connections[alias].close()
+
+
+def schedule_explain(key, alias, sql, params):
+    future = get_executor().submit(_explain_job, key, alias, sql, params)
+    _pending.add(future)
+    future.add_done_callback(_pending.discard)
+
+
+def wait_for_explains(timeout=None):
+    """Blocks until the EXPLAINs scheduled so far have finished (used by tests and scripts)."""
+    for future in list(_pending):
+        future.result(timeout=timeout)
+
+
+# --- Hooks ---
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    threshold = settings.SLOW_QUERY_MS
+    if threshold is None or getattr(_explaining, 'active', False):
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= threshold:
+            alias = context['connection'].alias
+            # executemany params are an iterator that has been consumed; there is nothing to explain
+            logged_params = None if many else tuple(params or ())
+            key = slow_query_log.record(sql, logged_params, duration_ms, current_view.get(), alias)
+            if key is not None and not many and settings.SLOW_QUERY_EXPLAIN:
+                schedule_explain(key, alias, sql, logged_params)
+
+
+@receiver(connection_created, dispatch_uid='myapp.slow_queries.install')
+def _install_wrapper(sender, connection, **kwargs):
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+class SlowQueryMiddleware:
+    """Records which view is handling the request, so slow queries can be attributed to it."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_view.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        current_view.set(match.view_name if match and match.view_name else getattr(view_func, '__name__', None))
@@ -0,0 +1,53 @@
+# myapp/summaries.py
+"""
+Denormalized order summaries.
+
+An order's items never change after checkout, so when an order is written we
+store its serialized item lines and customer details on ``Order.summary``.
+Order lists are then rendered from the ``myapp_order`` table alone, without
+joining ``auth_user`` or fetching ``OrderItem`` rows.
+"""
+
+from .money import format_cents
+
+# Columns needed to render an order from its summary; everything else is deferred.
+SUMMARY_FIELDS = ('id', 'user_id', 'order_date', 'total_amount_cents', 'status', 'payment_status', 'menu_date', 'summary')
+
+
+def serialize_order_item(item):
+    return {
+        'meal_name': item.meal_name,
+        'quantity': item.quantity,
+        'price_at_order': format_cents(item.price_at_order_cents),
+        'total_item_price': format_cents(item.total_item_price_cents),
+        'meal_id': item.meal_id # Include meal ID if linked
+    }
+
+
+def build_order_summary(user, items):
+    """Snapshot of the customer and item lines, stored on Order.summary."""
+    return {
+        'customer_name': user.first_name if user.first_name else user.username,
+        'user_email': user.email,
+        'items': [serialize_order_item(item) for item in items],
+    }
+
+
+def serialize_order_from_summary(order):
+    """Same shape as views.serialize_order, built from the summary snapshot alone."""
+    summary = order.summary
+    total = format_cents(order.total_amount_cents)
+    return {
+        'id': order.id,
+        'user_email': summary['user_email'],
+        'customer_id': order.user_id,
+        'order_date': order.order_date.isoformat(),
+        'total_amount': total,
+        'status': order.status,
+        'payment_status': order.payment_status,
+        'menu_date': order.menu_date.isoformat() if order.menu_date else None,
+        'items': summary['items'],
+        'customer_name': summary['customer_name'],
+        'date': order.order_date.strftime('%Y-%m-%d %H:%M:%S'),
+        'total': total
+    }
@@ -0,0 +1,124 @@
+# myapp/thumbnails.py
+"""
+Local storage of uploaded meal images and background thumbnail generation.
+
+Originals are stored under MEDIA_ROOT with a content-hashed filename, so the
+same photo uploaded twice is stored once and every URL can be cached forever.
+Resizing happens in a process pool: the request only hashes and stores the
+upload, and the meal's ``thumbnails`` column is filled in once the worker is done.
+"""
+
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .cache import bump_catalogue
+from .imaging import render_thumbnails
+from .models import Meal
+
+ALLOWED_CONTENT_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+}
+
+ORIGINALS_DIR = 'meals/originals'
+THUMBNAILS_DIR = 'meals/thumbs'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.MEAL_THUMBNAIL_WORKERS)
+        return _executor
+
+
+def content_digest(uploaded_file):
+    sha = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        sha.update(chunk)
+    uploaded_file.seek(0)
+    return sha.hexdigest()[:20]
+
+
+def validate_upload(uploaded_file):
+    """Raises ValueError with a user-facing message if the upload is not acceptable."""
+    if uploaded_file.content_type not in ALLOWED_CONTENT_TYPES:
+        raise ValueError(f'Unsupported image type {uploaded_file.content_type!r}. Use JPEG, PNG, WebP or GIF.')
+    if uploaded_file.size > settings.MEAL_IMAGE_MAX_BYTES:
+        raise ValueError(f'Image is too large. The limit is {settings.MEAL_IMAGE_MAX_BYTES // (1024 * 1024)} MB.')
+
+
+def store_original(uploaded_file):
+    """Saves the upload under its content hash and returns (digest, storage name)."""
+    digest = content_digest(uploaded_file)
+    extension = ALLOWED_CONTENT_TYPES[uploaded_file.content_type]
+    name = f'{ORIGINALS_DIR}/{digest}.{extension}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, uploaded_file)
+    return digest, name
+
+
+def _record_thumbnails(meal_id, digest, future):
+    # Runs on the executor's callback thread in the web process, never on a request thread.
+    try:
+        rendered = future.result()
+    except Exception as e:
+        print(f"Thumbnail generation failed for meal {meal_id}: {e}")
+        return
+    try:
+        thumbnails = {
+            width: {extension: f'{THUMBNAILS_DIR}/{filename}' for extension, filename in variants.items()}
+            for width, variants in rendered.items()
+        }
+        # Only if the image was not replaced again while this batch was rendering.
+        if Meal.objects.filter(id=meal_id, image_digest=digest).update(thumbnails=thumbnails):
+            bump_catalogue()  # update() sends no post_save; cached menu bodies embed thumbnail URLs
+        print(f"Stored {len(thumbnails)} thumbnail sizes for meal {meal_id}.")
+    finally:
+        connection.close()  # This thread's own connection; nothing else will close it.
+
+
+def schedule_thumbnails(meal):
+    """Queues thumbnail generation for the meal's stored original image."""
+    future = get_executor().submit(
+        render_thumbnails,
+        default_storage.path(meal.image.name),
+        meal.image_digest,
+        default_storage.path(THUMBNAILS_DIR),
+        list(settings.MEAL_THUMBNAIL_WIDTHS),
+    )
+    meal_id, digest = meal.id, meal.image_digest
+    future.add_done_callback(lambda f: _record_thumbnails(meal_id, digest, f))
+    return future
+
+
+def attach_image(meal, uploaded_file):
+    """
+    Stores the upload as the meal's original image and queues its thumbnails
+    once the change is committed. The previous thumbnails are cleared until the
+    new ones are ready.
+    """
+    digest, name = store_original(uploaded_file)
+    meal.image = name
+    meal.image_digest = digest
+    meal.thumbnails = {}
+    meal.save(update_fields=['image', 'image_digest', 'thumbnails', 'updated_at'])
+    transaction.on_commit(lambda: schedule_thumbnails(meal))
+
+
+def thumbnail_urls(meal):
+    """{width: {extension: url}} for the serializer."""
+    return {
+        width: {extension: default_storage.url(name) for extension, name in variants.items()}
+        for width, variants in (meal.thumbnails or {}).items()
+    }
@@ -13,11 +13,32 @@ urlpatterns = [
 
     # Meal and Menu URLs
     path('meals/', views.meals_list_create_view, name='meals_list_create'),
+    path('meals/<int:meal_id>/image/', views.meal_image_view, name='meal_image'),
     path('daily-menu/', views.daily_menu_view, name='daily_menu_create'),
     path('daily-menu/today/menu/', views.daily_menu_view, name='daily_menu_today'), # For GET today's menu
 
     # Order and Payment URLs
     path('orders/', views.orders_list_create_view, name='orders_list_create'),
+    path('orders/export/', views.orders_export_view, name='orders_export'),
     path('orders/today/revenue/', views.daily_revenue_view, name='daily_revenue'),
     path('payment/mpesa/', views.mpesa_payment_view, name='mpesa_payment'),
+    path('kitchen/totals/', views.kitchen_totals_view, name='kitchen_totals'),
+
+    # Cart URLs: the cart lives in the cache until checkout
+    path('cart/', views.cart_view, name='cart'),
+    path('cart/items/', views.cart_items_view, name='cart_items'),
+    path('cart/items/<int:meal_id>/', views.cart_item_view, name='cart_item'),
+    path('cart/checkout/', views.cart_checkout_view, name='cart_checkout'),
+
+    # Dashboard bootstrap: everything a dashboard needs on mount, in one request
+    path('dashboard/admin/', views.admin_dashboard_view, name='admin_dashboard'),
+    path('dashboard/customer/', views.customer_dashboard_view, name='customer_dashboard'),
+
+    # Operations
+    path('cache/stats/', views.cache_stats_view, name='cache_stats'),
+    path('outbox/stats/', views.outbox_stats_view, name='outbox_stats'),
+    path('queries/slow/', views.slow_queries_view, name='slow_queries'),
+    path('profiles/', views.profiles_list_view, name='profiles_list'),
+    path('profiles/<str:capture_id>/', views.profile_detail_view, name='profile_detail'),
+    path('profiles/<str:capture_id>/download/', views.profile_download_view, name='profile_download'),
 ]
\ No newline at end of file
@@ -1,54 +1,170 @@
 from django.shortcuts import render
-from django.http import HttpResponse, JsonResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+import heapq
 import json
+import os
+import re
 from datetime import date
+from itertools import islice
+from operator import itemgetter
 
 
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError
+from django.utils.crypto import get_random_string
 
 
 from .models import Meal, DailyMenu, Order, OrderItem
+from .cache import (
+    all_stats, catalogue_version, get_catalogue_body, get_order_history, order_history_version,
+    set_catalogue_body, set_order_history,
+)
+from .carts import CartError, add_to_cart, cart_data, checkout, clear_cart, get_cart, set_quantity
+from .compression import precompressed_json, precompressed_response
+from .exports import iter_orders_csv
+from .dashboard import run_concurrently
+from .fieldsets import MEAL_FIELDS, ORDER_FIELDS, columns_for, fields_key, parse_fields, serialize_fields
+from .menus import MAX_MENU_RANGE_DAYS, menus_for_range, plan_menus
+from .money import format_cents, to_cents
+from .order_filters import filter_orders, parse_order_filters
+from .orders import apply_transition, place_order
+from .outbox import outbox_metrics
+from .preorders import check_menu_date, cutoff_for, kitchen_totals, parse_menu_date
+from .profiling import capture_path, list_captures, load_capture, top_functions
+from .revenue import revenue_data, revenue_totals, stored_revenue
+from .search import parse_search_params, search_meals
+from .sharding import gather, shard_for_order, user_orders
+from .slow_queries import slow_query_log
+from .summaries import SUMMARY_FIELDS, serialize_order_from_summary, serialize_order_item
+from .thumbnails import attach_image, thumbnail_urls, validate_upload
 def serialize_meal(meal):
     return {
         'id': meal.id,
         'name': meal.name,
         'description': meal.description,
-        'price': float(meal.price),
+        'price': format_cents(meal.price_cents),
         'category': meal.category,
-        'image_url': meal.image_url,
+        'image_url': meal.image_url or (meal.image.url if meal.image else None),
+        'thumbnails': thumbnail_urls(meal), # {width: {'webp': url, 'jpg': url}}, empty until generated
         'created_at': meal.created_at.isoformat(),
         'updated_at': meal.updated_at.isoformat(),
     }
 def serialize_order(order):
-    items_data = []
-    for item in order.items.all():
-        items_data.append({
-            'meal_name': item.meal_name,
-            'quantity': item.quantity,
-            'price_at_order': float(item.price_at_order),
-            'total_item_price': float(item.total_item_price),
-            'meal_id': item.meal.id if item.meal else None # Include meal ID if linked
-        })
+    items_data = [serialize_order_item(item) for item in order.items.all()]
 
     return {
         'id': order.id,
         'user_email': order.user.email,
         'customer_id': order.user.id, # Using user ID as customer_id for now
         'order_date': order.order_date.isoformat(),
-        'total_amount': float(order.total_amount),
+        'total_amount': format_cents(order.total_amount_cents),
         'status': order.status,
         'payment_status': order.payment_status,
+        'menu_date': order.menu_date.isoformat() if order.menu_date else None,
         'items': items_data,
         'customer_name': order.user.first_name if order.user.first_name else order.user.username,
         # Frontend expects 'date' and 'total' keys directly for CustomerDashboard
         'date': order.order_date.strftime('%Y-%m-%d %H:%M:%S'),
-        'total': float(order.total_amount)
+        'total': format_cents(order.total_amount_cents)
     }
 
 
+# Data behind the GET endpoints, shared with the dashboard bootstrap views
+
+def meal_catalogue_variants():
+    """The full meal list as {encoding: bytes}, cached per catalogue version and compressed once."""
+    version = catalogue_version()
+    variants = get_catalogue_body('meals', version)
+    if variants is None:
+        variants = precompressed_json([serialize_meal(meal) for meal in Meal.objects.all()])
+        set_catalogue_body('meals', version, variants)
+    return variants
+
+
+def daily_menu_variants(menu_date):
+    """
+    {"date", "meals"} for one day as {encoding: bytes}. Every customer fetches the same
+    body; the scheduler builds tomorrow's ahead of midnight (see myapp/jobs.py).
+    """
+    version = catalogue_version()
+    variants = get_catalogue_body(f'daily-menu:{menu_date}', version)
+    if variants is not None:
+        print(f"Returning cached daily menu for {menu_date}.")
+        return variants
+
+    # Try to get the menu for that day
+    daily_menu = DailyMenu.objects.filter(date=menu_date).first()
+    if daily_menu is None:
+        print(f"No daily menu found for {menu_date}.")
+        meals_on_menu = [] # Return empty if no menu for that day
+    else:
+        meals_on_menu = [serialize_meal(meal) for meal in daily_menu.meals.all()]
+        print(f"Returning daily menu for {menu_date} from database.")
+    variants = precompressed_json({"date": menu_date.isoformat(), "meals": meals_on_menu})
+    set_catalogue_body(f'daily-menu:{menu_date}', version, variants)
+    return variants
+
+
+def order_rows(orders, fields=None):
+    """
+    [((order_date, id), serialized order)] for an Order queryset, in its order, narrowed
+    to a parsed ?fields= selection if given. The keys let shard results be merged.
+    """
+    if fields:
+        columns = columns_for(fields, ORDER_FIELDS)
+        rows = orders.values(*columns, *[column for column in ('order_date', 'id') if column not in columns])
+        return [((row['order_date'], row['id']), serialize_fields(row, fields, ORDER_FIELDS)) for row in rows]
+    # Orders are rendered from their denormalized summary: a single-table scan,
+    # no join on auth_user and no OrderItem fetch.
+    return [((order.order_date, order.id), serialize_order_from_summary(order)) for order in orders.only(*SUMMARY_FIELDS)]
+
+
+def serialize_orders(orders, fields=None):
+    """Serializes an Order queryset, narrowed to a parsed ?fields= selection if given."""
+    return [data for _, data in order_rows(orders, fields)]
+
+
+def all_orders(filters=None, fields=None):
+    """
+    Every customer's orders, newest first, for staff. Each shard is queried in parallel
+    and the sorted results are merged; a ``limit`` filter caps each shard and the merge.
+    """
+    filters = filters or {}
+    per_shard = gather(lambda alias: order_rows(
+        filter_orders(Order.objects.using(alias).order_by('-order_date', '-id'), filters), fields,
+    ))
+    merged = heapq.merge(*per_shard, key=itemgetter(0), reverse=True)
+    return [data for _, data in islice(merged, filters.get('limit'))]
+
+
+def customer_order_history(user, fields=None):
+    """
+    The customer's orders as a JSON string. Cached per user, version and fieldset;
+    any write to one of their orders bumps the version.
+    """
+    # Read the version before the orders so a concurrent write can't be cached as current.
+    version = order_history_version(user.id)
+    variant = fields_key(fields) if fields else ''
+    payload = get_order_history(user.id, version, variant)
+    if payload is None:
+        orders_data = serialize_orders(user_orders(user), fields)
+        payload = set_order_history(user.id, version, orders_data, variant)
+        print(f"Returning {len(orders_data)} orders from database.")
+    else:
+        print(f"Returning cached order history for {user.email}.")
+    return payload
+
+
+def daily_revenue_data(today):
+    # Orders placed today whose payment is completed, summed by the database
+    return revenue_data(*revenue_totals(today))
+
+
 # Create your views here.
 
 def hello_world(request):
@@ -158,22 +274,63 @@ def meals_list_create_view(request):
         return JsonResponse({'error': 'Permission denied. Only administrators can manage meals.'}, status=403)
 
     if request.method == 'GET':
-        meals = Meal.objects.all()
-        meals_data = [serialize_meal(meal) for meal in meals]
-        print("Returning meals list from database.")
+        # Optional server-side search: ?q=&category=&min_price=&max_price=
+        try:
+            filters = parse_search_params(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # Optional sparse fieldset: ?fields=id,name,price loads and returns only those fields
+        try:
+            fields = parse_fields(request.GET.get('fields'), MEAL_FIELDS)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        columns = columns_for(fields, MEAL_FIELDS) if fields else None
+
+        searching = any(value is not None for value in filters.values())
+        if not searching and not fields:
+            print("Returning meal catalogue.")
+            return precompressed_response(meal_catalogue_variants())
+
+        if searching:
+            meals = search_meals(**filters, only=columns)
+        else:
+            meals = Meal.objects.only(*columns) if columns else Meal.objects.all()
+        if fields:
+            meals_data = [serialize_fields(meal, fields, MEAL_FIELDS) for meal in meals]
+        else:
+            meals_data = [serialize_meal(meal) for meal in meals]
+        print(f"Returning {len(meals_data)} meals from database.")
         return JsonResponse(meals_data, safe=False)
     elif request.method == 'POST':
         try:
-            data = json.loads(request.body)
+            # Either JSON, or multipart/form-data with the same fields plus an 'image' file
+            if request.content_type == 'multipart/form-data':
+                data = request.POST
+                image = request.FILES.get('image')
+            else:
+                data = json.loads(request.body)
+                image = None
             if not all(k in data for k in ['name', 'description', 'price', 'category']):
                 return JsonResponse({'error': 'Missing required meal fields (name, description, price, category).'}, status=400)
+            try:
+                price_cents = to_cents(data.get('price'))
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            if image is not None:
+                try:
+                    validate_upload(image)
+                except ValueError as e:
+                    return JsonResponse({'error': str(e)}, status=400)
             meal = Meal.objects.create(
                 name=data.get('name'),
                 description=data.get('description'),
-                price=data.get('price'),
+                price_cents=price_cents,
                 category=data.get('category'),
-                image_url=data.get('image_url')
+                image_url=data.get('image_url') or None
             )
+            if image is not None:
+                attach_image(meal, image) # Thumbnails are generated in the background
             print(f"Meal '{meal.name}' created and saved to database.")
             return JsonResponse({
                 'message': 'Meal created successfully',
@@ -187,24 +344,76 @@ def meals_list_create_view(request):
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
 
+@csrf_exempt
+@login_required
+def meal_image_view(request, meal_id):
+    """
+    Handles POST (multipart/form-data, field 'image') to upload or replace a meal's image.
+    The original is stored right away; thumbnails appear in the meal once generated.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can manage meals.'}, status=403)
+
+    if request.method == 'POST':
+        image = request.FILES.get('image')
+        if image is None:
+            return JsonResponse({'error': 'An image file is required (multipart field "image").'}, status=400)
+        try:
+            validate_upload(image)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        try:
+            meal = Meal.objects.get(id=meal_id)
+        except Meal.DoesNotExist:
+            return JsonResponse({'error': 'Meal not found.'}, status=404)
+
+        try:
+            attach_image(meal, image)
+        except Exception as e:
+            print(f"Error storing image for meal {meal_id}: {e}")
+            return JsonResponse({'error': f'Failed to store image: {str(e)}'}, status=500)
+
+        print(f"Image for meal '{meal.name}' stored; thumbnails queued.")
+        return JsonResponse({'message': 'Image uploaded successfully', 'meal': serialize_meal(meal)}, status=202)
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
 @csrf_exempt
 @login_required # Protect this view
 def daily_menu_view(request):
     """
-    Handles GET for today's menu and POST for creating/updating a daily menu.
+    Handles GET for today's menu (or every menu in ?from=YYYY-MM-DD&to=YYYY-MM-DD)
+    and POST for creating/updating daily menus, either one date
+    ({"date", "meal_ids"}) or several at once ({"menus": [{"date", "meal_ids"}, ...]}).
     Only allows 'admin' users to create/update menus.
     """
     if request.method == 'GET':
+        if 'from' in request.GET or 'to' in request.GET:
+            try:
+                start = date.fromisoformat(request.GET.get('from', ''))
+                end = date.fromisoformat(request.GET.get('to', ''))
+            except ValueError:
+                return JsonResponse({'error': 'Both from and to are required. Use YYYY-MM-DD.'}, status=400)
+            if end < start:
+                return JsonResponse({'error': 'to must not be before from.'}, status=400)
+            if (end - start).days + 1 > MAX_MENU_RANGE_DAYS:
+                return JsonResponse({'error': f'A menu range can span at most {MAX_MENU_RANGE_DAYS} days.'}, status=400)
+
+            serialized = {} # The same dish shows up on many days; serialize it once
+            menus_data = []
+            for menu_date, meals in menus_for_range(start, end):
+                for meal in meals:
+                    if meal.id not in serialized:
+                        serialized[meal.id] = serialize_meal(meal)
+                menus_data.append({"date": menu_date.isoformat(), "meals": [serialized[meal.id] for meal in meals]})
+            print(f"Returning daily menus from {start} to {end}.")
+            return JsonResponse({"from": start.isoformat(), "to": end.isoformat(), "menus": menus_data})
+
         today = date.today()
         try:
-            # Try to get the menu for today
-            daily_menu = DailyMenu.objects.get(date=today)
-            meals_on_menu = [serialize_meal(meal) for meal in daily_menu.meals.all()]
-            print(f"Returning daily menu for {today} from database.")
-            return JsonResponse({"date": today.isoformat(), "meals": meals_on_menu})
-        except DailyMenu.DoesNotExist:
-            print(f"No daily menu found for {today}.")
-            return JsonResponse({"date": today.isoformat(), "meals": []}) # Return empty if no menu for today
+            return precompressed_response(daily_menu_variants(today))
         except Exception as e:
             print(f"Error fetching daily menu: {e}")
             return JsonResponse({'error': 'An internal server error occurred while fetching menu'}, status=500)
@@ -215,28 +424,43 @@ def daily_menu_view(request):
         
         try:
             data = json.loads(request.body)
-            menu_date_str = data.get('date')
-            meal_ids = data.get('meal_ids', [])
-
-            if not menu_date_str or not isinstance(meal_ids, list):
-                return JsonResponse({'error': 'Missing date or meal_ids for daily menu.'}, status=400)
-            
-            menu_date = date.fromisoformat(menu_date_str)
-
-            # Get or create the DailyMenu for the specified date
-            daily_menu, created = DailyMenu.objects.get_or_create(date=menu_date)
-            
-            # Clear existing meals and add new ones
-            daily_menu.meals.clear()
-            meals_to_add = Meal.objects.filter(id__in=meal_ids)
-            daily_menu.meals.add(*meals_to_add)
-            
-            print(f"Daily menu for {menu_date} {'created' if created else 'updated'} with {len(meals_to_add)} meals.")
-            return JsonResponse({'message': f'Daily menu for {menu_date} created/updated successfully'}, status=201)
+            bulk = 'menus' in data
+            entries = data.get('menus') if bulk else [data]
+            if not isinstance(entries, list) or not entries:
+                return JsonResponse({'error': 'menus must be a non-empty list of {date, meal_ids}.'}, status=400)
+
+            plans = {}
+            for entry in entries:
+                menu_date_str = entry.get('date') if isinstance(entry, dict) else None
+                meal_ids = entry.get('meal_ids', []) if isinstance(entry, dict) else None
+
+                if not menu_date_str or not isinstance(meal_ids, list):
+                    return JsonResponse({'error': 'Missing date or meal_ids for daily menu.'}, status=400)
+
+                try:
+                    meal_ids = [int(meal_id) for meal_id in meal_ids]
+                except (TypeError, ValueError):
+                    return JsonResponse({'error': 'meal_ids must be a list of meal IDs.'}, status=400)
+
+                menu_date = date.fromisoformat(menu_date_str)
+                if menu_date in plans:
+                    return JsonResponse({'error': f'Date {menu_date} appears more than once.'}, status=400)
+                plans[menu_date] = meal_ids
+
+            # Only the meals that changed are inserted/deleted, in a single transaction
+            report = plan_menus(plans)
+
+            for menu_date, changes in report.items():
+                print(f"Daily menu for {menu_date} {'created' if changes['created'] else 'updated'}: "
+                      f"{len(changes['added'])} meals added, {len(changes['removed'])} removed.")
+            menus_data = [{'date': menu_date.isoformat(), **changes} for menu_date, changes in report.items()]
+            if bulk:
+                return JsonResponse({'message': f'{len(report)} daily menus created/updated successfully', 'menus': menus_data}, status=201)
+            return JsonResponse({'message': f'Daily menu for {menu_date} created/updated successfully', 'menus': menus_data}, status=201)
 
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
-        except ValueError: # For date parsing errors
+        except (ValueError, TypeError): # For date parsing errors
             return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
         except Exception as e:
             print(f"Error creating daily menu: {e}")
@@ -249,20 +473,32 @@ def daily_menu_view(request):
 @login_required
 def orders_list_create_view(request):
     if request.method == 'GET':
+        # Optional sparse fieldset, e.g. ?fields=id,status,total,items.meal_name: only the
+        # columns (and summary keys) behind those fields are read and serialized. Optional
+        # filters, e.g. ?status=pending,confirmed&from=2025-08-01&customer=jane, each map to
+        # an indexed predicate (see myapp/order_filters.py).
+        try:
+            fields = parse_fields(request.GET.get('fields'), ORDER_FIELDS)
+            filters = parse_order_filters(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
         if request.user.is_staff: # Admin can see all orders
-            orders = Order.objects.all().prefetch_related('items').select_related('user')
-        else: # Customer can only see their own orders
-            orders = Order.objects.filter(user=request.user).prefetch_related('items').select_related('user')
-        
-        orders_data = [serialize_order(order) for order in orders]
-        print(f"Returning {len(orders_data)} orders from database.")
-        return JsonResponse(orders_data, safe=False)
+            orders_data = all_orders(filters, fields)
+            print(f"Returning {len(orders_data)} orders from database.")
+            return JsonResponse(orders_data, safe=False)
+
+        # Customer can only see their own orders
+        if filters: # Filtered reads skip the per-user history cache
+            orders_data = serialize_orders(filter_orders(user_orders(request.user), filters), fields)
+            return JsonResponse(orders_data, safe=False)
+        return HttpResponse(customer_order_history(request.user, fields), content_type='application/json')
 
     elif request.method == 'POST':
         try:
             data = json.loads(request.body)
             meal_id = data.get('meal_id')
-            quantity = data.get('quantity', 1)
+            quantity = int(data.get('quantity', 1))
 
             if not meal_id or not quantity:
                 return JsonResponse({'error': 'Meal ID and quantity are required to place an order.'}, status=400)
@@ -271,31 +507,19 @@ def orders_list_create_view(request):
                 meal = Meal.objects.get(id=meal_id)
             except Meal.DoesNotExist:
                 return JsonResponse({'error': 'Meal not found.'}, status=404)
-            
-            # Create the order
-            order = Order.objects.create(
-                user=request.user,
-                customer_name=request.user.first_name if request.user.first_name else request.user.username,
-                customer_email=request.user.email,
-                status='pending', # Default status
-                payment_status='pending' # Default payment status
-            )
 
-            # Create the order item
-            order_item = OrderItem.objects.create(
-                order=order,
-                meal=meal,
-                meal_name=meal.name,
-                price_at_order=meal.price,
-                quantity=quantity
-            )
+            # Optional "date": a later day's menu makes this a pre-order (see myapp/preorders.py)
+            try:
+                menu_date = parse_menu_date(data.get('date'))
+                check_menu_date(menu_date, [meal.id])
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
             
-            # Update total amount of the order
-            order.total_amount = order_item.total_item_price
-            order.save()
+            # One INSERT per row: the total and summary are written with the order itself
+            order = place_order(request.user, meal, quantity, menu_date)
 
             print(f"Order {order.id} placed successfully by {request.user.email}.")
-            return JsonResponse({'message': 'Order placed successfully', 'order': serialize_order(order)}, status=201)
+            return JsonResponse({'message': 'Order placed successfully', 'order': serialize_order_from_summary(order)}, status=201)
 
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
@@ -306,36 +530,160 @@ def orders_list_create_view(request):
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
 
+@csrf_exempt
+@login_required
+def orders_export_view(request):
+    """
+    Handles GET for a CSV export of every order line placed between ?from= and ?to=
+    (YYYY-MM-DD, inclusive). The file is streamed, so memory use does not grow with
+    the range. Only accessible by 'admin' users.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can export orders.'}, status=403)
+
+    if request.method == 'GET':
+        try:
+            start = date.fromisoformat(request.GET.get('from', ''))
+            end = date.fromisoformat(request.GET.get('to', ''))
+        except ValueError:
+            return JsonResponse({'error': 'Both from and to are required. Use YYYY-MM-DD.'}, status=400)
+        if end < start:
+            return JsonResponse({'error': 'to must not be before from.'}, status=400)
+
+        response = StreamingHttpResponse(iter_orders_csv(start, end), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="orders_{start}_{end}.csv"'
+        print(f"Streaming order export from {start} to {end} for {request.user.email}.")
+        return response
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def cart_view(request):
+    """
+    Handles GET for the customer's cart and DELETE to empty it.
+    Carts live in the cache (see myapp/carts.py): nothing here writes to the database.
+    """
+    if request.method == 'GET':
+        return JsonResponse(cart_data(get_cart(request.user.id)))
+    elif request.method == 'DELETE':
+        clear_cart(request.user.id)
+        return JsonResponse(cart_data([]))
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def cart_items_view(request):
+    """
+    Handles POST to add a meal to the cart: {"meal_id", "quantity" (default 1)}.
+    Adding a meal that is already in the cart adds to its quantity.
+    """
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            lines = add_to_cart(request.user.id, data.get('meal_id'), data.get('quantity', 1))
+            return JsonResponse(cart_data(lines))
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except CartError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def cart_item_view(request, meal_id):
+    """
+    Handles PUT to set the quantity of a meal in the cart ({"quantity"}, 0 removes it)
+    and DELETE to remove it.
+    """
+    if request.method in ('PUT', 'DELETE'):
+        try:
+            quantity = json.loads(request.body).get('quantity') if request.method == 'PUT' else 0
+            lines = set_quantity(request.user.id, meal_id, quantity)
+            return JsonResponse(cart_data(lines))
+        except (json.JSONDecodeError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except CartError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def cart_checkout_view(request):
+    """
+    Handles POST to turn the cart into one order, for today or, with {"date": "YYYY-MM-DD"},
+    a later day's menu. If a meal or its price changed since the cart was last read,
+    nothing is ordered and the refreshed cart comes back with a 409.
+    """
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body) if request.content_type == 'application/json' else {}
+            menu_date = parse_menu_date(data.get('date'))
+        except (json.JSONDecodeError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        try:
+            order = checkout(request.user, menu_date)
+        except CartError as e:
+            return JsonResponse({'error': str(e), 'cart': cart_data(get_cart(request.user.id))}, status=e.status)
+        print(f"Order {order.id} checked out from the cart of {request.user.email}.")
+        return JsonResponse({'message': 'Order placed successfully', 'order': serialize_order_from_summary(order)}, status=201)
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
 @csrf_exempt
 @login_required # Protect this view
 def daily_revenue_view(request):
     """
-    Handles GET for today's revenue. Only accessible by 'admin' users.
+    Handles GET for today's revenue, or an earlier day's with ?date=YYYY-MM-DD
+    (served from its DailyRevenue rollup). Only accessible by 'admin' users.
     """
     if not request.user.is_staff:
         return JsonResponse({'error': 'Permission denied. Only administrators can view revenue.'}, status=403)
 
     if request.method == 'GET':
         today = date.today()
-        # Filter orders for today and where payment is completed
-        today_completed_orders = Order.objects.filter(
-            order_date__date=today,
-            payment_status='completed'
-        )
-        
-        total_revenue = sum(order.total_amount for order in today_completed_orders)
-        total_orders = today_completed_orders.count()
-
-        revenue_data = {
-            "total_revenue": float(total_revenue), # Convert Decimal to float
-            "total_orders": total_orders
-        }
-        print(f"Returning daily revenue for {today}.")
-        return JsonResponse(revenue_data)
+        try:
+            day = date.fromisoformat(request.GET['date']) if 'date' in request.GET else today
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+        if day > today:
+            return JsonResponse({'error': 'date must not be in the future.'}, status=400)
+        print(f"Returning daily revenue for {day}.")
+        if day == today:
+            return JsonResponse(daily_revenue_data(today))
+        return JsonResponse(stored_revenue(day))
     
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
 
+@csrf_exempt
+@login_required
+def kitchen_totals_view(request):
+    """
+    Handles GET for how much of each dish to cook on ?date=YYYY-MM-DD (default today):
+    the quantities of every order for that day's menu that is not cancelled.
+    Only accessible by 'admin' users.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can view kitchen totals.'}, status=403)
+
+    if request.method == 'GET':
+        try:
+            day = parse_menu_date(request.GET.get('date'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        totals = kitchen_totals(day)
+        return JsonResponse({'date': day.isoformat(), 'closes_at': cutoff_for(day).isoformat(), 'dishes': totals})
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
 @csrf_exempt
 @login_required # Protect this view
 def mpesa_payment_view(request):
@@ -351,20 +699,35 @@ def mpesa_payment_view(request):
 
             if not order_id or not phone:
                 return JsonResponse({'error': 'Order ID and phone number are required.'}, status=400)
-            
             try:
-                order = Order.objects.get(id=order_id, user=request.user) # Ensure user owns the order
-            except Order.DoesNotExist:
-                return JsonResponse({'error': 'Order not found or you do not have permission to pay for it.'}, status=404)
+                order_id = int(order_id) # The id also says which shard holds the order
+            except (TypeError, ValueError):
+                return JsonResponse({'error': 'Order ID must be a number.'}, status=400)
             
             # Simulate M-Pesa payment success
-            # In a real application, you would integrate with an actual M-Pesa API here
-            order.payment_status = 'completed'
-            order.status = 'confirmed' # Mark order as confirmed after payment
-            order.save()
+            # In a real application, you would integrate with an actual M-Pesa API here.
+            # Its callback carries the transaction ID (receipt number) that settlement
+            # statements are reconciled by (see myapp/reconciliation.py); simulate one if absent.
+            transaction_id = str(data.get('transaction_id') or f"SIM{get_random_string(7, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')}")
+            # Order.mpesa_transaction_id holds up to 32 characters; receipt numbers are letters and digits
+            if not re.fullmatch(r'[A-Za-z0-9]{1,32}', transaction_id):
+                return JsonResponse({'error': 'Transaction ID must be 1 to 32 letters and digits.'}, status=400)
+            # The transition only applies to the user's own order, and only while it is unpaid.
+            try:
+                result = apply_transition(order_id, 'pay', user=request.user, extra_changes={'mpesa_transaction_id': transaction_id})
+            except IntegrityError: # The transaction ID is unique: it already paid another order
+                return JsonResponse({'error': f'Transaction {transaction_id} was already used for another order.'}, status=409)
+            if result.status is None:
+                return JsonResponse({'error': 'Order not found or you do not have permission to pay for it.'}, status=404)
+
+            if not result.applied:
+                if result.payment_status == 'completed': # Duplicate callback: answer with the transaction that paid it
+                    paid_with = Order.objects.using(shard_for_order(order_id)).filter(id=order_id).values_list('mpesa_transaction_id', flat=True).first()
+                    return JsonResponse({'success': True, 'transaction_id': paid_with, 'message': 'Order was already paid'}, status=200)
+                return JsonResponse({'error': f'Order cannot be paid while it is {result.status}.'}, status=409)
 
-            print(f"M-Pesa payment simulated for order {order_id} from {phone}. Order status updated.")
-            return JsonResponse({'success': True, 'transaction_id': 'MPESA_SIM_TXN_12345', 'message': 'Payment processed successfully'}, status=200)
+            print(f"M-Pesa payment {transaction_id} simulated for order {order_id} from {phone}. Order status updated.")
+            return JsonResponse({'success': True, 'transaction_id': transaction_id, 'message': 'Payment processed successfully'}, status=200)
 
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
@@ -372,4 +735,196 @@ def mpesa_payment_view(request):
             print(f"Error processing M-Pesa payment: {e}")
             return JsonResponse({'error': f'Failed to process payment: {str(e)}'}, status=500)
     
-    return JsonResponse({'error': 'Method not allowed'}, status=405)
\ No newline at end of file
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def cache_stats_view(request):
+    """
+    Handles GET for the hit/miss statistics of this worker's response caches.
+    Only accessible by 'admin' users.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can view cache statistics.'}, status=403)
+
+    if request.method == 'GET':
+        return JsonResponse({'pid': os.getpid(), 'caches': all_stats()})
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+def json_object_body(parts):
+    """Joins already-encoded JSON values into one object body without decoding them again."""
+    return b'{' + b', '.join(json.dumps(key).encode() + b': ' + value for key, value in parts.items()) + b'}'
+
+
+@csrf_exempt
+@login_required
+def admin_dashboard_view(request):
+    """
+    Handles GET for everything the admin dashboard loads on mount, in one response:
+    {"meals": [...], "orders": [...], "revenue": {...}}, each part exactly as
+    GET /api/meals/, /api/orders/ and /api/orders/today/revenue/ return it.
+    The three reads run concurrently. Only accessible by 'admin' users.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can view the admin dashboard.'}, status=403)
+
+    if request.method == 'GET':
+        today = date.today()
+        parts = run_concurrently({
+            'meals': lambda: meal_catalogue_variants()['identity'],
+            'orders': lambda: json.dumps(all_orders(), cls=DjangoJSONEncoder).encode(),
+            'revenue': lambda: json.dumps(daily_revenue_data(today)).encode(),
+        })
+        print(f"Returning admin dashboard for {request.user.email}.")
+        return HttpResponse(json_object_body(parts), content_type='application/json')
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def customer_dashboard_view(request):
+    """
+    Handles GET for everything the customer dashboard loads on mount, in one response:
+    {"menu": {"date", "meals"}, "orders": [...]}, as GET /api/daily-menu/today/menu/
+    and /api/orders/ return them. The two reads run concurrently.
+    """
+    if request.method == 'GET':
+        today = date.today()
+        user = request.user
+        parts = run_concurrently({
+            'menu': lambda: daily_menu_variants(today)['identity'],
+            'orders': lambda: customer_order_history(user).encode(),
+        })
+        print(f"Returning customer dashboard for {user.email}.")
+        return HttpResponse(json_object_body(parts), content_type='application/json')
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def outbox_stats_view(request):
+    """
+    Handles GET for the order event outbox: backlog, lag and recent throughput
+    (?window=<minutes>, default 5). Only accessible by 'admin' users.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can view outbox statistics.'}, status=403)
+
+    if request.method == 'GET':
+        try:
+            window = int(request.GET.get('window', 5))
+        except ValueError:
+            return JsonResponse({'error': 'window must be a number of minutes.'}, status=400)
+        if window < 1:
+            return JsonResponse({'error': 'window must be a number of minutes.'}, status=400)
+        return JsonResponse(outbox_metrics(window_minutes=window))
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def slow_queries_view(request):
+    """
+    Handles GET for this worker's slow-query log, aggregated by SQL fingerprint
+    and ordered by total time (?limit=N), and DELETE to reset it.
+    Only accessible by 'admin' users.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can view slow queries.'}, status=403)
+
+    if request.method == 'GET':
+        try:
+            limit = int(request.GET.get('limit', 50))
+        except ValueError:
+            return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+        entries = slow_query_log.entries()
+        return JsonResponse({
+            'pid': os.getpid(),
+            'threshold_ms': settings.SLOW_QUERY_MS,
+            'fingerprints': len(entries),
+            'queries': entries[:limit],
+        })
+
+    elif request.method == 'DELETE':
+        slow_query_log.clear()
+        return JsonResponse({'message': 'Slow-query log cleared.'})
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def profiles_list_view(request):
+    """
+    Handles GET for the list of captured request profiles, newest first.
+    Only accessible by 'admin' users.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can view profiles.'}, status=403)
+
+    if request.method == 'GET':
+        return JsonResponse({'profiles': list_captures()})
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def profile_detail_view(request, capture_id):
+    """
+    Handles GET for one captured profile: its request metadata, SQL log and the
+    top functions by cumulative time (?sort=tottime and ?limit=N are accepted).
+    Only accessible by 'admin' users.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can view profiles.'}, status=403)
+
+    if request.method == 'GET':
+        try:
+            capture = load_capture(capture_id)
+        except ValueError:
+            capture = None
+        if capture is None:
+            return JsonResponse({'error': 'Profile not found.'}, status=404)
+
+        sort = request.GET.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'ncalls'):
+            return JsonResponse({'error': 'sort must be one of cumulative, tottime, ncalls.'}, status=400)
+        try:
+            limit = int(request.GET.get('limit', 40))
+        except ValueError:
+            return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+
+        try:
+            capture['stats'] = top_functions(capture_id, limit=limit, sort=sort)
+        except FileNotFoundError: # Trimmed from the buffer since the metadata was read
+            return JsonResponse({'error': 'Profile not found.'}, status=404)
+        return JsonResponse(capture)
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@csrf_exempt
+@login_required
+def profile_download_view(request, capture_id):
+    """
+    Handles GET for the raw pstats file of a captured profile, for snakeviz,
+    pstats or gprof2dot. Only accessible by 'admin' users.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied. Only administrators can download profiles.'}, status=403)
+
+    if request.method == 'GET':
+        try:
+            stats_file = open(capture_path(capture_id, 'prof'), 'rb')
+        except (ValueError, FileNotFoundError):
+            return JsonResponse({'error': 'Profile not found.'}, status=404)
+        return FileResponse(stats_file, as_attachment=True, filename=f'{capture_id}.prof')
+
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
 
 application = get_asgi_application()
+
+# Periodic jobs in this worker, if SCHEDULER_AUTOSTART is set (see myapp/scheduler.py)
+from myapp.scheduler import start_scheduler  # noqa: E402
+
+start_scheduler()
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "myapp.compression.CompressionMiddleware",  # Early, so it sees the final response body
     "corsheaders.middleware.CorsMiddleware",  # ADDED: Place this high in the list
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -50,6 +51,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "myapp.slow_queries.SlowQueryMiddleware",
+    "myapp.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "myproject.urls"
@@ -88,6 +91,74 @@ DATABASES = {
     }
 }
 
+# Order shards (see myapp/sharding.py): each customer's orders live in one of these
+# databases, users/meals/menus stay in 'default'. ORDER_SHARD_HOSTS=db2,db3 adds shards
+# that copy the default connection settings with another host. Fixed once orders exist:
+# a shard's position is encoded in its order ids, and a new shard would take over some
+# customers without their existing orders.
+ORDER_SHARD_HOSTS = [host for host in os.environ.get('ORDER_SHARD_HOSTS', '').split(',') if host]
+for index, host in enumerate(ORDER_SHARD_HOSTS, start=1):
+    DATABASES[f'orders_{index}'] = {**DATABASES['default'], 'HOST': host}
+ORDER_SHARDS = ['default'] + [f'orders_{index}' for index in range(1, len(ORDER_SHARD_HOSTS) + 1)]
+DATABASE_ROUTERS = ['myapp.sharding.OrderShardRouter']
+# Threads per worker process that query the shards side by side for staff-wide reads
+SHARD_QUERY_WORKERS = int(os.environ.get('SHARD_QUERY_WORKERS', '4'))
+
+
+# Caches
+# 'default' holds the catalogue version and the prebuilt menu/meal bodies, and
+# 'order_history' each customer's serialized order history under a per-user version
+# (see myapp/cache.py). Every worker must see the same versions, so both have to be
+# shared caches: set DEFAULT_CACHE_URL and ORDER_HISTORY_CACHE_URL (e.g.
+# redis://localhost:6379/0 and /1). Local memory is per-process and only works with a
+# single process; startup refuses it unless ALLOW_PROCESS_LOCAL_CACHES is set, which it
+# is by default under DEBUG (runserver).
+ALLOW_PROCESS_LOCAL_CACHES = os.environ.get("ALLOW_PROCESS_LOCAL_CACHES", "1" if DEBUG else "0") == "1"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "order_history": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "order-history",
+        "TIMEOUT": 600,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
+if os.environ.get("DEFAULT_CACHE_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["DEFAULT_CACHE_URL"],
+    }
+if os.environ.get("ORDER_HISTORY_CACHE_URL"):
+    CACHES["order_history"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["ORDER_HISTORY_CACHE_URL"],
+        "TIMEOUT": 600,
+    }
+
+# Shopping carts (see myapp/carts.py). They only live in this cache: an idle cart
+# expires CART_TTL seconds after its last change. Set CART_CACHE_URL: like 'default', it
+# must be shared between workers, or a customer's cart and the checkout lock depend on
+# the worker, and startup refuses local memory unless ALLOW_PROCESS_LOCAL_CACHES is set.
+CART_TTL = 24 * 60 * 60
+CART_MAX_LINES = 30
+CART_MAX_QUANTITY = 50
+CACHES["carts"] = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "carts",
+    "TIMEOUT": CART_TTL,
+    "OPTIONS": {"MAX_ENTRIES": 50000},
+}
+if os.environ.get("CART_CACHE_URL"):
+    CACHES["carts"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["CART_CACHE_URL"],
+        "TIMEOUT": CART_TTL,
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -125,6 +196,70 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded media (meal images and their thumbnails)
+# Thumbnail and original filenames are content-hashed, so the web server in front
+# of MEDIA_URL can serve them with a far-future Cache-Control header.
+MEDIA_URL = "media/"
+MEDIA_ROOT = Path(os.environ.get("MEDIA_ROOT", BASE_DIR / "media"))
+
+MEAL_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+MEAL_THUMBNAIL_WIDTHS = [160, 320, 640]
+MEAL_THUMBNAIL_WORKERS = int(os.environ.get("MEAL_THUMBNAIL_WORKERS", "2"))
+
+# Response compression (see myapp/compression.py): responses of at least this many
+# bytes are sent brotli- or gzip-encoded to clients that accept it.
+COMPRESSION_MIN_BYTES = 1024
+
+# Dashboard bootstrap endpoints (see myapp/dashboard.py): threads per worker process
+# that run a bootstrap request's independent reads side by side. 0 runs them in turn.
+DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", "4"))
+
+# Request profiling (see myapp/profiling.py)
+# Requests with a signed X-Debug-Profile header (manage.py profile_token) are always
+# profiled; PROFILING_SAMPLE_RATE profiles a random fraction of the rest.
+PROFILING_DIR = Path(os.environ.get("PROFILING_DIR", BASE_DIR / "profiles"))
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_MAX_CAPTURES = 50
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+# Slow-query log (see myapp/slow_queries.py)
+# Statements slower than SLOW_QUERY_MS are aggregated by fingerprint and shown at
+# /api/queries/slow/; SELECTs also get their EXPLAIN plan captured in the background.
+# Set SLOW_QUERY_MS to None to turn the log off.
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN = True
+
+# Order event outbox (see myapp/outbox.py), drained by `manage.py dispatch_order_events`.
+# OUTBOX_CONSUMERS are dotted paths to callables that take one OrderEvent.
+OUTBOX_CONSUMERS = []
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_BASE_SECONDS = 5
+OUTBOX_RETRY_MAX_SECONDS = 60 * 60
+OUTBOX_RETENTION_DAYS = 7 # Delivered events older than this are deleted by the cleanup job
+
+# Periodic jobs (see myapp/scheduler.py and myapp/jobs.py). Each runs `every` N seconds
+# or daily `at` HH:MM server time, plus up to `jitter` random seconds. Run them with
+# `manage.py run_scheduler`, or set SCHEDULER_AUTOSTART=1 to start a scheduler thread in
+# every web worker; a lock in SCHEDULER_LOCK_CACHE lets only one worker run each slot.
+# The lock cache and 'default' (where the prewarmed bodies go) must be shared caches.
+SCHEDULER_AUTOSTART = os.environ.get("SCHEDULER_AUTOSTART", "0") == "1"
+SCHEDULER_LOCK_CACHE = "default"
+SCHEDULER_JOBS = {
+    "prewarm_next_day": {"func": "myapp.jobs.prewarm_next_day", "at": "23:50", "jitter": 120},
+    "prewarm_lunch": {"func": "myapp.jobs.prewarm_today", "at": "10:45", "jitter": 120},
+    "rollup_revenue": {"func": "myapp.jobs.rollup_revenue", "every": 5 * 60, "jitter": 30},
+    "cleanup": {"func": "myapp.jobs.cleanup", "at": "03:30", "jitter": 600},
+}
+
+# Pre-orders (see myapp/preorders.py): customers may order up to PREORDER_DAYS_AHEAD days
+# ahead, until PREORDER_CUTOFF server time on the day before, when the confirm_preorders
+# job confirms and prices the next day's orders in one batch.
+PREORDER_DAYS_AHEAD = 7
+PREORDER_CUTOFF = "20:00"
+
+SCHEDULER_JOBS["confirm_preorders"] = {"func": "myapp.jobs.confirm_preorders", "at": PREORDER_CUTOFF, "jitter": 60}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
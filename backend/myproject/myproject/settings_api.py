@@ -0,0 +1,38 @@
+"""
+API-only settings profile for the JSON workers.
+
+Every view in myapp is @csrf_exempt and returns JSON, so these workers skip the
+admin, messages, staticfiles and template machinery and the CSRF, messages and
+clickjacking middleware. Serve /admin/ from workers running the full
+``myproject.settings`` profile.
+
+Usage: DJANGO_SETTINGS_MODULE=myproject.settings_api, or the
+``myproject.wsgi_api`` / ``myproject.asgi_api`` entry points.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "corsheaders",
+    "myapp",
+]
+
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "myapp.compression.CompressionMiddleware",  # Early, so it sees the final response body
+    "corsheaders.middleware.CorsMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "myapp.slow_queries.SlowQueryMiddleware",
+    "myapp.profiling.ProfilingMiddleware",
+]
+
+TEMPLATES = []
+
+ROOT_URLCONF = "myproject.urls_api"
+
+WSGI_APPLICATION = "myproject.wsgi_api.application"
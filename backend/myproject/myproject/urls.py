@@ -1,5 +1,7 @@
 # myproject/urls.py
 
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include # Ensure 'include' is imported
 
@@ -7,4 +9,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     # CHANGED: Now includes myapp's URLs under the 'api/' prefix
     path("api/", include("myapp.urls")),
-]
\ No newline at end of file
+]
+
+# Serve uploaded meal images in development; in production the web server does this
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,12 @@
+# myproject/urls_api.py
+# URLconf for the API-only profile (myproject.settings_api): no admin site.
+
+from django.conf import settings
+from django.conf.urls.static import static
+from django.urls import path, include
+
+urlpatterns = [
+    path("api/", include("myapp.urls")),
+]
+
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
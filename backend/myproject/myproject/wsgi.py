@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
 
 application = get_wsgi_application()
+
+# Periodic jobs in this worker, if SCHEDULER_AUTOSTART is set (see myapp/scheduler.py)
+from myapp.scheduler import start_scheduler  # noqa: E402
+
+start_scheduler()
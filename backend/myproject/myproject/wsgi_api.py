@@ -0,0 +1,19 @@
+"""
+WSGI config for the API-only workers.
+
+Same as myproject.wsgi, but loads ``myproject.settings_api``: a trimmed
+INSTALLED_APPS and MIDDLEWARE for the JSON endpoints under /api/.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings_api")
+
+application = get_wsgi_application()
+
+# Periodic jobs in this worker, if SCHEDULER_AUTOSTART is set (see myapp/scheduler.py)
+from myapp.scheduler import start_scheduler  # noqa: E402
+
+start_scheduler()
@@ -23,35 +23,27 @@ const AdminDashboard = () => {
   const [menuDate, setMenuDate] = useState(new Date().toISOString().split('T')[0]);
 
   useEffect(() => {
-    fetchMeals();
-    fetchOrders();
-    fetchDailyRevenue();
+    fetchDashboard();
   }, []);
 
-  const fetchMeals = async () => {
+  // Meals, orders and today's revenue in a single request on mount
+  const fetchDashboard = async () => {
     try {
-      const response = await axios.get(`${API}/meals/`);
-      setMeals(response.data);
+      const response = await axios.get(`${API}/dashboard/admin/`);
+      setMeals(response.data.meals);
+      setOrders(response.data.orders);
+      setDailyRevenue(response.data.revenue);
     } catch (error) {
-      console.error('Error fetching meals:', error);
+      console.error('Error fetching dashboard:', error);
     }
   };
 
-  const fetchOrders = async () => {
-    try {
-      const response = await axios.get(`${API}/orders/`);
-      setOrders(response.data);
-    } catch (error) {
-      console.error('Error fetching orders:', error);
-    }
-  };
-
-  const fetchDailyRevenue = async () => {
+  const fetchMeals = async () => {
     try {
-      const response = await axios.get(`${API}/orders/today/revenue/`);
-      setDailyRevenue(response.data);
+      const response = await axios.get(`${API}/meals/`);
+      setMeals(response.data);
     } catch (error) {
-      console.error('Error fetching revenue:', error);
+      console.error('Error fetching meals:', error);
     }
   };
 
@@ -61,7 +53,7 @@ const AdminDashboard = () => {
     try {
       await axios.post(`${API}/meals/`, { 
         ...mealForm,
-        price: parseFloat(mealForm.price)
+        price: mealForm.price.trim() // Sent as typed; the server parses it to exact cents
       });
       setMealForm({ name: '', description: '', price: '', category: '', image_url: '' });
       await fetchMeals();
@@ -416,4 +408,4 @@ const AdminDashboard = () => {
   );
 };
 
-export default AdminDashboard;
\ No newline at end of file
+export default AdminDashboard;
\ No newline at end of file
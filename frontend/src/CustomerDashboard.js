@@ -13,16 +13,17 @@ const CustomerDashboard = () => {
   const [loading, setLoading] = useState(false);
 
   useEffect(() => {
-    fetchTodaysMenu();
-    fetchOrders();
+    fetchDashboard();
   }, []);
 
-  const fetchTodaysMenu = async () => {
+  // Today's menu and the customer's orders in a single request on mount
+  const fetchDashboard = async () => {
     try {
-      const response = await axios.get(`${API}/daily-menu/today/menu/`);
-      setTodaysMenu(response.data.meals || []);
+      const response = await axios.get(`${API}/dashboard/customer/`);
+      setTodaysMenu(response.data.menu.meals || []);
+      setOrders(response.data.orders);
     } catch (error) {
-      console.error('Error fetching menu:', error);
+      console.error('Error fetching dashboard:', error);
     }
   };
 
@@ -202,4 +203,4 @@ const CustomerDashboard = () => {
   );
 };
 
-export default CustomerDashboard;
\ No newline at end of file
+export default CustomerDashboard;
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Shared helpers for the API tests: users, meals and JSON requests through
+Django's test client, plus query-count budgets.
+"""
+
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from myapp.models import Meal
+from myapp.money import to_cents
+from myapp.search import meal_index
+
+PASSWORD = "secret-pass-123"
+
+
+class ApiTestCase(TestCase):
+    def setUp(self):
+        # In-process state outlives the per-test transaction rollback.
+        for cache in caches.all():
+            cache.clear()
+        meal_index.clear()
+
+    # --- Fixtures ---
+
+    def create_customer(self, email="customer@example.com", name="Cathy"):
+        return User.objects.create_user(username=email, email=email, password=PASSWORD, first_name=name)
+
+    def create_admin(self, email="admin@example.com", name="Adam"):
+        return User.objects.create_user(username=email, email=email, password=PASSWORD, first_name=name, is_staff=True)
+
+    def create_meal(self, name="Chicken Curry", price="450.00", category="Main", description="Mild and creamy"):
+        return Meal.objects.create(name=name, price_cents=to_cents(price), category=category, description=description)
+
+    def login(self, user):
+        self.client.logout()
+        self.assertTrue(self.client.login(username=user.username, password=PASSWORD))
+
+    # --- Requests ---
+
+    def get_json(self, path, **params):
+        return self.client.get(path, params)
+
+    def post_json(self, path, data):
+        return self.client.post(path, json.dumps(data), content_type="application/json")
+
+    def place_order(self, meal, quantity=1):
+        response = self.post_json("/api/orders/", {"meal_id": meal.id, "quantity": quantity})
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["order"]
+
+    # --- Query budgets ---
+
+    @contextmanager
+    def assertMaxQueries(self, budget):
+        """Fails if the block runs more than ``budget`` queries, listing them."""
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(f"  {i}. {query['sql']}" for i, query in enumerate(context.captured_queries, 1))
+            self.fail(f"{executed} queries executed, budget is {budget}:\n{queries}")
@@ -0,0 +1,39 @@
+"""
+Settings for the in-process test suite: the full project settings, with an
+in-memory SQLite database and a fast password hasher. Each pytest-xdist worker
+gets its own in-memory database, so the suite runs in parallel without setup.
+"""
+
+import tempfile
+
+from myproject.settings import *  # noqa: F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+    # Order shards for tests/test_sharding.py, which switches ORDER_SHARDS over to them;
+    # every other test keeps all orders in "default"
+    "orders_1": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+    "orders_2": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+}
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "order_history": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "order-history-tests",
+    },
+    "carts": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "carts-tests"},
+}
+
+ALLOW_PROCESS_LOCAL_CACHES = True  # One process
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix="mealy-test-media-")
+MEAL_THUMBNAIL_WORKERS = 1
+PROFILING_DIR = tempfile.mkdtemp(prefix="mealy-test-profiles-")
+DASHBOARD_WORKERS = 0  # Pool threads cannot see a TestCase's uncommitted rows
+SHARD_QUERY_WORKERS = 0  # Same as DASHBOARD_WORKERS
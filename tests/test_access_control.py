@@ -0,0 +1,35 @@
+from .base import ApiTestCase
+
+
+class CustomerAccessTests(ApiTestCase):
+    """Customers must not reach the admin-only endpoints."""
+
+    def setUp(self):
+        super().setUp()
+        self.login(self.create_customer())
+
+    def test_cannot_list_or_create_meals(self):
+        self.assertEqual(self.client.get("/api/meals/").status_code, 403)
+        response = self.post_json("/api/meals/", {"name": "X", "description": "", "price": 1, "category": "Main"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_cannot_plan_menus(self):
+        response = self.post_json("/api/daily-menu/", {"date": "2025-01-01", "meal_ids": []})
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_cannot_view_revenue(self):
+        self.assertEqual(self.client.get("/api/orders/today/revenue/").status_code, 403)
+
+    def test_cannot_export_orders(self):
+        self.assertEqual(self.client.get("/api/orders/export/?from=2025-01-01&to=2025-01-02").status_code, 403)
+
+    def test_cannot_view_cache_stats(self):
+        self.assertEqual(self.client.get("/api/cache/stats/").status_code, 403)
+
+
+class AnonymousAccessTests(ApiTestCase):
+    def test_protected_endpoints_redirect_to_login(self):
+        for path in ["/api/meals/", "/api/daily-menu/today/menu/", "/api/orders/", "/api/orders/today/revenue/"]:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 302)
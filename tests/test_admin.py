@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User
+
+from myapp.models import Order, OrderEvent
+from myapp.orders import apply_transition
+
+from .base import PASSWORD, ApiTestCase
+
+
+class AdminChangelistTests(ApiTestCase):
+    """The changelists and the order change page cost the same queries however many rows they show."""
+
+    def setUp(self):
+        super().setUp()
+        self.superuser = User.objects.create_superuser("root@example.com", "root@example.com", PASSWORD)
+        self.meal = self.create_meal()
+        self.orders = 0
+
+    def add_orders(self, count):
+        for _ in range(count):
+            self.orders += 1
+            customer = self.create_customer(email=f"customer{self.orders}@example.com")
+            self.login(customer)
+            self.place_order(self.meal)
+        self.login(self.superuser)
+
+    def query_counts(self, path, budget, more=20):
+        counts = []
+        for rows in (1, more):
+            self.add_orders(rows)
+            with self.assertMaxQueries(budget) as context:
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1], f"{path}: query count grows with the number of rows")
+
+    def test_order_changelist(self):
+        self.query_counts("/admin/myapp/order/", budget=4)
+
+    def test_filtered_order_changelist(self):
+        self.query_counts("/admin/myapp/order/?status__exact=pending&payment_status__exact=pending", budget=4)
+
+    def test_order_item_changelist(self):
+        self.query_counts("/admin/myapp/orderitem/", budget=4)
+
+    def test_order_change_page_with_item_inline(self):
+        self.add_orders(1)
+        order = Order.objects.get()
+        order.items.create(meal=self.meal, meal_name="Extra", price_at_order_cents=self.meal.price_cents, quantity=2)
+
+        response = self.client.get(f"/admin/myapp/order/{order.id}/change/")
+
+        self.assertContains(response, "Extra")
+
+
+class AdminOrderTransitionTests(ApiTestCase):
+    """The admin changes an order's state only through the guarded transitions."""
+
+    def setUp(self):
+        super().setUp()
+        self.meal = self.create_meal()
+        self.customer = self.create_customer()
+        self.login(self.customer)
+        self.orders = [self.place_order(self.meal) for _ in range(2)]
+        self.login(User.objects.create_superuser("root@example.com", "root@example.com", PASSWORD))
+
+    def test_state_is_read_only_on_the_change_form(self):
+        order = self.orders[0]
+        response = self.client.get(f"/admin/myapp/order/{order['id']}/change/")
+
+        self.assertNotIn("status", response.context["adminform"].form.fields)
+        self.assertNotIn("payment_status", response.context["adminform"].form.fields)
+
+    def test_actions_apply_transitions_and_record_events(self):
+        apply_transition(self.orders[1]["id"], "cancel")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/admin/myapp/order/", {
+                "action": "confirm", "_selected_action": [order["id"] for order in self.orders],
+            }, follow=True)
+
+        self.assertContains(response, "Confirm: 1 of 2 orders changed.")
+        self.assertEqual(dict(Order.objects.values_list("id", "status")), {self.orders[0]["id"]: "confirmed", self.orders[1]["id"]: "cancelled"})
+        self.assertEqual(list(OrderEvent.objects.filter(kind="order.confirmed").values_list("order_id", flat=True)), [self.orders[0]["id"]])
+        self.login(self.customer)
+        self.assertEqual(self.client.get("/api/orders/").json()[1]["status"], "confirmed")
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+
+from .base import PASSWORD, ApiTestCase
+
+
+class RegisterTests(ApiTestCase):
+    def test_register_customer_logs_in(self):
+        response = self.post_json("/api/auth/register/", {"email": "new@example.com", "password": PASSWORD, "name": "New"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["user"]["role"], "customer")
+        self.assertEqual(self.client.get("/api/auth/me/").json()["email"], "new@example.com")
+
+    def test_register_admin_gets_staff(self):
+        response = self.post_json(
+            "/api/auth/register/", {"email": "boss@example.com", "password": PASSWORD, "name": "Boss", "role": "admin"}
+        )
+
+        self.assertEqual(response.json()["user"]["role"], "admin")
+        self.assertTrue(User.objects.get(email="boss@example.com").is_staff)
+
+    def test_register_requires_fields(self):
+        response = self.post_json("/api/auth/register/", {"email": "x@example.com"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_register_rejects_duplicate_email(self):
+        self.create_customer(email="taken@example.com")
+
+        response = self.post_json("/api/auth/register/", {"email": "taken@example.com", "password": PASSWORD, "name": "X"})
+
+        self.assertEqual(response.status_code, 409)
+
+
+class LoginTests(ApiTestCase):
+    def test_login_and_me(self):
+        self.create_admin()
+
+        response = self.post_json("/api/auth/login/", {"email": "admin@example.com", "password": PASSWORD})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["role"], "admin")
+        me = self.client.get("/api/auth/me/").json()
+        self.assertEqual(me["email"], "admin@example.com")
+        self.assertTrue(me["is_authenticated"])
+
+    def test_invalid_credentials(self):
+        self.create_customer()
+
+        response = self.post_json("/api/auth/login/", {"email": "customer@example.com", "password": "wrong"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_me_requires_login(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+
+    def test_login_is_post_only(self):
+        self.assertEqual(self.client.get("/api/auth/login/").status_code, 405)
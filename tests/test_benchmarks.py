@@ -0,0 +1,29 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from benchmarks.serialization import SIZES, bench_size, compare
+
+
+class BaselineComparisonTests(SimpleTestCase):
+    def results(self, **medians):
+        return {"results": {case: {"median_us": median, "min_us": median, "ops": 1} for case, median in medians.items()}}
+
+    def test_flags_only_cases_slower_than_the_threshold(self):
+        baseline = self.results(fast=10.0, slow=10.0, gone=5.0)
+        current = self.results(fast=10.5, slow=12.0, new=1.0)
+
+        rows = {case: regressed for case, _, _, _, regressed in compare(current, baseline, 0.10)}
+
+        self.assertEqual(rows, {"fast": False, "slow": True})
+
+
+class BenchSizeSmokeTests(TestCase):
+    def test_every_case_runs_on_a_tiny_dataset(self):
+        tiny = {"users": 3, "meals": 4, "days": 2, "menu_size": 2, "orders": 10}
+        with mock.patch.dict(SIZES, {"tiny": tiny}):
+            results = bench_size("tiny", rounds=1)
+
+        self.assertIn("GET /api/orders/ as customer (cache hit)", results)
+        self.assertEqual(results["serialize_order"]["ops"], 10)
+        self.assertTrue(all(result["median_us"] > 0 for result in results.values()))
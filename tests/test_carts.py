@@ -0,0 +1,121 @@
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from myapp.cache import check_shared_caches
+from myapp.models import Order, OrderEvent, OrderItem
+
+from .base import ApiTestCase
+
+
+class CartTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.curry = self.create_meal("Chicken Curry", "450.00")
+        self.chapati = self.create_meal("Chapati", "30.00", "Side")
+        self.customer = self.create_customer()
+        self.login(self.customer)
+
+    def add(self, meal_id, quantity=1):
+        return self.post_json("/api/cart/items/", {"meal_id": meal_id, "quantity": quantity})
+
+    def put_quantity(self, meal_id, quantity):
+        return self.client.put(f"/api/cart/items/{meal_id}/", json.dumps({"quantity": quantity}), content_type="application/json")
+
+    def checkout(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/cart/checkout/")
+
+    def test_cart_changes_never_write_to_the_database(self):
+        self.add(self.curry.id)  # Fills the meal lookup cache
+        self.add(self.chapati.id)
+
+        with self.assertMaxQueries(6) as context:  # The session and the user, per request
+            self.add(self.curry.id, 2)
+            self.put_quantity(self.chapati.id, 3)
+            cart = self.client.get("/api/cart/").json()
+        self.assertFalse(any("myapp_" in query["sql"] for query in context.captured_queries))
+
+        self.assertEqual(cart, {
+            "items": [
+                {"meal_id": self.curry.id, "meal_name": "Chicken Curry", "quantity": 3, "price": "450.00", "total_item_price": "1350.00"},
+                {"meal_id": self.chapati.id, "meal_name": "Chapati", "quantity": 3, "price": "30.00", "total_item_price": "90.00"},
+            ],
+            "item_count": 6,
+            "total": "1440.00",
+        })
+
+    def test_remove_and_clear(self):
+        self.add(self.curry.id)
+        self.add(self.chapati.id)
+
+        self.assertEqual(self.client.delete(f"/api/cart/items/{self.curry.id}/").json()["item_count"], 1)
+        self.assertEqual(self.put_quantity(self.chapati.id, 0).json()["items"], [])
+        self.add(self.curry.id)
+        self.assertEqual(self.client.delete("/api/cart/").json()["items"], [])
+
+    def test_invalid_changes(self):
+        self.assertEqual(self.add(999).status_code, 404)
+        self.assertEqual(self.add(self.curry.id, 0).status_code, 400)
+        self.assertEqual(self.add("curry").status_code, 400)
+        self.assertEqual(self.put_quantity(self.curry.id, 2).status_code, 404)
+        with self.settings(CART_MAX_LINES=1):
+            self.add(self.curry.id)
+            self.assertEqual(self.add(self.chapati.id).status_code, 400)
+
+    def test_carts_are_per_customer(self):
+        self.add(self.curry.id)
+        self.login(self.create_customer(email="other@example.com"))
+
+        self.assertEqual(self.client.get("/api/cart/").json()["items"], [])
+
+    def test_checkout_places_one_order_and_empties_the_cart(self):
+        self.add(self.curry.id, 2)
+        self.add(self.chapati.id, 3)
+
+        # Session, user, meals; savepoint, order INSERT, one items INSERT, outbox INSERT, release
+        with self.assertMaxQueries(8):
+            response = self.checkout()
+
+        self.assertEqual(response.status_code, 201, response.content)
+        order = response.json()["order"]
+        self.assertEqual(order["total"], "990.00")
+        self.assertEqual([(item["meal_name"], item["quantity"]) for item in order["items"]], [("Chicken Curry", 2), ("Chapati", 3)])
+        self.assertEqual(Order.objects.get().user, self.customer)
+        self.assertEqual(OrderItem.objects.filter(order_id=order["id"]).count(), 2)
+        self.assertEqual(OrderEvent.objects.get().kind, "order.placed")
+        self.assertEqual(self.client.get("/api/cart/").json()["items"], [])
+        self.assertEqual(self.client.get("/api/orders/").json()[0]["id"], order["id"])
+
+    def test_checkout_of_an_empty_cart(self):
+        self.assertEqual(self.checkout().status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_price_change_is_shown_before_checkout(self):
+        self.add(self.curry.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.curry.price_cents = 50000
+            self.curry.save()
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["cart"]["total"], "500.00")
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.checkout().json()["order"]["total"], "500.00")
+
+    def test_deleted_meal_leaves_the_cart(self):
+        self.add(self.curry.id)
+        self.add(self.chapati.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chapati.delete()
+
+        self.assertEqual([item["meal_name"] for item in self.client.get("/api/cart/").json()["items"]], ["Chicken Curry"])
+
+    def test_carts_need_a_shared_cache(self):
+        shared = {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost:6379/0"}
+        local = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        caches = {"default": shared, "order_history": shared, "carts": local}
+        with override_settings(ALLOW_PROCESS_LOCAL_CACHES=False, CACHES=caches), self.assertRaisesMessage(ImproperlyConfigured, "CACHES['carts']"):
+            check_shared_caches()
@@ -0,0 +1,86 @@
+import gzip
+from datetime import date
+from unittest import skipUnless
+
+from django.test import SimpleTestCase, override_settings
+
+from myapp import compression
+from myapp.compression import negotiate
+from myapp.models import DailyMenu
+
+from .base import ApiTestCase
+
+
+class NegotiateTests(SimpleTestCase):
+    def test_prefers_brotli_then_gzip_and_honours_q_values(self):
+        self.assertEqual(negotiate("gzip, deflate, br"), "br" if compression.brotli else "gzip")
+        self.assertEqual(negotiate("br;q=0.5, gzip"), "gzip")
+        self.assertEqual(negotiate("gzip;q=0, identity"), None)
+        self.assertEqual(negotiate(""), None)
+        self.assertEqual(negotiate("*"), "br" if compression.brotli else "gzip")
+
+
+@override_settings(COMPRESSION_MIN_BYTES=200)
+class CompressionMiddlewareTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for n in range(10):
+            self.create_meal(f"Dish {n}", description="Slow-cooked with onions, tomatoes and spices " * 3)
+        self.login(self.create_admin())
+
+    def test_gzip_when_asked_and_large_enough(self):
+        plain = self.client.get("/api/meals/", {"fields": "id,name,description"})
+        encoded = self.client.get("/api/meals/", {"fields": "id,name,description"}, headers={"Accept-Encoding": "gzip"})
+
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertEqual(encoded["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", encoded["Vary"])
+        self.assertEqual(gzip.decompress(encoded.content), plain.content)
+        self.assertEqual(int(encoded["Content-Length"]), len(encoded.content))
+
+    @skipUnless(compression.brotli, "brotli is not installed")
+    def test_brotli_preferred_when_available(self):
+        plain = self.client.get("/api/meals/", {"fields": "id,description"})
+        encoded = self.client.get("/api/meals/", {"fields": "id,description"}, headers={"Accept-Encoding": "gzip, br"})
+
+        self.assertEqual(encoded["Content-Encoding"], "br")
+        self.assertEqual(compression.brotli.decompress(encoded.content), plain.content)
+
+    def test_small_responses_are_sent_as_is(self):
+        response = self.client.get("/api/hello/", headers={"Accept-Encoding": "gzip"})
+
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_catalogue_is_compressed_once_and_served_from_cache(self):
+        menu = DailyMenu.objects.create(date=date.today())
+        menu.meals.set(self.create_meal(f"Special {n}", description="x" * 100) for n in range(5))
+        calls = []
+        original = compression.compress
+
+        def counting_compress(body, encoding, precompressed=False):
+            calls.append(precompressed)
+            return original(body, encoding, precompressed)
+
+        compression.compress = counting_compress
+        try:
+            first = self.client.get("/api/daily-menu/today/menu/", headers={"Accept-Encoding": "gzip"})
+            second = self.client.get("/api/daily-menu/today/menu/", headers={"Accept-Encoding": "gzip"})
+        finally:
+            compression.compress = original
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(len(gzip.decompress(second.content).decode().split('"name"')), 6)
+        self.assertTrue(calls)
+        self.assertTrue(all(calls), "the middleware compressed a cached body again")
+        self.assertEqual(len(calls), len(compression.supported_encodings()))
+
+    def test_menu_changes_invalidate_cached_body(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            menu = DailyMenu.objects.create(date=date.today())
+        self.assertEqual(self.client.get("/api/daily-menu/today/menu/").json()["meals"], [])
+
+        meal = self.create_meal("Pilau")
+        with self.captureOnCommitCallbacks(execute=True):
+            menu.meals.add(meal)
+
+        self.assertEqual([m["name"] for m in self.client.get("/api/daily-menu/today/menu/").json()["meals"]], ["Pilau"])
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+from myapp.models import DailyMenu
+
+from .base import ApiTestCase
+
+
+class DailyMenuTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = self.create_admin()
+        self.login(self.admin)
+        self.meals = [self.create_meal(f"Dish {n}") for n in range(4)]
+
+    def menu_ids(self, menu_date):
+        return set(DailyMenu.objects.get(date=menu_date).meals.values_list("id", flat=True))
+
+    def test_set_and_read_todays_menu(self):
+        today = date.today()
+        response = self.post_json("/api/daily-menu/", {"date": today.isoformat(), "meal_ids": [self.meals[0].id, self.meals[1].id]})
+        self.assertEqual(response.status_code, 201)
+
+        self.login(self.create_customer())
+        menu = self.client.get("/api/daily-menu/today/menu/").json()
+
+        self.assertEqual(menu["date"], today.isoformat())
+        self.assertEqual({meal["name"] for meal in menu["meals"]}, {"Dish 0", "Dish 1"})
+
+    def test_empty_menu_when_none_planned(self):
+        self.assertEqual(self.client.get("/api/daily-menu/today/menu/").json()["meals"], [])
+
+    def test_update_only_touches_changed_meals(self):
+        first, second, third, _ = self.meals
+        self.post_json("/api/daily-menu/", {"date": "2025-03-03", "meal_ids": [first.id, second.id]})
+        untouched_row = DailyMenu.meals.through.objects.get(meal=second)
+
+        response = self.post_json("/api/daily-menu/", {"date": "2025-03-03", "meal_ids": [second.id, third.id]})
+
+        self.assertEqual(response.json()["menus"], [{"date": "2025-03-03", "created": False, "added": [third.id], "removed": [first.id]}])
+        self.assertEqual(self.menu_ids(date(2025, 3, 3)), {second.id, third.id})
+        # The unchanged through row was neither deleted nor re-inserted
+        self.assertTrue(DailyMenu.meals.through.objects.filter(id=untouched_row.id, meal=second).exists())
+
+    def test_bulk_week_planning(self):
+        monday = date(2025, 3, 3)
+        plans = [{"date": (monday + timedelta(days=n)).isoformat(), "meal_ids": [self.meals[n].id]} for n in range(3)]
+
+        response = self.post_json("/api/daily-menu/", {"menus": plans})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.menu_ids(monday + timedelta(days=2)), {self.meals[2].id})
+
+    def test_unknown_meal_ids_are_ignored(self):
+        self.post_json("/api/daily-menu/", {"date": "2025-03-03", "meal_ids": [self.meals[0].id, 999999]})
+
+        self.assertEqual(self.menu_ids(date(2025, 3, 3)), {self.meals[0].id})
+
+    def test_range_read(self):
+        self.post_json("/api/daily-menu/", {"menus": [
+            {"date": "2025-03-03", "meal_ids": [self.meals[0].id]},
+            {"date": "2025-03-05", "meal_ids": [self.meals[0].id, self.meals[1].id]},
+        ]})
+
+        menus = self.client.get("/api/daily-menu/", {"from": "2025-03-03", "to": "2025-03-06"}).json()["menus"]
+
+        self.assertEqual([menu["date"] for menu in menus], ["2025-03-03", "2025-03-04", "2025-03-05", "2025-03-06"])
+        self.assertEqual([len(menu["meals"]) for menu in menus], [1, 0, 2, 0])
+
+    def test_range_validation(self):
+        self.assertEqual(self.client.get("/api/daily-menu/", {"from": "2025-03-03"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/daily-menu/", {"from": "2025-03-03", "to": "2025-03-01"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/daily-menu/", {"from": "2025-01-01", "to": "2025-03-01"}).status_code, 400)
+
+    def test_invalid_date(self):
+        response = self.post_json("/api/daily-menu/", {"date": "03/03/2025", "meal_ids": []})
+
+        self.assertEqual(response.status_code, 400)
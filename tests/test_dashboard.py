@@ -0,0 +1,75 @@
+import threading
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+
+from myapp.dashboard import run_concurrently
+from myapp.models import DailyMenu, Meal
+from myapp.orders import place_order
+
+from .base import PASSWORD, ApiTestCase
+
+
+class DashboardTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        meal = self.create_meal()
+        DailyMenu.objects.create(date=date.today()).meals.add(meal)
+        self.customer = self.create_customer()
+        self.login(self.customer)
+        self.place_order(meal, quantity=2)
+
+    def test_customer_dashboard_matches_the_separate_endpoints(self):
+        menu = self.client.get("/api/daily-menu/today/menu/").json()
+        orders = self.client.get("/api/orders/").json()
+
+        dashboard = self.client.get("/api/dashboard/customer/").json()
+
+        self.assertEqual(dashboard, {"menu": menu, "orders": orders})
+
+    def test_admin_dashboard_matches_the_separate_endpoints(self):
+        self.login(self.create_admin())
+        expected = {
+            "meals": self.client.get("/api/meals/").json(),
+            "orders": self.client.get("/api/orders/").json(),
+            "revenue": self.client.get("/api/orders/today/revenue/").json(),
+        }
+
+        self.assertEqual(self.client.get("/api/dashboard/admin/").json(), expected)
+
+    def test_customers_cannot_load_the_admin_dashboard(self):
+        self.assertEqual(self.client.get("/api/dashboard/admin/").status_code, 403)
+
+
+@override_settings(DASHBOARD_WORKERS=3)
+class RunConcurrentlyTests(TransactionTestCase):
+    def test_jobs_run_at_the_same_time(self):
+        barrier = threading.Barrier(3, timeout=5)  # Breaks unless all three jobs are running together
+
+        results = run_concurrently({name: (lambda name=name: (barrier.wait(), name)[1]) for name in "abc"})
+
+        self.assertEqual(results, {"a": "a", "b": "b", "c": "c"})
+
+    def test_errors_propagate(self):
+        def fail():
+            raise ZeroDivisionError
+
+        with self.assertRaises(ZeroDivisionError):
+            run_concurrently({"ok": lambda: 1, "fail": fail})
+
+
+@override_settings(DASHBOARD_WORKERS=3)
+class ThreadedDashboardTests(TransactionTestCase):
+    """With committed data, the pool threads read through their own connections."""
+
+    def test_admin_dashboard_from_pool_threads(self):
+        admin = User.objects.create_user("admin@example.com", "admin@example.com", PASSWORD, is_staff=True)
+        place_order(admin, Meal.objects.create(name="Pilau", price_cents=30000), 1)
+        self.client.force_login(admin)
+
+        dashboard = self.client.get("/api/dashboard/admin/").json()
+
+        self.assertEqual([meal["name"] for meal in dashboard["meals"]], ["Pilau"])
+        self.assertEqual(len(dashboard["orders"]), 1)
+        self.assertEqual(dashboard["revenue"], {"total_revenue": "0.00", "total_orders": 0})
@@ -0,0 +1,69 @@
+from django.test import SimpleTestCase
+
+from myapp.fieldsets import ORDER_FIELDS, parse_fields
+
+from .base import ApiTestCase
+
+
+class ParseFieldsTests(SimpleTestCase):
+    def test_selection_in_spec_order_with_nested_fields(self):
+        self.assertEqual(
+            parse_fields("items.quantity, status,id,items.meal_name", ORDER_FIELDS),
+            {"id": None, "status": None, "items": ["meal_name", "quantity"]},
+        )
+
+    def test_whole_field_wins_over_subfields(self):
+        self.assertEqual(parse_fields("items.meal_name,items", ORDER_FIELDS), {"items": None})
+
+    def test_missing_or_blank_means_all_fields(self):
+        self.assertIsNone(parse_fields(None, ORDER_FIELDS))
+        self.assertIsNone(parse_fields(" ", ORDER_FIELDS))
+
+    def test_unknown_fields(self):
+        with self.assertRaisesRegex(ValueError, "secret, status.code"):
+            parse_fields("id,secret,status.code", ORDER_FIELDS)
+
+
+class SparseFieldsetApiTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.create_customer()
+        self.meal = self.create_meal(price="450.00")
+        self.login(self.customer)
+        self.order = self.place_order(self.meal, quantity=2)
+
+    def test_orders_return_only_requested_fields(self):
+        response = self.get_json("/api/orders/", fields="id,total,items.meal_name")
+
+        self.assertEqual(response.json(), [{"id": self.order["id"], "total": "900.00", "items": [{"meal_name": "Chicken Curry"}]}])
+
+    def test_summary_is_not_read_unless_needed(self):
+        self.login(self.create_admin())
+
+        with self.assertMaxQueries(3) as context:
+            response = self.get_json("/api/orders/", fields="id,status")
+
+        self.assertEqual(response.json(), [{"id": self.order["id"], "status": "pending"}])
+        order_query = context.captured_queries[-1]["sql"]
+        self.assertNotIn("summary", order_query)
+        self.assertNotIn("total_amount_cents", order_query)
+
+    def test_customer_fieldsets_are_cached_separately(self):
+        narrow = self.get_json("/api/orders/", fields="id").json()
+        full = self.get_json("/api/orders/").json()
+
+        self.assertEqual(narrow, [{"id": self.order["id"]}])
+        self.assertEqual(full, [self.order])
+        self.assertEqual(self.get_json("/api/orders/", fields="id").json(), narrow)
+
+    def test_meals_fields_and_search(self):
+        self.login(self.create_admin())
+
+        listed = self.get_json("/api/meals/", fields="name,price").json()
+        searched = self.get_json("/api/meals/", fields="id,thumbnails", q="curry").json()
+
+        self.assertEqual(listed, [{"name": "Chicken Curry", "price": "450.00"}])
+        self.assertEqual(searched, [{"id": self.meal.id, "thumbnails": {}}])
+
+    def test_unknown_field_is_a_bad_request(self):
+        self.assertEqual(self.get_json("/api/orders/", fields="id,password").status_code, 400)
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from myapp.cache import bump_catalogue
+from myapp.imaging import render_thumbnails
+from myapp.models import Meal
+
+from .base import ApiTestCase
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is only needed by the thumbnail workers
+    Image = None
+
+
+class MealCatalogueTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(self.create_admin())
+
+    def test_create_and_list(self):
+        response = self.post_json(
+            "/api/meals/", {"name": "Pilau", "description": "Spiced rice", "price": 350, "category": "Main"}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        meals = self.client.get("/api/meals/").json()
+        self.assertEqual([meal["name"] for meal in meals], ["Pilau"])
+        self.assertEqual(meals[0]["price"], "350.00")
+        self.assertEqual(meals[0]["thumbnails"], {})
+
+    def test_create_requires_fields(self):
+        response = self.post_json("/api/meals/", {"name": "Pilau"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class MealSearchTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(self.create_admin())
+        self.curry = self.create_meal("Chicken Curry", "450", "Main", "Mild and creamy")
+        self.wings = self.create_meal("Chicken Wings", "300", "Side", "Crispy")
+        self.salad = self.create_meal("Garden Salad", "250", "Salad", "Fresh greens with chickpeas")
+
+    def search(self, **params):
+        response = self.client.get("/api/meals/", params)
+        self.assertEqual(response.status_code, 200)
+        return [meal["name"] for meal in response.json()]
+
+    def test_prefix_match_on_name_and_description(self):
+        self.assertEqual(self.search(q="chick"), ["Chicken Curry", "Chicken Wings", "Garden Salad"])
+        self.assertEqual(self.search(q="cream"), ["Chicken Curry"])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.search(q="chick cri"), ["Chicken Wings"])
+
+    def test_category_and_price_filters(self):
+        self.assertEqual(self.search(category="Side"), ["Chicken Wings"])
+        self.assertEqual(self.search(min_price="260", max_price="450"), ["Chicken Curry", "Chicken Wings"])
+        self.assertEqual(self.search(q="chick", max_price="299"), ["Garden Salad"])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(self.search(q="wings"), ["Chicken Wings"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.wings.name = "Buffalo Bites"
+            self.wings.save()
+            self.curry.delete()
+
+        self.assertEqual(self.search(q="wings"), [])
+        self.assertEqual(self.search(q="buff"), ["Buffalo Bites"])
+        self.assertEqual(self.search(q="curry"), [])
+
+    def test_index_follows_the_catalogue_version(self):
+        self.assertEqual(self.search(q="wings"), ["Chicken Wings"])
+
+        # Like a write made by another worker, or an update() that sends no signals
+        Meal.objects.filter(id=self.wings.id).update(name="Buffalo Bites")
+        self.assertEqual(self.search(q="buff"), [])
+        bump_catalogue()
+
+        self.assertEqual(self.search(q="wings"), [])
+        self.assertEqual(self.search(q="buff"), ["Buffalo Bites"])
+
+    def test_invalid_price(self):
+        self.assertEqual(self.client.get("/api/meals/", {"min_price": "cheap"}).status_code, 400)
+
+
+class MealImageTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(self.create_admin())
+        self.meal = self.create_meal()
+
+    def test_rejects_non_images(self):
+        upload = SimpleUploadedFile("menu.txt", b"not an image", content_type="text/plain")
+
+        response = self.client.post(f"/api/meals/{self.meal.id}/image/", {"image": upload})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_upload_stores_content_hashed_original(self):
+        upload = SimpleUploadedFile("dish.png", b"\x89PNG fake bytes", content_type="image/png")
+
+        # Thumbnail generation is scheduled on commit; keep it out of this test.
+        response = self.client.post(f"/api/meals/{self.meal.id}/image/", {"image": upload})
+
+        self.assertEqual(response.status_code, 202)
+        self.meal.refresh_from_db()
+        self.assertRegex(self.meal.image.name, r"^meals/originals/[0-9a-f]{20}\.png$")
+        self.assertEqual(response.json()["meal"]["image_url"], self.meal.image.url)
+
+    @unittest.skipIf(Image is None, "Pillow is not installed")
+    def test_render_thumbnails(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "source.png")
+            Image.new("RGB", (800, 400), "orange").save(source)
+
+            rendered = render_thumbnails(source, "abc123", directory, [160, 1200])
+
+            self.assertEqual(rendered["160"], {"webp": "abc123-160.webp", "jpg": "abc123-160.jpg"})
+            with Image.open(os.path.join(directory, "abc123-160.jpg")) as thumbnail:
+                self.assertEqual(thumbnail.size, (160, 80))
+            with Image.open(os.path.join(directory, "abc123-1200.webp")) as thumbnail:
+                self.assertEqual(thumbnail.size, (800, 400))  # never upscaled
@@ -0,0 +1,53 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from myapp.models import Meal
+from myapp.money import format_cents, to_cents
+
+from .base import ApiTestCase
+
+
+class MoneyTests(SimpleTestCase):
+    def test_to_cents(self):
+        self.assertEqual(to_cents("450"), 45000)
+        self.assertEqual(to_cents(" 0.10 "), 10)
+        self.assertEqual(to_cents(350), 35000)
+        self.assertEqual(to_cents(Decimal("12.5")), 1250)
+        self.assertEqual(to_cents(0.29), 29)
+
+    def test_to_cents_rejects_non_amounts(self):
+        for value in ["cheap", "", "NaN", "Infinity", "1.005", None, True]:
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                to_cents(value)
+
+    def test_format_cents(self):
+        self.assertEqual(format_cents(45000), "450.00")
+        self.assertEqual(format_cents(5), "0.05")
+        self.assertEqual(format_cents(-1250), "-12.50")
+        self.assertEqual(format_cents(10 ** 17 + 1), "1000000000000000.01")
+
+
+class MoneyApiTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(self.create_admin())
+
+    def test_amounts_are_exact(self):
+        response = self.post_json("/api/meals/", {"name": "Mandazi", "description": "", "price": "0.10", "category": "Side"})
+        self.assertEqual(response.json()["meal"]["price"], "0.10")
+        meal = Meal.objects.get()
+        self.assertEqual(meal.price_cents, 10)
+
+        for _ in range(3):
+            order = self.place_order(meal)
+            self.post_json("/api/payment/mpesa/", {"order_id": order["id"], "phone": "254700000000"})
+
+        # 0.1 + 0.1 + 0.1 is not 0.3 in floating point
+        self.assertEqual(self.client.get("/api/orders/today/revenue/").json()["total_revenue"], "0.30")
+
+    def test_create_rejects_sub_cent_prices(self):
+        response = self.post_json("/api/meals/", {"name": "Chai", "description": "", "price": "20.005", "category": "Drink"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Meal.objects.exists())
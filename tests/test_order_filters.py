@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from myapp.models import Order
+from myapp.order_filters import parse_order_filters
+from myapp.orders import apply_transition, place_order
+
+from .base import ApiTestCase
+
+
+class ParseOrderFiltersTests(SimpleTestCase):
+    def test_valid_filters(self):
+        filters = parse_order_filters(QueryDict("status=pending,confirmed&from=2025-08-01&customer=jane&limit=20"))
+
+        self.assertEqual(filters, {
+            "status": ["pending", "confirmed"], "from": date(2025, 8, 1), "customer": "jane", "limit": 20,
+        })
+        self.assertEqual(parse_order_filters(QueryDict("fields=id")), {})
+
+    def test_invalid_filters(self):
+        for query in ["status=lost", "id=abc", "from=yesterday", "from=2025-08-02&to=2025-08-01", "customer=ja", "limit=0"]:
+            with self.subTest(query=query), self.assertRaises(ValueError):
+                parse_order_filters(QueryDict(query))
+
+
+class OrderFilterApiTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        meal = self.create_meal()
+        self.jane = self.create_customer(email="jane@example.com", name="Jane")
+        self.omar = self.create_customer(email="omar@example.com", name="Omar")
+        self.paid = place_order(self.jane, meal, 1)
+        apply_transition(self.paid.id, "pay")
+        self.old = place_order(self.jane, meal, 2)
+        Order.objects.filter(id=self.old.id).update(order_date=timezone.now() - timedelta(days=3))
+        self.other = place_order(self.omar, meal, 1)
+        self.login(self.create_admin())
+
+    def order_ids(self, **params):
+        response = self.get_json("/api/orders/", fields="id", **params)
+        self.assertEqual(response.status_code, 200)
+        return [order["id"] for order in response.json()]
+
+    def test_filters_and_combinations(self):
+        today = date.today().isoformat()
+
+        self.assertEqual(self.order_ids(id=self.old.id), [self.old.id])
+        self.assertEqual(self.order_ids(payment_status="completed"), [self.paid.id])
+        self.assertEqual(set(self.order_ids(status="pending")), {self.old.id, self.other.id})
+        self.assertEqual(set(self.order_ids(**{"from": today})), {self.paid.id, self.other.id})
+        self.assertEqual(self.order_ids(to=(date.today() - timedelta(days=1)).isoformat()), [self.old.id])
+        self.assertEqual(set(self.order_ids(customer="JANE")), {self.paid.id, self.old.id})
+        self.assertEqual(self.order_ids(customer="omar@", status="pending", **{"from": today}), [self.other.id])
+        self.assertEqual(len(self.order_ids(limit=2)), 2)
+
+    def test_invalid_filter_is_a_bad_request(self):
+        response = self.get_json("/api/orders/", status="lost")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unknown status", response.json()["error"])
+
+    def test_customers_filter_only_their_own_orders(self):
+        self.login(self.jane)
+
+        self.assertEqual(self.order_ids(status="pending"), [self.old.id])
+        self.assertEqual(self.order_ids(customer="omar"), [])
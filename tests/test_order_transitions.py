@@ -0,0 +1,130 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+
+from myapp.models import Meal, Order
+from myapp.orders import apply_transition, place_order
+
+from .base import ApiTestCase
+
+
+class TransitionTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.create_customer()
+        self.order = place_order(self.customer, self.create_meal(), 1)
+
+    def state(self):
+        self.order.refresh_from_db()
+        return self.order.status, self.order.payment_status
+
+    def test_applies_from_allowed_state_only(self):
+        self.assertTrue(apply_transition(self.order.id, "pay").applied)
+        self.assertEqual(self.state(), ("confirmed", "completed"))
+
+        result = apply_transition(self.order.id, "pay")
+
+        self.assertFalse(result.applied)
+        self.assertEqual((result.status, result.payment_status), ("confirmed", "completed"))
+
+    def test_updates_only_the_changed_columns(self):
+        with self.assertMaxQueries(5) as context:  # savepoint, UPDATE, SELECT, outbox INSERT, release
+            apply_transition(self.order.id, "pay")
+
+        update = next(q["sql"] for q in context.captured_queries if q["sql"].startswith("UPDATE"))
+        set_clause = update.split(" SET ")[1].split(" WHERE ")[0]
+        self.assertEqual(sorted(part.split(" = ")[0] for part in set_clause.split(", ")), ['"payment_status"', '"status"'])
+
+    def test_other_users_order_is_not_found(self):
+        result = apply_transition(self.order.id, "pay", user=self.create_customer(email="other@example.com"))
+
+        self.assertEqual((result.applied, result.status), (False, None))
+        self.assertEqual(self.state(), ("pending", "pending"))
+
+    def test_stale_writer_cannot_undo_a_transition(self):
+        stale = Order.objects.get(id=self.order.id)  # Loaded before the payment lands
+        apply_transition(self.order.id, "pay")
+
+        self.assertFalse(apply_transition(stale.id, "fail_payment").applied)
+        self.assertEqual(self.state(), ("confirmed", "completed"))
+
+    def test_transition_bumps_order_history_cache(self):
+        self.login(self.customer)
+        self.assertEqual(self.client.get("/api/orders/").json()[0]["status"], "pending")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_transition(self.order.id, "pay")
+
+        self.assertEqual(self.client.get("/api/orders/").json()[0]["status"], "confirmed")
+
+    def test_unknown_action(self):
+        with self.assertRaises(ValueError):
+            apply_transition(self.order.id, "teleport")
+
+    def test_paying_twice_or_a_cancelled_order(self):
+        self.login(self.customer)
+        paid = self.post_json("/api/payment/mpesa/", {"order_id": self.order.id, "phone": "254700000000"})
+        again = self.post_json("/api/payment/mpesa/", {"order_id": self.order.id, "phone": "254700000000"})
+        self.assertEqual((paid.status_code, again.status_code), (200, 200))
+        self.assertEqual(again.json()["message"], "Order was already paid")
+        self.assertEqual(again.json()["transaction_id"], paid.json()["transaction_id"])
+
+        cancelled = place_order(self.customer, self.create_meal(name="Pilau"), 1)
+        apply_transition(cancelled.id, "cancel")
+        response = self.post_json("/api/payment/mpesa/", {"order_id": cancelled.id, "phone": "254700000000"})
+        self.assertEqual(response.status_code, 409)
+
+
+class ConcurrentTransitionTests(TransactionTestCase):
+    """Threads racing conflicting transitions on one order: exactly one wins and no update is lost."""
+
+    def race(self, order_id, actions):
+        barrier = threading.Barrier(len(actions))
+        results = [None] * len(actions)
+
+        def run(index, action):
+            try:
+                barrier.wait()
+                while results[index] is None:
+                    try:
+                        results[index] = apply_transition(order_id, action)
+                    except OperationalError:
+                        # The in-memory test database fails a conflicting write right away with
+                        # "table is locked" where Postgres would block on the row lock; retry.
+                        time.sleep(0.001)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(i, action)) for i, action in enumerate(actions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def setUp(self):
+        self.customer = User.objects.create_user("racer@example.com", "racer@example.com", "x")
+        self.meal = Meal.objects.create(name="Pilau", price_cents=30000)
+
+    def test_only_one_of_concurrent_payments_applies(self):
+        for _ in range(10):
+            order = place_order(self.customer, self.meal, 1)
+
+            results = self.race(order.id, ["pay"] * 6)
+
+            self.assertEqual(sum(result.applied for result in results), 1, results)
+
+    def test_payment_racing_a_cancellation_never_loses_either_write(self):
+        for _ in range(10):
+            order = place_order(self.customer, self.meal, 1)
+
+            paid, cancelled = self.race(order.id, ["pay", "cancel"])
+
+            order.refresh_from_db()
+            self.assertTrue(cancelled.applied)  # Allowed from both pending and confirmed
+            # Either the payment landed first and the cancellation kept it, or it was refused
+            expected = ("cancelled", "completed") if paid.applied else ("cancelled", "pending")
+            self.assertEqual((order.status, order.payment_status), expected)
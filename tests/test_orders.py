@@ -0,0 +1,154 @@
+import csv
+import io
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import override_settings
+
+from myapp.cache import check_shared_caches
+from myapp.models import Order
+from myapp.views import serialize_order
+
+from .base import ApiTestCase
+
+
+class OrderTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.create_customer()
+        self.meal = self.create_meal(price="450.00")
+        self.login(self.customer)
+
+    def test_place_order(self):
+        order = self.place_order(self.meal, quantity=2)
+
+        self.assertEqual(order["total_amount"], "900.00")
+        self.assertEqual(order["status"], "pending")
+        self.assertEqual(order["items"], [{
+            "meal_name": "Chicken Curry", "quantity": 2, "price_at_order": "450.00", "total_item_price": "900.00", "meal_id": self.meal.id,
+        }])
+
+    def test_unknown_meal(self):
+        response = self.post_json("/api/orders/", {"meal_id": 999999, "quantity": 1})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_summary_matches_full_serialization(self):
+        placed = self.place_order(self.meal)
+
+        listed = self.client.get("/api/orders/").json()
+
+        self.assertEqual(listed, [placed])
+        self.assertEqual(listed[0], serialize_order(Order.objects.get(id=placed["id"])))
+
+    def test_summary_check_reports_orders_without_a_customer(self):
+        kept = self.place_order(self.meal)
+        orphan = self.place_order(self.meal)
+        Order.objects.filter(id=orphan["id"]).update(user_id=999999)  # No foreign key constraint keeps the user
+
+        out = io.StringIO()
+        call_command("check_order_summaries", stdout=out)
+
+        self.assertIn(f"Order {orphan['id']}: its customer (user 999999) no longer exists.", out.getvalue())
+        self.assertNotIn(f"Order {kept['id']}:", out.getvalue())
+        self.assertIn("Checked 2 orders, 0 mismatched, 1 without a customer.", out.getvalue())
+
+    def test_customers_see_only_their_orders(self):
+        self.place_order(self.meal)
+        other = self.create_customer(email="other@example.com")
+        self.login(other)
+        self.place_order(self.meal)
+
+        self.assertEqual(len(self.client.get("/api/orders/").json()), 1)
+        self.login(self.create_admin())
+        self.assertEqual(len(self.client.get("/api/orders/").json()), 2)
+
+
+class PaymentTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.create_customer()
+        self.login(self.customer)
+        self.order = self.place_order(self.create_meal())
+
+    def test_payment_confirms_order(self):
+        response = self.post_json("/api/payment/mpesa/", {"order_id": self.order["id"], "phone": "254700000000"})
+
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get(id=self.order["id"])
+        self.assertEqual((order.status, order.payment_status), ("confirmed", "completed"))
+
+    def test_cannot_pay_for_someone_elses_order(self):
+        self.login(self.create_customer(email="other@example.com"))
+
+        response = self.post_json("/api/payment/mpesa/", {"order_id": self.order["id"], "phone": "254700000000"})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_requires_order_and_phone(self):
+        self.assertEqual(self.post_json("/api/payment/mpesa/", {"order_id": self.order["id"]}).status_code, 400)
+
+
+class OrderHistoryCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(self.create_customer())
+        self.meal = self.create_meal()
+
+    def test_writes_invalidate_the_cached_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.place_order(self.meal)
+        self.assertEqual(self.client.get("/api/orders/").json()[0]["payment_status"], "pending")
+
+        with self.assertMaxQueries(2):  # session + user only: served from the cache
+            self.client.get("/api/orders/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_json("/api/payment/mpesa/", {"order_id": order["id"], "phone": "254700000000"})
+        self.assertEqual(self.client.get("/api/orders/").json()[0]["payment_status"], "completed")
+
+    def test_hit_ratio_is_reported(self):
+        self.client.get("/api/orders/")
+        self.client.get("/api/orders/")
+
+        self.login(self.create_admin())
+        stats = self.client.get("/api/cache/stats/").json()["caches"]["order_history"]
+
+        self.assertGreaterEqual(stats["hits"], 1)
+        self.assertIsNotNone(stats["hit_ratio"])
+
+    def test_versions_need_a_shared_cache(self):
+        with override_settings(ALLOW_PROCESS_LOCAL_CACHES=False), self.assertRaisesMessage(ImproperlyConfigured, "CACHES['default']"):
+            check_shared_caches()
+
+        shared = {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost:6379/0"}
+        with override_settings(ALLOW_PROCESS_LOCAL_CACHES=False, CACHES={"default": shared, "order_history": shared, "carts": shared}):
+            check_shared_caches()
+
+
+class RevenueAndExportTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        customer = self.create_customer()
+        self.login(customer)
+        meal = self.create_meal(price="100.00")
+        paid = self.place_order(meal, quantity=3)
+        self.place_order(meal)
+        self.post_json("/api/payment/mpesa/", {"order_id": paid["id"], "phone": "254700000000"})
+        self.login(self.create_admin())
+
+    def test_daily_revenue_counts_paid_orders(self):
+        revenue = self.client.get("/api/orders/today/revenue/").json()
+
+        self.assertEqual(revenue, {"total_revenue": "300.00", "total_orders": 1})
+
+    def test_csv_export(self):
+        today = date.today().isoformat()
+
+        response = self.client.get("/api/orders/export/", {"from": today, "to": today})
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row["line_total"] for row in rows}, {"300.00", "100.00"})
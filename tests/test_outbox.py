@@ -0,0 +1,105 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from myapp.models import OrderEvent
+from myapp.orders import apply_transition, place_order
+from myapp.outbox import dispatch_batch
+
+from .base import ApiTestCase
+
+received = []
+broken = {"fail": True}
+
+
+def record(event):
+    received.append((event.kind, event.payload["order_id"]))
+
+
+def flaky(event):
+    if broken["fail"]:
+        raise RuntimeError("kitchen display offline")
+
+
+@override_settings(OUTBOX_CONSUMERS=["tests.test_outbox.record"], OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        received.clear()
+        broken["fail"] = True
+        self.customer = self.create_customer()
+        self.meal = self.create_meal()
+
+    def make_due(self):
+        OrderEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def test_events_are_written_with_the_order_change(self):
+        order = place_order(self.customer, self.meal, 2)
+        apply_transition(order.id, "pay")
+        apply_transition(order.id, "pay")  # Not applied, so no event
+
+        self.assertEqual(list(OrderEvent.objects.values_list("kind", flat=True)), ["order.placed", "order.paid"])
+
+    def test_no_event_when_the_transaction_rolls_back(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            place_order(self.customer, self.meal, 1)
+            raise RuntimeError
+
+        self.assertFalse(OrderEvent.objects.exists())
+
+    def test_dispatch_delivers_in_order_and_marks_dispatched(self):
+        first = place_order(self.customer, self.meal, 1)
+        second = place_order(self.customer, self.meal, 1)
+        apply_transition(first.id, "pay")
+
+        result = dispatch_batch(batch_size=2)
+        self.assertEqual((result["claimed"], result["dispatched"]), (2, 2))
+        dispatch_batch(batch_size=2)
+
+        self.assertEqual(received, [("order.placed", first.id), ("order.placed", second.id), ("order.paid", first.id)])
+        self.assertFalse(OrderEvent.objects.filter(dispatched_at__isnull=True).exists())
+        self.assertEqual(dispatch_batch()["claimed"], 0)
+
+    @override_settings(OUTBOX_CONSUMERS=["tests.test_outbox.record", "tests.test_outbox.flaky"])
+    def test_failed_consumer_is_retried_without_redelivering_to_the_others(self):
+        place_order(self.customer, self.meal, 1)
+
+        self.assertEqual(dispatch_batch()["retried"], 1)
+        event = OrderEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.available_at, timezone.now())  # Backing off
+        self.assertIn("kitchen display offline", event.last_error)
+        self.assertEqual(dispatch_batch()["claimed"], 0)
+
+        broken["fail"] = False
+        self.make_due()
+        self.assertEqual(dispatch_batch()["dispatched"], 1)
+        self.assertEqual(len(received), 1)  # The healthy consumer saw it once
+
+    @override_settings(OUTBOX_CONSUMERS=["tests.test_outbox.flaky"])
+    def test_gives_up_after_max_attempts(self):
+        place_order(self.customer, self.meal, 1)
+
+        for _ in range(3):
+            self.make_due()
+            dispatch_batch()
+
+        event = OrderEvent.objects.get()
+        self.assertIsNotNone(event.failed_at)
+        self.make_due()
+        self.assertEqual(dispatch_batch()["claimed"], 0)
+
+    def test_worker_command_and_metrics(self):
+        place_order(self.customer, self.meal, 1)
+        self.login(self.create_admin())
+        self.assertEqual(self.client.get("/api/outbox/stats/").json()["pending"], 1)
+
+        call_command("dispatch_order_events", "--once", stdout=io.StringIO())
+
+        stats = self.client.get("/api/outbox/stats/").json()
+        self.assertEqual((stats["pending"], stats["dispatched_in_window"]), (0, 1))
+        self.assertIsNotNone(stats["avg_lag_seconds"])
@@ -0,0 +1,134 @@
+import io
+from datetime import date, datetime, timedelta
+
+from django.core.management import call_command
+
+from myapp.models import DailyMenu, Order, OrderEvent
+from myapp.orders import apply_transition
+from myapp.preorders import check_menu_date, confirm_day, cutoff_for, kitchen_totals
+
+from .base import ApiTestCase
+
+
+class PreorderTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.curry = self.create_meal("Chicken Curry", "450.00")
+        self.chapati = self.create_meal("Chapati", "30.00", "Side")
+        self.pilau = self.create_meal("Pilau", "400.00")
+        # Two days ahead, so the cutoff (the evening before) is still open whenever the tests run
+        self.day = date.today() + timedelta(days=2)
+        menu = DailyMenu.objects.create(date=self.day)
+        menu.meals.set([self.curry, self.chapati])
+        self.customer = self.create_customer()
+        self.login(self.customer)
+
+    def preorder(self, meal, quantity=1, day=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.post_json("/api/orders/", {"meal_id": meal.id, "quantity": quantity, "date": str(day or self.day)})
+
+    def test_preorder_is_placed_pending_for_its_day(self):
+        response = self.preorder(self.curry, 2)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        order = response.json()["order"]
+        self.assertEqual((order["status"], order["menu_date"], order["total"]), ("pending", self.day.isoformat(), "900.00"))
+        self.assertEqual(self.place_order(self.curry)["menu_date"], date.today().isoformat())
+        self.assertEqual(self.client.get("/api/orders/", {"fields": "id,menu_date"}).json()[1], {"id": order["id"], "menu_date": self.day.isoformat()})
+
+    def test_invalid_dates(self):
+        for day, meal in [
+            ("tomorrowish", self.curry),
+            (str(date.today() - timedelta(days=1)), self.curry),
+            (str(date.today() + timedelta(days=30)), self.curry),
+            (str(self.day + timedelta(days=1)), self.curry),  # No menu that day
+            (str(self.day), self.pilau),  # Not on the day's menu
+        ]:
+            with self.subTest(day=day, meal=meal.name):
+                self.assertEqual(self.preorder(meal, day=day).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_cutoff(self):
+        cutoff = cutoff_for(self.day)
+        self.assertEqual(cutoff, datetime.combine(self.day - timedelta(days=1), datetime.min.time()).replace(hour=20))
+
+        check_menu_date(self.day, [self.curry.id], now=cutoff - timedelta(minutes=1))
+        with self.assertRaises(ValueError):
+            check_menu_date(self.day, [self.curry.id], now=cutoff)
+
+    def test_cart_checkout_for_a_later_day(self):
+        self.post_json("/api/cart/items/", {"meal_id": self.curry.id, "quantity": 2})
+        self.post_json("/api/cart/items/", {"meal_id": self.chapati.id, "quantity": 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_json("/api/cart/checkout/", {"date": str(self.day)})
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["order"]["menu_date"], self.day.isoformat())
+        self.assertEqual(self.post_json("/api/cart/checkout/", {"date": "soon"}).status_code, 400)
+
+    def test_cutoff_confirms_and_reprices_in_one_batch(self):
+        stale = self.preorder(self.curry, 2).json()["order"]
+        current = self.preorder(self.chapati, 3).json()["order"]
+        paid = self.preorder(self.curry).json()["order"]
+        self.post_json("/api/payment/mpesa/", {"order_id": paid["id"], "phone": "254700000000"})
+        cancelled = self.preorder(self.chapati).json()["order"]
+        apply_transition(cancelled["id"], "cancel")
+        today = self.place_order(self.curry)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.curry.price_cents = 50000
+            self.curry.save()
+
+        # Menu prices; pending ids; stale orders, item UPDATE, total UPDATE, summaries; confirm UPDATE, events INSERT
+        with self.captureOnCommitCallbacks(execute=True), self.assertMaxQueries(16):
+            result = confirm_day(self.day)
+
+        self.assertEqual((result["confirmed"], result["repriced"]), (2, 1))
+        orders = {order.id: order for order in Order.objects.all()}
+        self.assertEqual(orders[stale["id"]].status, "confirmed")
+        self.assertEqual(orders[stale["id"]].total_amount_cents, 100000)
+        self.assertEqual(orders[stale["id"]].summary["items"][0]["price_at_order"], "500.00")
+        self.assertEqual(orders[current["id"]].total_amount_cents, 9000)
+        # Paid before the cutoff: kept at the price paid
+        self.assertEqual(orders[paid["id"]].total_amount_cents, 45000)
+        self.assertEqual(orders[cancelled["id"]].status, "cancelled")
+        self.assertEqual(orders[today["id"]].status, "pending")
+        self.assertEqual(
+            sorted(OrderEvent.objects.filter(kind="order.confirmed").values_list("order_id", flat=True)),
+            sorted([stale["id"], current["id"]]),
+        )
+        self.assertEqual(result["kitchen"], [
+            {"meal_id": self.chapati.id, "meal_name": "Chapati", "quantity": 3, "orders": 1},
+            {"meal_id": self.curry.id, "meal_name": "Chicken Curry", "quantity": 3, "orders": 2},
+        ])
+        # The history cache was bumped, so the customer sees the new price
+        history = {order["id"]: order for order in self.client.get("/api/orders/").json()}
+        self.assertEqual(history[stale["id"]]["total"], "1000.00")
+
+        self.assertEqual(confirm_day(self.day)["confirmed"], 0)
+        self.assertEqual(OrderEvent.objects.filter(kind="order.confirmed").count(), 2)
+
+    def test_confirmed_preorder_can_still_be_paid(self):
+        order = self.preorder(self.curry).json()["order"]
+        confirm_day(self.day)
+
+        response = self.post_json("/api/payment/mpesa/", {"order_id": order["id"], "phone": "254700000000"})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Order.objects.get().payment_status, "completed")
+
+    def test_kitchen_totals_view(self):
+        self.preorder(self.curry, 2)
+        self.assertEqual(self.get_json("/api/kitchen/totals/", date=str(self.day)).status_code, 403)
+
+        self.login(self.create_admin())
+        data = self.get_json("/api/kitchen/totals/", date=str(self.day)).json()
+
+        self.assertEqual(data["dishes"], [{"meal_id": self.curry.id, "meal_name": "Chicken Curry", "quantity": 2, "orders": 1}])
+        self.assertEqual(self.get_json("/api/kitchen/totals/", date="soon").status_code, 400)
+
+    def test_seeded_orders_have_a_menu_date(self):
+        call_command("seed_bench", users=3, meals=4, days=2, menu_size=2, orders=10, stdout=io.StringIO())
+
+        self.assertFalse(Order.objects.filter(menu_date__isnull=True).exists())
+        self.assertTrue(kitchen_totals(Order.objects.values_list("menu_date", flat=True).first()))
@@ -0,0 +1,71 @@
+import shutil
+
+from django.conf import settings
+from django.test import override_settings
+
+from myapp.profiling import HEADER, capture_ids, make_token
+
+from .base import ApiTestCase
+
+
+class ProfilingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(settings.PROFILING_DIR, ignore_errors=True)
+        self.admin = self.create_admin()
+        self.login(self.admin)
+
+    def profiled_get(self, path, token=None):
+        return self.client.get(path, headers={HEADER: token or make_token("admin@example.com")})
+
+    def test_signed_header_captures_profile_and_sql(self):
+        self.create_meal()
+
+        response = self.profiled_get("/api/meals/")
+
+        capture_id = response["X-Profile-Id"]
+        detail = self.get_json(f"/api/profiles/{capture_id}/").json()
+        self.assertEqual(detail["path"], "/api/meals/")
+        self.assertEqual(detail["reason"], "header:admin@example.com")
+        self.assertEqual(detail["user"], "admin@example.com")
+        self.assertEqual(detail["query_count"], len(detail["queries"]))
+        self.assertTrue(any("myapp_meal" in query["sql"] for query in detail["queries"]))
+        self.assertIn("meals_list_create_view", detail["stats"])
+
+    def test_unsigned_or_tampered_header_is_ignored(self):
+        response = self.profiled_get("/api/meals/", token=make_token("someone") + "x")
+
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(capture_ids(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_captured(self):
+        response = self.client.get("/api/hello/")
+
+        self.assertIn("X-Profile-Id", response)
+
+    @override_settings(PROFILING_MAX_CAPTURES=3)
+    def test_buffer_keeps_only_newest_captures(self):
+        ids = [self.profiled_get("/api/hello/")["X-Profile-Id"] for _ in range(5)]
+
+        self.assertEqual(capture_ids(), ids[-3:])
+        listed = [capture["id"] for capture in self.get_json("/api/profiles/").json()["profiles"]]
+        self.assertEqual(listed, list(reversed(ids[-3:])))
+
+    def test_download_returns_pstats_file(self):
+        capture_id = self.profiled_get("/api/hello/")["X-Profile-Id"]
+
+        response = self.client.get(f"/api/profiles/{capture_id}/download/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'filename="{capture_id}.prof"', response["Content-Disposition"])
+        self.assertTrue(b"".join(response.streaming_content))
+
+    def test_unknown_or_malformed_ids_are_not_found(self):
+        self.assertEqual(self.client.get("/api/profiles/20250101T000000-1-1/").status_code, 404)
+        self.assertEqual(self.client.get("/api/profiles/..%2Fsettings/download/").status_code, 404)
+
+    def test_customers_cannot_read_profiles(self):
+        self.login(self.create_customer())
+
+        self.assertEqual(self.client.get("/api/profiles/").status_code, 403)
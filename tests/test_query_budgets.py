@@ -0,0 +1,118 @@
+"""
+Per-endpoint query budgets. Each endpoint is measured with a small and a larger
+dataset: the count must stay within its budget and must not grow with the
+number of rows, so an N+1 regression in serialize_order, serialize_meal or
+similar paths fails the build.
+
+Budgets include the session and user lookups done by every authenticated request.
+"""
+
+from datetime import date
+
+from django.core.cache import caches
+
+from myapp.cache import ORDER_HISTORY
+from myapp.models import DailyMenu
+from myapp.search import meal_index
+
+from .base import ApiTestCase
+
+SMALL, LARGE = 1, 25
+
+BUDGETS = {
+    "meals": 3,
+    "meal_search": 4,  # + building the in-process search index on first use
+    "daily_menu_today": 4,
+    "daily_menu_range": 4,
+    "orders_admin": 3,
+    "orders_customer": 3,
+    "daily_revenue": 4,
+    "orders_export": 3,
+    "place_order": 8,  # + the OrderEvent outbox row
+}
+
+
+class QueryBudgetTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = self.create_admin()
+        self.customer = self.create_customer()
+
+    def populate(self, rows):
+        start = DailyMenu.meals.through.objects.count()
+        meals = [self.create_meal(f"Dish {n}", price="100.00") for n in range(start, start + rows)]
+        menu, _ = DailyMenu.objects.get_or_create(date=date.today())
+        menu.meals.add(*meals)
+        self.login(self.customer)
+        for meal in meals:
+            self.place_order(meal, quantity=2)
+        return meals
+
+    def assert_constant(self, budget_name, user, request):
+        """Runs ``request`` with SMALL and then LARGE rows; both must fit the budget and match."""
+        counts = []
+        for rows in (SMALL, LARGE - SMALL):
+            self.populate(rows)
+            self.login(user)
+            request()  # So per-process caches and the session row do not skew the measured run
+            with self.assertMaxQueries(BUDGETS[budget_name]) as context:
+                response = request()
+            self.assertLess(response.status_code, 300)
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1], f"{budget_name}: query count grows with the number of rows")
+
+    def uncached(self, path):
+        """GET path after dropping the cached catalogue bodies, so the build is measured."""
+
+        def request():
+            caches["default"].clear()
+            return self.client.get(path)
+
+        return request
+
+    def test_meals(self):
+        self.assert_constant("meals", self.admin, self.uncached("/api/meals/"))
+
+    def test_meal_search(self):
+        def search():
+            meal_index.clear()  # Measure a cold index build, which is one query however many meals exist
+            return self.client.get("/api/meals/", {"q": "dish"})
+
+        self.assert_constant("meal_search", self.admin, search)
+
+    def test_daily_menu_today(self):
+        self.assert_constant("daily_menu_today", self.customer, self.uncached("/api/daily-menu/today/menu/"))
+
+    def test_daily_menu_range(self):
+        today = date.today().isoformat()
+        self.assert_constant("daily_menu_range", self.customer, lambda: self.client.get("/api/daily-menu/", {"from": today, "to": today}))
+
+    def test_orders_admin(self):
+        self.assert_constant("orders_admin", self.admin, lambda: self.client.get("/api/orders/"))
+
+    def test_orders_customer(self):
+        def history():
+            caches[ORDER_HISTORY].clear()  # Measure the cache miss, which runs the query
+            return self.client.get("/api/orders/")
+
+        self.assert_constant("orders_customer", self.customer, history)
+
+    def test_daily_revenue(self):
+        self.assert_constant("daily_revenue", self.admin, lambda: self.client.get("/api/orders/today/revenue/"))
+
+    def test_orders_export(self):
+        today = date.today().isoformat()
+
+        def export():
+            response = self.client.get("/api/orders/export/", {"from": today, "to": today})
+            b"".join(response.streaming_content)  # The rows are only read while streaming
+            return response
+
+        self.assert_constant("orders_export", self.admin, export)
+
+    def test_place_order(self):
+        meal = self.create_meal()
+        self.login(self.customer)
+
+        with self.assertMaxQueries(BUDGETS["place_order"]):
+            self.place_order(meal)
@@ -0,0 +1,159 @@
+import io
+import json
+import os
+import tempfile
+from datetime import date
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from myapp.models import DailyRevenue, Order, OrderEvent
+from myapp.orders import apply_transition
+from myapp.reconciliation import read_statement, reconcile
+
+from .base import ApiTestCase
+
+
+def jsonl(*records):
+    return io.StringIO("".join(json.dumps(record) + "\n" for record in records))
+
+
+class ReconciliationTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.meal = self.create_meal(price="450.00")
+        self.customer = self.create_customer()
+        self.login(self.customer)
+
+    def pay(self, order, transaction_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_json("/api/payment/mpesa/", {"order_id": order["id"], "phone": "254700000000", "transaction_id": transaction_id})
+        self.assertEqual(response.json()["transaction_id"], transaction_id)
+
+    def reconcile(self, statement, **kwargs):
+        mismatches = []
+        with self.captureOnCommitCallbacks(execute=True):
+            result = reconcile(read_statement(statement, "jsonl"), on_mismatch=mismatches.append, **kwargs)
+        return result, mismatches
+
+    def test_payment_records_its_transaction_id(self):
+        order = self.place_order(self.meal)
+        self.pay(order, "QKA1B2C3D4")
+
+        self.assertEqual(Order.objects.get().mpesa_transaction_id, "QKA1B2C3D4")
+
+    def test_payment_rejects_bad_and_reused_transaction_ids(self):
+        paid, other = self.place_order(self.meal), self.place_order(self.meal)
+        self.pay(paid, "QKA1B2C3D4")
+
+        for transaction_id, status in [("Q" * 33, 400), ("QK-1 2", 400), ("QKA1B2C3D4", 409)]:
+            with self.subTest(transaction_id=transaction_id):
+                response = self.post_json("/api/payment/mpesa/", {"order_id": other["id"], "phone": "254700000000", "transaction_id": transaction_id})
+                self.assertEqual(response.status_code, status, response.content)
+        self.assertEqual(Order.objects.get(id=other["id"]).payment_status, "pending")
+
+    def test_statement_corrects_payments_and_reports_mismatches(self):
+        agreed = self.place_order(self.meal)
+        self.pay(agreed, "QK00000001")
+        lost = self.place_order(self.meal, 2)  # Paid, but the callback never arrived
+        reversed_ = self.place_order(self.meal)
+        self.pay(reversed_, "QK00000003")
+        short = self.place_order(self.meal)
+        cancelled = self.place_order(self.meal)
+        apply_transition(cancelled["id"], "cancel")
+
+        result, mismatches = self.reconcile(jsonl(
+            {"transaction_id": "QK00000001", "amount": "450.00", "status": "Completed"},
+            {"transaction_id": "QK00000002", "order_id": str(lost["id"]), "amount": "900.00", "status": "Completed"},
+            {"transaction_id": "QK00000003", "amount": "450.00", "status": "Reversed"},
+            {"transaction_id": "QK00000004", "order_id": str(short["id"]), "amount": "45.00", "status": "Completed"},
+            {"transaction_id": "QK00000005", "order_id": str(cancelled["id"]), "amount": "450.00", "status": "Completed"},
+            {"transaction_id": "QK00000006", "amount": "1,200.00", "status": "Completed"},
+            {"transaction_id": "QK00000007", "order_id": str(agreed["id"]), "amount": "450.00", "status": "Completed"},
+            {"transaction_id": "QK00000008", "amount": "450.00", "status": "Failed"},
+            ["not", "a", "line"],
+        ), batch_size=4)
+
+        self.assertEqual(
+            {key: result[key] for key in ("lines", "matched", "settled", "reversed", "mismatched")},
+            {"lines": 9, "matched": 2, "settled": 1, "reversed": 1, "mismatched": 5},
+        )
+        self.assertEqual([mismatch.line for mismatch in mismatches], [4, 5, 6, 7, 9])
+        self.assertIn("does not match the total", mismatches[0].problem)
+        self.assertIn("was paid with transaction QK00000001", mismatches[3].problem)
+
+        orders = {order.id: order for order in Order.objects.all()}
+        self.assertEqual(
+            (orders[lost["id"]].status, orders[lost["id"]].payment_status, orders[lost["id"]].mpesa_transaction_id),
+            ("confirmed", "completed", "QK00000002"),
+        )
+        self.assertEqual(orders[reversed_["id"]].payment_status, "failed")
+        self.assertEqual(orders[short["id"]].payment_status, "pending")
+        self.assertEqual(orders[cancelled["id"]].payment_status, "pending")
+        self.assertEqual(
+            list(OrderEvent.objects.filter(payload__action="reconcile").order_by("id").values_list("order_id", "kind")),
+            [(lost["id"], "order.paid"), (reversed_["id"], "order.payment_failed")],
+        )
+        self.assertEqual(result["days"], [date.today().isoformat()])
+        self.assertEqual(DailyRevenue.objects.get(date=date.today()).total_revenue_cents, 135000)
+        history = {order["id"]: order for order in self.client.get("/api/orders/").json()}
+        self.assertEqual(history[lost["id"]]["payment_status"], "completed")
+
+    def test_a_second_run_changes_nothing(self):
+        lost = self.place_order(self.meal)
+        statement = [{"transaction_id": "QK00000002", "order_id": str(lost["id"]), "amount": "450.00", "status": "Completed"}]
+
+        self.assertEqual(self.reconcile(jsonl(*statement))[0]["settled"], 1)
+        result, mismatches = self.reconcile(jsonl(*statement))
+
+        self.assertEqual((result["matched"], result["settled"], mismatches), (1, 0, []))
+        self.assertEqual(OrderEvent.objects.filter(payload__action="reconcile").count(), 1)
+
+    def test_dry_run_writes_nothing(self):
+        lost = self.place_order(self.meal)
+
+        result, _ = self.reconcile(jsonl({"transaction_id": "QK00000002", "order_id": str(lost["id"]), "amount": "450.00", "status": "Completed"}), apply=False)
+
+        self.assertEqual(result["settled"], 1)
+        self.assertEqual(Order.objects.get().payment_status, "pending")
+
+    def test_one_transaction_settles_one_order(self):
+        first, second = self.place_order(self.meal), self.place_order(self.meal)
+
+        result, mismatches = self.reconcile(jsonl(
+            {"transaction_id": "QK00000002", "order_id": str(first["id"]), "amount": "450.00", "status": "Completed"},
+            {"transaction_id": "QK00000002", "order_id": str(second["id"]), "amount": "450.00", "status": "Completed"},
+        ))
+
+        self.assertEqual((result["settled"], [mismatch.line for mismatch in mismatches]), (1, [2]))
+
+    def test_queries_do_not_grow_with_the_statement(self):
+        orders = [self.place_order(self.meal) for _ in range(40)]
+        statement = jsonl(*[
+            {"transaction_id": f"QK{order['id']:08d}", "order_id": str(order["id"]), "amount": "450.00", "status": "Completed"}
+            for order in orders
+        ])
+
+        # By transaction ID, by order id; savepoint, lock, UPDATE, events INSERT, release; the revenue rollup (7)
+        with self.assertMaxQueries(14):
+            result, _ = self.reconcile(statement)
+
+        self.assertEqual(result["settled"], 40)
+        self.assertFalse(Order.objects.filter(payment_status="pending").exists())
+
+    def test_command_reads_a_portal_csv(self):
+        lost = self.place_order(self.meal)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "statement.csv")
+            with open(path, "w", encoding="utf-8-sig", newline="") as statement:
+                statement.write("Receipt No.,Completion Time,Details,Transaction Status,Paid In,A/C No.\r\n")
+                statement.write(f"QK00000002,2025-08-11 12:01:00,Pay Bill from 2547...,Completed,450.00,{lost['id']}\r\n")
+                statement.write("QK00000009,2025-08-11 12:02:00,Pay Bill from 2547...,Completed,450.00,\r\n")
+
+            out = io.StringIO()
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(CommandError):
+                call_command("reconcile_mpesa", path, stdout=out)
+
+        self.assertIn("Line 3 (QK00000009): no order has this transaction ID or order id.", out.getvalue())
+        self.assertIn("Corrected 1 unrecorded payments", out.getvalue())
+        self.assertEqual(Order.objects.get().mpesa_transaction_id, "QK00000002")
@@ -0,0 +1,125 @@
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+from django.utils import timezone
+
+from myapp.cache import get_stats
+from myapp.jobs import cleanup, prewarm_next_day, rollup_revenue
+from myapp.models import DailyMenu, DailyRevenue, Order, OrderEvent
+from myapp.orders import apply_transition, place_order
+from myapp.scheduler import Job, Scheduler, load_jobs, next_slot, start_scheduler
+from myapp.views import daily_menu_variants
+
+from .base import ApiTestCase
+
+runs = []
+
+
+def record():
+    runs.append(datetime.now())
+
+
+def explode():
+    raise RuntimeError("disk full")
+
+
+class SchedulerTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        runs.clear()
+        self.start = datetime(2025, 8, 8, 23, 40)
+
+    def test_slots(self):
+        every = Job("rollup", record, 300, None, 0)
+        daily = Job("prewarm", record, None, time(23, 50), 0)
+
+        self.assertEqual(next_slot(every, datetime(2025, 8, 8, 12, 3)), datetime(2025, 8, 8, 12, 5))
+        self.assertEqual(next_slot(every, datetime(2025, 8, 8, 12, 5)), datetime(2025, 8, 8, 12, 10))
+        self.assertEqual(next_slot(daily, self.start), datetime(2025, 8, 8, 23, 50))
+        self.assertEqual(next_slot(daily, datetime(2025, 8, 8, 23, 50)), datetime(2025, 8, 9, 23, 50))
+
+    def test_a_slot_runs_after_its_jitter_and_only_once_across_schedulers(self):
+        job = Job("prewarm", record, None, time(23, 50), 120)
+        workers = [Scheduler([job], now=self.start) for _ in range(3)]
+
+        self.assertEqual([worker.run_pending(datetime(2025, 8, 8, 23, 49)) for worker in workers], [{}, {}, {}])
+        outcomes = [worker.run_pending(datetime(2025, 8, 8, 23, 53)) for worker in workers]
+
+        self.assertEqual(sorted(outcome["prewarm"] for outcome in outcomes), ["ran", "skipped", "skipped"])
+        self.assertEqual(len(runs), 1)
+        # Each worker moved on to tomorrow's slot
+        self.assertEqual([worker.run_pending(datetime(2025, 8, 9, 12, 0)) for worker in workers], [{}, {}, {}])
+
+    def test_a_failing_job_does_not_stop_the_others(self):
+        jobs = [Job("broken", explode, 60, None, 0), Job("fine", record, 60, None, 0)]
+        scheduler = Scheduler(jobs, now=self.start)
+
+        self.assertEqual(scheduler.run_pending(self.start + timedelta(minutes=1)), {"broken": "failed", "fine": "ran"})
+
+    def test_jobs_from_settings(self):
+        names = [job.name for job in load_jobs()]
+
+        self.assertEqual(names, ["prewarm_next_day", "prewarm_lunch", "rollup_revenue", "cleanup", "confirm_preorders"])
+        with self.assertRaises(ValueError):
+            load_jobs({"both": {"func": "tests.test_scheduler.record", "every": 60, "at": "10:00"}})
+
+    def test_schedulers_refuse_per_process_caches(self):
+        # Each process would win its own slot locks and warm a cache no web worker reads
+        with self.assertRaisesMessage(CommandError, "every scheduler would run every slot"):
+            call_command("run_scheduler")
+        with override_settings(SCHEDULER_AUTOSTART=True, ALLOW_PROCESS_LOCAL_CACHES=False), self.assertRaises(ImproperlyConfigured):
+            start_scheduler()
+
+
+class JobTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.create_customer()
+        self.meal = self.create_meal(price="100.00")
+        self.tomorrow = date.today() + timedelta(days=1)
+
+    def test_prewarm_builds_tomorrows_menu_and_revenue_row(self):
+        DailyMenu.objects.create(date=self.tomorrow).meals.add(self.meal)
+        prewarm_next_day()
+        stats = get_stats("catalogue")
+        hits = stats.hits
+
+        self.assertTrue(DailyRevenue.objects.filter(date=self.tomorrow, total_orders=0).exists())
+        # Still cached at lunch time tomorrow, well past the cache's default timeout
+        lunch = timezone.now().timestamp() + 12 * 60 * 60
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=lunch), self.assertNumQueries(0):
+            daily_menu_variants(self.tomorrow)
+        self.assertEqual(stats.hits, hits + 1)
+
+    def test_rollup_and_past_revenue(self):
+        yesterday = date.today() - timedelta(days=1)
+        order = place_order(self.customer, self.meal, 2)
+        apply_transition(order.id, "pay")
+        Order.objects.filter(id=order.id).update(order_date=timezone.now() - timedelta(days=1))
+        place_order(self.customer, self.meal, 1)
+
+        rollup_revenue()
+
+        row = DailyRevenue.objects.get(date=yesterday)
+        self.assertEqual((row.total_revenue_cents, row.total_orders), (20000, 1))
+        self.login(self.create_admin())
+        self.assertEqual(
+            self.client.get("/api/orders/today/revenue/", {"date": yesterday.isoformat()}).json(),
+            {"total_revenue": "200.00", "total_orders": 1},
+        )
+        self.assertEqual(self.client.get("/api/orders/today/revenue/", {"date": self.tomorrow.isoformat()}).status_code, 400)
+
+    def test_cleanup_deletes_old_delivered_events(self):
+        order = place_order(self.customer, self.meal, 1)
+        apply_transition(order.id, "pay")
+        old, recent = OrderEvent.objects.all()
+        OrderEvent.objects.filter(id=old.id).update(dispatched_at=timezone.now() - timedelta(days=30))
+        OrderEvent.objects.filter(id=recent.id).update(dispatched_at=timezone.now())
+
+        cleanup()
+
+        self.assertEqual(list(OrderEvent.objects.values_list("id", flat=True)), [recent.id])
@@ -0,0 +1,162 @@
+import csv
+import io
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from myapp.models import Meal, Order, OrderEvent, OrderItem
+from myapp.orders import place_order
+from myapp.outbox import dispatch_batch, outbox_metrics
+from myapp.sharding import SHARD_ID_SPAN, jump_hash, prepare_shard, shard_for_order, shard_for_user
+from myapp.views import all_orders
+
+from .base import PASSWORD, ApiTestCase
+
+SHARDS = ["default", "orders_1", "orders_2"]
+
+
+class ShardMathTests(SimpleTestCase):
+    def test_jump_hash_is_stable_and_moves_few_keys(self):
+        before = [jump_hash(key, 3) for key in range(3000)]
+        after = [jump_hash(key, 4) for key in range(3000)]
+
+        self.assertEqual(before, [jump_hash(key, 3) for key in range(3000)])
+        self.assertEqual(set(before), {0, 1, 2})
+        moved = sum(old != new for old, new in zip(before, after))
+        # Adding a fourth shard moves about a quarter of the keys, all of them to the new shard
+        self.assertLess(abs(moved / 3000 - 0.25), 0.05)
+        self.assertTrue(all(new == 3 for old, new in zip(before, after) if old != new))
+
+    @override_settings(ORDER_SHARDS=SHARDS)
+    def test_order_ids_name_their_shard(self):
+        self.assertEqual(shard_for_order(1), "default")
+        self.assertEqual(shard_for_order(SHARD_ID_SPAN), "default")
+        self.assertEqual(shard_for_order(SHARD_ID_SPAN + 1), "orders_1")
+        self.assertEqual(shard_for_order(2 * SHARD_ID_SPAN + 7), "orders_2")
+        self.assertIsNone(shard_for_order(3 * SHARD_ID_SPAN + 1))
+        self.assertIsNone(shard_for_order(0))
+
+
+def customers_on_every_shard(create_customer):
+    """One customer per shard, in ORDER_SHARDS order."""
+    by_shard = {}
+    index = 0
+    while len(by_shard) < len(SHARDS):
+        user = create_customer(email=f"customer{index}@example.com", name=f"Customer {index}")
+        by_shard.setdefault(shard_for_user(user.id), user)
+        index += 1
+    return [by_shard[alias] for alias in SHARDS]
+
+
+@override_settings(ORDER_SHARDS=SHARDS)
+class ShardedOrderTests(ApiTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        super().setUp()
+        for alias in SHARDS:
+            prepare_shard(alias)
+        self.meal = self.create_meal(price="100.00")
+        self.customers = customers_on_every_shard(self.create_customer)
+
+    def test_orders_live_on_their_customers_shard(self):
+        for index, (alias, customer) in enumerate(zip(SHARDS, self.customers)):
+            self.login(customer)
+            order = self.place_order(self.meal, quantity=2)
+
+            self.assertEqual(order["id"] // SHARD_ID_SPAN, index)
+            self.assertTrue(Order.objects.using(alias).filter(id=order["id"], user=customer).exists())
+            self.assertEqual(OrderItem.objects.using(alias).get(order_id=order["id"]).quantity, 2)
+            self.assertEqual(OrderEvent.objects.using(alias).get(order_id=order["id"]).kind, "order.placed")
+            self.assertEqual(list(customer.orders.values_list("id", flat=True)), [order["id"]])
+        self.assertEqual(Order.objects.using("default").count(), 1)
+
+    def test_customer_reads_and_pays_on_one_shard(self):
+        customer = self.customers[2]
+        self.login(customer)
+        order = self.place_order(self.meal)
+
+        with CaptureQueriesContext(connections["default"]) as default, \
+                CaptureQueriesContext(connections["orders_1"]) as other:
+            self.assertEqual([o["id"] for o in self.client.get("/api/orders/").json()], [order["id"]])
+        self.assertFalse(any("myapp_order" in query["sql"] for query in default.captured_queries))
+        self.assertEqual(other.captured_queries, [])
+
+        response = self.post_json("/api/payment/mpesa/", {"order_id": order["id"], "phone": "254700000000"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.using("orders_2").get(id=order["id"]).payment_status, "completed")
+        missing = self.post_json("/api/payment/mpesa/", {"order_id": 9 * SHARD_ID_SPAN, "phone": "254700000000"})
+        self.assertEqual(missing.status_code, 404)
+
+    def test_staff_reads_gather_every_shard(self):
+        placed = []
+        for customer in self.customers:
+            self.login(customer)
+            placed.append(self.place_order(self.meal, quantity=len(placed) + 1))
+            self.post_json("/api/payment/mpesa/", {"order_id": placed[-1]["id"], "phone": "254700000000"})
+        self.login(self.create_admin())
+
+        orders = self.client.get("/api/orders/").json()
+        self.assertEqual([order["id"] for order in orders], [order["id"] for order in reversed(placed)])
+        self.assertEqual(len(self.get_json("/api/orders/", limit=2).json()), 2)
+        self.assertEqual(self.get_json("/api/orders/", customer="customer2", fields="id").json(), [{"id": placed[2]["id"]}])
+        self.assertEqual(self.client.get("/api/orders/today/revenue/").json(), {"total_revenue": "600.00", "total_orders": 3})
+
+        today = date.today().isoformat()
+        response = self.client.get("/api/orders/export/", {"from": today, "to": today})
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([int(row["order_id"]) for row in rows], [order["id"] for order in placed])
+        self.assertEqual([row["user_email"] for row in rows], [customer.email for customer in self.customers])
+
+    def test_outbox_dispatches_every_shard(self):
+        for customer in self.customers:
+            place_order(customer, self.meal, 1)
+
+        self.assertEqual(outbox_metrics()["pending"], 3)
+        self.assertEqual(dispatch_batch()["dispatched"], 3)
+        self.assertEqual(outbox_metrics()["dispatched_in_window"], 3)
+
+    def test_admin_reads_the_picked_shard(self):
+        orders = [place_order(customer, self.meal, 1) for customer in self.customers]
+        self.client.force_login(User.objects.create_superuser("root@example.com", "root@example.com", PASSWORD))
+
+        changelist = self.client.get("/admin/myapp/order/", {"shard": "orders_2"})
+        self.assertEqual([order.id for order in changelist.context["cl"].result_list], [orders[2].id])
+        self.assertContains(changelist, self.customers[2].email)
+        self.assertEqual([order.id for order in self.client.get("/admin/myapp/order/").context["cl"].result_list], [orders[0].id])
+        items = self.client.get("/admin/myapp/orderitem/", {"shard": "orders_1"}).context["cl"].result_list
+        self.assertEqual([item.order_id for item in items], [orders[1].id])
+
+        change = self.client.get(f"/admin/myapp/order/{orders[1].id}/change/")
+        self.assertEqual(change.status_code, 200)
+        self.assertEqual([item.order_id for item in change.context["inline_admin_formsets"][0].formset.queryset], [orders[1].id])
+        self.assertEqual(self.client.get(f"/admin/myapp/orderitem/{items[0].id}/change/").status_code, 200)
+
+    def test_deleting_a_user_deletes_their_orders_on_another_shard(self):
+        customer = self.customers[1]
+        order = place_order(customer, self.meal, 1)
+
+        customer.delete()
+
+        self.assertFalse(Order.objects.using("orders_1").filter(id=order.id).exists())
+
+
+@override_settings(ORDER_SHARDS=SHARDS, SHARD_QUERY_WORKERS=3)
+class ParallelGatherTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        for alias in SHARDS:
+            prepare_shard(alias)
+
+    def test_staff_list_from_pool_threads(self):
+        meal = Meal.objects.create(name="Pilau", price_cents=10000)
+        customers = customers_on_every_shard(
+            lambda email, name: User.objects.create_user(username=email, email=email, password=PASSWORD, first_name=name)
+        )
+        placed = [place_order(customer, meal, 1).id for customer in customers]
+
+        self.assertEqual([order["id"] for order in all_orders()], placed[::-1])
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from myapp.slow_queries import normalize_sql, slow_query_log, wait_for_explains
+
+from .base import ApiTestCase
+
+
+class NormalizeSqlTests(SimpleTestCase):
+    def test_literals_placeholders_and_in_lists_are_normalized(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE a = 'x''y' AND b = 42 AND c IN (%s, %s,  %s)\n  AND d = %s"),
+            "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...) AND d = ?",
+        )
+
+
+@override_settings(SLOW_QUERY_MS=0)  # Everything counts as slow
+class SlowQueryLogTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = self.create_admin()
+        self.login(self.admin)
+        slow_query_log.clear()
+
+    def tearDown(self):
+        wait_for_explains(timeout=10)
+        slow_query_log.clear()
+
+    def test_queries_are_attributed_to_the_view_and_grouped_by_fingerprint(self):
+        self.create_meal("Pilau")
+        self.create_meal("Chapati")
+        self.get_json("/api/meals/", q="pilau", category="Main")
+        self.get_json("/api/meals/", q="chapati", category="Main")
+        wait_for_explains(timeout=10)
+
+        queries = self.get_json("/api/queries/slow/", limit=500).json()["queries"]
+
+        meal_selects = [q for q in queries if q["sql"].startswith('SELECT "myapp_meal"."id"') and "IN (...)" in q["sql"]]
+        self.assertEqual(len(meal_selects), 1)
+        entry = meal_selects[0]
+        self.assertEqual(entry["count"], 2)
+        self.assertEqual(entry["views"], {"meals_list_create": 2})
+        self.assertTrue(entry["plan"])
+
+    def test_queries_outside_requests_have_no_view(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        wait_for_explains(timeout=10)
+
+        entry = next(e for e in slow_query_log.entries() if e["sql"] == "SELECT ?")
+        self.assertEqual(entry["views"], {"-": 1})
+        self.assertEqual(entry["last_params"], "()")
+
+    @override_settings(SLOW_QUERY_MS=None)
+    def test_disabled_log_records_nothing(self):
+        self.create_meal()
+
+        self.assertEqual(slow_query_log.entries(), [])
+
+    def test_staff_can_reset_and_customers_are_denied(self):
+        self.create_meal()
+        self.assertEqual(self.client.delete("/api/queries/slow/").status_code, 200)
+        self.login(self.create_customer())
+
+        self.assertEqual(self.client.get("/api/queries/slow/").status_code, 403)